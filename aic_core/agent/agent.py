@@ -1,24 +1,51 @@
 """Agent module."""
 
 import os
-from typing import Any, Union
-import logfire
-from huggingface_hub.errors import LocalEntryNotFoundError
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache, partial
+from typing import TYPE_CHECKING, Any, TypeVar
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent, Tool
 from pydantic_ai.agent import ModelSettings
-from pydantic_ai.mcp import MCPServerStdio
 from pydantic_ai.messages import ModelMessage, RetryPromptPart, ToolCallPart
-from pydantic_ai.models.openai import OpenAIModel
-from pydantic_ai.providers.openai import OpenAIProvider
-from smolagents import load_tool
-from aic_core.agent.agent_hub import AgentHub
-from aic_core.agent.result_types import ComponentRegistry
+from aic_core.agent.cache import NegativeCache, SingleFlight
+from aic_core.agent.lazy_tools import LazyTool
+from aic_core.agent.manifest import ToolEntry
+from aic_core.agent.type_resolver import ResultTypeResolver
+from aic_core.agent.validator import ConfigValidator, InvalidConfigError
 
 
-if os.environ.get("LOGFIRE_TOKEN", None):  # pragma: no cover
+if TYPE_CHECKING:  # pragma: no cover
+    from aic_core.agent.agent_hub import AgentHub
+    from aic_core.agent.mcp_pool import PooledMCPServer
+
+
+T = TypeVar("T")
+
+
+@cache
+def configure_logfire() -> bool:
+    """Configure logfire and instrument pydantic_ai, once, if `LOGFIRE_TOKEN` is set.
+
+    Returns:
+        Whether logfire is configured.
+    """
+    if not os.environ.get("LOGFIRE_TOKEN", None):
+        return False
+    import logfire
+
     logfire.configure()
     logfire.instrument_pydantic_ai()
+    return True
+
+
+def load_tool(repo_id: str, **kwargs: Any) -> Any:
+    """Load a smolagents tool from the Hub, importing smolagents on first use."""
+    from smolagents import load_tool as smolagents_load_tool
+
+    return smolagents_load_tool(repo_id, **kwargs)
 
 
 class AgentConfig(BaseModel):
@@ -48,7 +75,7 @@ class AgentConfig(BaseModel):
     hf_tools: list[str] = []
     """List of Hugging Face tools for the agent."""
     mcp_servers: list[str] = []
-    """List of MCP servers commands for the agent."""
+    """List of MCP server commands, or URLs of HTTP/SSE servers, for the agent."""
     defer_model_check: bool = False
     """Whether to defer model check for the agent."""
     end_strategy: str = "early"
@@ -62,18 +89,30 @@ class AgentConfig(BaseModel):
 
     @classmethod
     def from_hub(cls, repo_id: str, agent_name: str) -> "AgentConfig":
-        """Load an agent config from Hugging Face Hub."""
-        repo = AgentHub(repo_id)
+        """Load an agent config from Hugging Face Hub.
+
+        Only the files the agent needs are downloaded with the repo snapshot.
+        """
+        from aic_core.agent.agent_hub import AgentHub
+
+        repo = AgentHub(repo_id, agent_name=agent_name)
         config_obj = repo.load_config(agent_name)
         return cls(**config_obj)
 
     def push_to_hub(self) -> None:
-        """Upload a JSON file to Hugging Face Hub."""
+        """Upload a JSON file to Hugging Face Hub.
+
+        Raises:
+            InvalidConfigError: If the config fails validation.
+        """
+        from aic_core.agent.agent_hub import AgentHub
+
         repo = AgentHub(self.repo_id)
 
-        # Verify before uploading
-        agent_factory = AgentFactory(self)
-        agent_factory.create_agent(api_key="key")
+        # Verify before uploading, without running any tool code
+        errors = ConfigValidator(self).validate()
+        if errors:
+            raise InvalidConfigError(errors)
 
         # Upload the file
         repo.upload_content(
@@ -83,74 +122,262 @@ class AgentConfig(BaseModel):
         )
 
 
+@dataclass
+class HfToolMetrics:
+    """Metrics of the Hugging Face tools converted by `AgentFactory`."""
+
+    conversions: int = 0
+    """Number of tools loaded and converted."""
+    hits: int = 0
+    """Number of lookups served by an already converted tool."""
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that skipped the conversion."""
+        total = self.conversions + self.hits
+        return self.hits / total if total else 0.0
+
+
 class AgentFactory:
     """Factory class to create an agent from a config."""
 
-    def __init__(self, config: AgentConfig):
-        """Initialise the agent factory."""
+    _hf_tools: dict[tuple[str, str | None], Tool] = {}
+    """Converted Hugging Face tools by (repo_id, revision)."""
+    _hf_tool_flights: SingleFlight = SingleFlight()
+    """Concurrent conversions of the same tool, deduplicated."""
+    _hf_tool_misses: NegativeCache = NegativeCache(ttl=60)
+    """Hugging Face tools recently found missing on the Hub."""
+    hf_tool_metrics: HfToolMetrics = HfToolMetrics()
+    """How often converted Hugging Face tools were reused."""
+    max_workers: int = 8
+    """Number of tools and result types of an agent loaded concurrently."""
+
+    def __init__(self, config: AgentConfig, revision: str | None = None):
+        """Initialise the agent factory.
+
+        Args:
+            config: The agent config.
+            revision: Revision of the repo to load tools and result types from.
+        """
         self.config = config
+        self.revision = revision
 
     @classmethod
     def hf_to_pai_tools(cls, tool_name: str) -> Tool:
-        """Convert a Hugging Face tool to a Pydantic AI tool."""
+        """Convert a Hugging Face tool to a Pydantic AI tool.
+
+        Each tool is loaded and converted once per process, and the converted
+        tool is shared by all agents. Pin a revision with `repo_id@revision`.
+        Tools missing from the local cache are downloaded, unless
+        `AgentHub.offline` is set.
+        """
+        repo_id, _, revision = tool_name.partition("@")
+        key = (repo_id, revision or None)
+        tool = cls._hf_tools.get(key)
+        if tool is not None:
+            cls.hf_tool_metrics.hits += 1
+            return tool
+        error = cls._hf_tool_misses.get(key)
+        if error:
+            raise error
+        return cls._hf_tool_flights.do(key, lambda: cls._convert_hf_tool(*key))
+
+    @classmethod
+    def _convert_hf_tool(cls, repo_id: str, revision: str | None) -> Tool:
+        """Load a Hugging Face tool, convert it and register it."""
+        from huggingface_hub.errors import (
+            EntryNotFoundError,
+            LocalEntryNotFoundError,
+            RepositoryNotFoundError,
+        )
+        from aic_core.agent.agent_hub import AgentHub
+
+        kwargs = {"revision": revision} if revision else {}
         try:
-            tool = load_tool(tool_name, trust_remote_code=True, local_files_only=True)
+            tool = load_tool(
+                repo_id, trust_remote_code=True, local_files_only=True, **kwargs
+            )
         except LocalEntryNotFoundError:
-            tool = load_tool(tool_name, trust_remote_code=True)
-        return Tool(
+            if AgentHub.offline:
+                raise LocalEntryNotFoundError(
+                    f"Tool {repo_id} is not in the local cache, and the hub is offline."
+                ) from None
+            try:
+                tool = load_tool(repo_id, trust_remote_code=True, **kwargs)
+            except (EntryNotFoundError, RepositoryNotFoundError) as e:
+                cls._hf_tool_misses.add((repo_id, revision), e)
+                raise
+        converted = Tool(
             tool.forward,
             name=tool.name,
             # Do nothing if the tool function already has a docstring
             description=tool.description if not tool.forward.__doc__ else None,
         )
+        cls._hf_tools[(repo_id, revision)] = converted
+        cls.hf_tool_metrics.conversions += 1
+        return converted
 
-    def get_result_type(self) -> Any:
-        """Creates a Union type from a list of types."""
-        if not self.config.result_type:
-            return str
-
-        type_classes: list[Any] = []
-        known_types = ComponentRegistry.get_registered_components()
-        for type_str in self.config.result_type:
-            # Handle built-in types and local class types
+    @classmethod
+    def clear_hf_tools(cls) -> None:
+        """Forget the converted Hugging Face tools and the missing ones."""
+        cls._hf_tools.clear()
+        cls._hf_tool_misses.clear()
+        cls.hf_tool_metrics = HfToolMetrics()
+
+    def _load_all(self, loaders: Sequence[tuple[str, Callable[[], T]]]) -> list[T]:
+        """Run loaders concurrently, up to `max_workers` at a time.
+
+        Args:
+            loaders: Description and function of each loader.
+
+        Returns:
+            The results, in the order of the loaders.
+
+        Raises:
+            Exception: The error of the loader that failed, or an
+                `ExceptionGroup` of the errors if several loaders failed.
+        """
+
+        def run(loader: Callable[[], T]) -> tuple[T | None, Exception | None]:
             try:
-                if type_str in known_types:
-                    type_classes.append(ComponentRegistry.get_component_class(type_str))
-                else:
-                    type_classes.append(eval(type_str))
-            except NameError:  # Structured output
-                hf_repo = AgentHub(self.config.repo_id)
-                type_classes.append(hf_repo.load_result_type(type_str))
-
-        if len(type_classes) == 1:
-            return type_classes[0]
-        # Create a new type using Union
-        return Union.__getitem__(tuple(type_classes))
+                return loader(), None
+            except Exception as e:
+                return None, e
+
+        functions = [loader for _, loader in loaders]
+        workers = min(self.max_workers, len(loaders))
+        if workers > 1:
+            with ThreadPoolExecutor(workers, thread_name_prefix="agent-load") as pool:
+                outcomes = list(pool.map(run, functions))
+        else:
+            outcomes = [run(loader) for loader in functions]
+        errors = [
+            (label, error)
+            for (label, _), (_, error) in zip(loaders, outcomes, strict=True)
+            if error is not None
+        ]
+        if len(errors) == 1:
+            raise errors[0][1]
+        if errors:
+            labels = ", ".join(label for label, _ in errors)
+            raise ExceptionGroup(
+                f"Failed to load {labels} of agent {self.config.name}",
+                [error for _, error in errors],
+            )
+        return [result for result, _ in outcomes]  # type: ignore[misc]
+
+    def get_result_type(self) -> Any:
+        """Get the output type of the agent, a union if there are several.
+
+        Result types of the hub repo are loaded concurrently.
+        """
+        loaders = self._result_type_loaders()
+        if len(loaders) > 1:
+            self._load_all(loaders)
+        resolver = ResultTypeResolver(self.config.repo_id, revision=self.revision)
+        return resolver.resolve(self.config.result_type)
+
+    def _result_type_loaders(self) -> list[tuple[str, Callable[[], Any]]]:
+        """Get the loaders of the hub result types of the config."""
+        from aic_core.agent.agent_hub import AgentHub
+
+        hub_names = sorted(
+            set().union(*map(ResultTypeResolver.hub_names, self.config.result_type))
+        )
+        if not hub_names:
+            return []
+        hub = AgentHub(self.config.repo_id, revision=self.revision)
+        return [
+            (f"result type {name}", partial(hub.load_result_type, name))
+            for name in hub_names
+        ]
 
     def get_tools(self) -> list[Tool]:
-        """Get the tools from known tools and hf tools."""
-        tools = []
-        hf_repo = AgentHub(self.config.repo_id)
+        """Get the tools from known tools and hf tools.
+
+        Known tools whose parameters are described by the manifest are lazy:
+        their module is only loaded when the agent first calls them. The other
+        tools are loaded concurrently.
+        """
+        return self._load_all(self._tool_loaders())
+
+    def _tool_loaders(self) -> list[tuple[str, Callable[[], Tool]]]:
+        """Get the loaders of the known tools and hf tools of the config."""
+        from aic_core.agent.agent_hub import AgentHub
+
+        hf_repo = AgentHub(self.config.repo_id, revision=self.revision)
+        manifest = hf_repo.load_index() if self.config.known_tools else None
+        loaders: list[tuple[str, Callable[[], Tool]]] = []
         for tool_name in self.config.known_tools:
-            tool = hf_repo.load_tool(tool_name)
-            tools.append(Tool(tool))  # type: ignore[arg-type]
+            entry = manifest.get(hf_repo.tools_dir, tool_name) if manifest else None
+            if isinstance(entry, ToolEntry) and entry.parameters is not None:
+                loader: Callable[[], Tool] = partial(
+                    LazyTool,
+                    entry.name,
+                    entry.description,
+                    entry.parameters,
+                    loader=partial(hf_repo.load_tool, tool_name),  # type: ignore[arg-type]
+                    max_retries=self.config.retries,
+                )
+            else:
+                loader = partial(self._load_known_tool, hf_repo, tool_name)
+            loaders.append((f"tool {tool_name}", loader))
         for tool_name in self.config.hf_tools:
-            tools.append(self.hf_to_pai_tools(tool_name))
-        return tools
+            loaders.append(
+                (f"HF tool {tool_name}", partial(self.hf_to_pai_tools, tool_name))
+            )
+        return loaders
+
+    @staticmethod
+    def _load_known_tool(hf_repo: "AgentHub", tool_name: str) -> Tool:
+        """Load a tool of the hub repo."""
+        return Tool(hf_repo.load_tool(tool_name))  # type: ignore[arg-type]
+
+    def get_mcp_servers(self) -> list["PooledMCPServer"]:
+        """Get the MCP servers from the config.
+
+        Entries are command lines of stdio servers, or URLs of network servers.
+        The servers are shared by all agents through `MCPServerPool`.
+        """
+        from aic_core.agent.mcp_pool import MCPServerPool
 
-    def get_mcp_servers(self) -> list[MCPServerStdio]:
-        """Get the MCP servers from the config."""
         servers = []
         for server in self.config.mcp_servers:
             if not server.strip():  # pragma: no cover
                 continue
             command, *args = server.split()
-            servers.append(MCPServerStdio(command, args))
+            servers.append(MCPServerPool.get(command, args))
         return servers
 
-    def create_agent(self, api_key: str | None = None) -> Agent:
-        """Create an agent from a config."""
-        result_type = self.get_result_type()
+    def create_agent(self, api_key: str | None = None, dry_run: bool = False) -> Agent:
+        """Create an agent from a config.
+
+        Args:
+            api_key: API key of the model provider.
+            dry_run: Build the agent with a placeholder API key, to validate the
+                config or warm caches without credentials. Lazy tools are
+                loaded too, so that tools whose module fails fail here.
+        """
+        from pydantic_ai.models.openai import OpenAIModel
+        from pydantic_ai.providers.openai import OpenAIProvider
+
+        configure_logfire()
+        if dry_run:
+            api_key = "dry-run"
+        # Result types and tools share one pool of `max_workers` threads
+        type_loaders = self._result_type_loaders()
+        loaded = self._load_all([*type_loaders, *self._tool_loaders()])
+        tools: list[Tool] = loaded[len(type_loaders) :]
+        resolver = ResultTypeResolver(self.config.repo_id, revision=self.revision)
+        result_type = resolver.resolve(self.config.result_type)
+        if dry_run:
+            self._load_all(
+                [
+                    (f"tool {tool.name}", tool.load)
+                    for tool in tools
+                    if isinstance(tool, LazyTool)
+                ]
+            )
         model_name = self.config.model.split(":")[1]
         model = OpenAIModel(model_name, provider=OpenAIProvider(api_key=api_key))
         return Agent(
@@ -165,8 +392,8 @@ class AgentFactory:
             # result_tool_name=self.config.result_tool_name,
             # result_tool_description=self.config.result_tool_description,
             output_retries=self.config.result_retries,
-            tools=self.get_tools(),
-            mcp_servers=self.get_mcp_servers(),  # type: ignore[arg-type]
+            tools=tools,
+            mcp_servers=self.get_mcp_servers(),
             defer_model_check=self.config.defer_model_check,
             end_strategy=self.config.end_strategy,  # type: ignore
             instrument=self.config.instrument,
@@ -176,10 +403,18 @@ class AgentFactory:
 class AICAgent:
     """A wrapper around the pydantic_ai.Agent class."""
 
-    def __init__(self, repo_id: str, agent_name: str) -> None:
-        """Initialize the agent."""
+    def __init__(
+        self, repo_id: str, agent_name: str, agent: Agent | None = None
+    ) -> None:
+        """Initialize the agent.
+
+        Args:
+            repo_id: The repo ID.
+            agent_name: Name of the agent config in the repo.
+            agent: Agent already built from the config, e.g. by `AgentPool`.
+        """
         self.repo_id = repo_id
-        self.agent = self._get_agent(agent_name)
+        self.agent = agent or self._get_agent(agent_name)
 
     def _get_agent(self, agent_name: str) -> Agent:
         """Get the agent given the agent name."""
@@ -196,7 +431,7 @@ class AICAgent:
         skip_retry_msgs: bool = True,
     ) -> list[ModelMessage]:
         """Get the response from the agent."""
-        if self.agent._mcp_servers:
+        if not all(server.is_running for server in self.agent._mcp_servers):
             async with self.agent.run_mcp_servers():  # pragma: no cover
                 result = await self.agent.run(user_prompt, message_history=history)
         else:
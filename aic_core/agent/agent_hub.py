@@ -1,14 +1,66 @@
 """Hub module for hosting tools."""
 
-import importlib
+import asyncio
+import copy
+import filecmp
+import glob
 import json
 import os
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from fnmatch import fnmatch
 from types import ModuleType
-from huggingface_hub import delete_file, hf_hub_download, snapshot_download, upload_file
-from huggingface_hub.errors import LocalEntryNotFoundError
+from typing import Any
+from huggingface_hub import CommitOperationAdd, CommitOperationDelete
+from huggingface_hub.constants import DEFAULT_REVISION, HF_HUB_OFFLINE
+from huggingface_hub.errors import (
+    EntryNotFoundError,
+    LocalEntryNotFoundError,
+    OfflineModeIsEnabled,
+)
 from pydantic import BaseModel
+from aic_core.agent.cache import LRUCache, NegativeCache, SingleFlight
+from aic_core.agent.lock import RefreshLock
+from aic_core.agent.manifest import SECTIONS, Manifest
+from aic_core.agent.module_cache import ModuleCache, module_qualname
+from aic_core.agent.storage import CommitOperation, HfHubBackend, StorageBackend
+from aic_core.logging import get_logger
+
+
+logger = get_logger(__name__)
+ManifestUpdate = Callable[[Manifest], Any]
+OFFLINE_ENV = "AIC_OFFLINE"
+"""Environment variable that makes hubs offline by default."""
+
+
+def _env_flag(name: str) -> bool:
+    """Whether an environment variable is set to a true value."""
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _same_file(path: str, other: str) -> bool:
+    """Whether two files both exist and have the same content."""
+    if not (os.path.isfile(path) and os.path.isfile(other)):
+        return False
+    return os.path.samefile(path, other) or filecmp.cmp(path, other, shallow=False)
+
+
+@dataclass
+class Snapshot:
+    """Local snapshot served for a repo reference."""
+
+    sha: str
+    """Commit sha of the snapshot."""
+    path: str
+    """Local path to the snapshot directory."""
+    checked_at: float
+    """Time of the last freshness check against the Hub."""
+    partial: bool = False
+    """Whether only some of the agents, tools and result types were fetched."""
+    files: dict[str, str] | None = None
+    """Blob id of each file of the revision in the repo, once listed."""
 
 
 class AgentHub:
@@ -17,6 +69,19 @@ class AgentHub:
     This class provides an interface to interact with Hugging Face repositories.
     It allows loading files, configs, and tools from a specified repository,
     as well as handling local caching when possible.
+
+    Files are stored on the Hugging Face Hub by default. Set
+    `AgentHub.default_backend`, or pass `backend`, to serve repos from a local
+    directory or from memory instead.
+
+    Only the agents, tools and result types of a repo are downloaded. A hub
+    can be scoped further with glob `allow_patterns`, or to the files that one
+    agent config needs with `agent_name`. Files outside the scope are still
+    fetched on demand.
+
+    The `a`-prefixed methods are coroutine variants that run the blocking I/O
+    in worker threads. Concurrent loads of the same file, from any thread or
+    event loop, share a single download.
     """
 
     tools_dir: str = "tools"
@@ -24,53 +89,432 @@ class AgentHub:
     result_types_dir: str = "result_types"
     repo_type: str = "space"
     update_interval: int = 600
+    index_file: str = "index.json"
+    default_backend: StorageBackend | None = None
+    """Backend of hubs created without one. Defaults to the Hugging Face Hub."""
+    lock_dir: str | None = None
+    """Directory of the cross-process refresh locks. Defaults to `aic_locks`
+    next to the Hugging Face Hub cache."""
+    refresh_timeout: float = 300
+    """Seconds to wait for another process's refresh, after which its lock is
+    considered stale."""
+    refresh_retry: float = 5
+    """Seconds before checking again when another process is refreshing."""
+    cache_keep_revisions: int | None = None
+    """Revisions of a repo kept in the local cache by background refreshers,
+    which prune older revisions after swapping in a new one. None disables
+    pruning, since other processes sharing the cache may still serve older
+    revisions."""
+    cache_max_size: int | None = None
+    """Bytes a repo may take in the local cache, beyond which older revisions
+    are removed too."""
+    offline: bool = HF_HUB_OFFLINE or _env_flag(OFFLINE_ENV)
+    """Serve from the local cache only, never contacting the Hub. Defaults to
+    true if `AIC_OFFLINE` or `HF_HUB_OFFLINE` is set."""
+
+    _cache: LRUCache = LRUCache(maxsize=256)
+    """Process-wide cache of loaded objects, keyed by
+    (repo_id, revision, subdir, name)."""
+    _modules: ModuleCache = ModuleCache()
+    """Process-wide cache of tool and result type modules by source hash."""
+    _revisions: dict[tuple[str, str | None], str] = {}
+    """Last revision seen by the cache for each (repo_id, revision pin)."""
+    _snapshots: dict[tuple[str, str | None], Snapshot] = {}
+    """Snapshot served for each (repo_id, revision pin) in this process."""
+    _refreshed_keys: set[tuple[str, str | None]] = set()
+    """Repo references kept fresh by a background refresher."""
+    _flights: SingleFlight = SingleFlight()
+    """Concurrent update checks and file loads, deduplicated process-wide."""
+    _misses: NegativeCache = NegativeCache(ttl=60)
+    """Files recently found missing, keyed by (repo_id, revision, path)."""
+
+    def __init__(
+        self,
+        repo_id: str,
+        revision: str | None = None,
+        backend: StorageBackend | None = None,
+        allow_patterns: list[str] | None = None,
+        agent_name: str | None = None,
+        *,
+        offline: bool | None = None,
+    ) -> None:
+        """Initialize the Hugging Face Hub.
 
-    def __init__(self, repo_id: str) -> None:
-        """Initialize the Hugging Face Hub."""
+        Args:
+            repo_id: The repo ID on the Hugging Face Hub.
+            revision: Branch, tag or commit sha to pin. A pinned hub never
+                checks the Hub for updates once the revision is cached locally.
+            backend: Storage of the repo files. Defaults to `default_backend`.
+            allow_patterns: Glob patterns of the files to download, e.g.
+                `["agents/*"]`. Defaults to the agents, tools and result types.
+            agent_name: Only download the config of this agent, and the tools
+                and result types it references.
+            offline: Serve from the local cache only. Files missing from it
+                raise `LocalEntryNotFoundError` right away, and updating or
+                pushing to the repo raises `OfflineModeIsEnabled`. Defaults to
+                `AgentHub.offline`.
+        """
         self.repo_id = repo_id
+        self.revision = revision
+        self.allow_patterns = allow_patterns
+        self.agent_name = agent_name
+        if offline is not None:
+            self.offline = offline
+        self.backend = backend or self.default_backend or HfHubBackend(self.repo_type)
+        self._batch: list[tuple[CommitOperation, ManifestUpdate]] | None = None
+
+    @property
+    def _snapshot_key(self) -> tuple[str, str | None]:
+        """Key of this hub's repo reference in the process-wide state."""
+        return (self.repo_id, self.revision)
 
-    def _load_module(self, module_name: str, path: str) -> ModuleType:
-        """Load a module from a path."""
-        spec = importlib.util.spec_from_file_location(module_name, path)
-        if spec is None or spec.loader is None:  # pragma: no cover
-            raise ImportError(f"Could not load spec for module {path}")
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        return module
+    def _load_module(self, module_name: str, path: str, subdir: str) -> ModuleType:
+        """Load a module from a path, reusing it while its source is unchanged."""
+        qualname = module_qualname(self.repo_id, subdir, module_name)
+        return self._modules.load(qualname, path)
 
-    def _check_extension(self, filename: str, extension: str) -> str:
+    @staticmethod
+    def _check_extension(filename: str, extension: str) -> str:
         """Check if the filename has the correct extension."""
         if not filename.endswith(extension):  # pragma: no cover
             filename = f"{filename}{extension}"
         return filename
 
-    def _lazy_update(self) -> None:
+    def _lazy_update(self) -> str:
         """Lazily update the local cache.
 
-        Update the repo only when self.get_file_path is called, and when
-        interval has passed.
+        A pinned revision is downloaded at most once per process. Otherwise the
+        repo's commit sha is checked at most once per `update_interval`, and
+        only the files changed since the served snapshot are downloaded when
+        the sha has moved. When a background refresher is running, or the hub
+        is offline, the served snapshot is returned as is.
+
+        Returns:
+            The path to the current snapshot.
+        """
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if snapshot and (
+            self.offline
+            or self.revision
+            or self._snapshot_key in self._refreshed_keys
+            or time.time() - snapshot.checked_at < self.update_interval
+        ):
+            return snapshot.path
+        if self.offline:
+            return self._serve(self.download_files(local_files_only=True))
+        return self._flights.do(("update", *self._snapshot_key), self._update)
+
+    def _update(self) -> str:
+        """Serve the latest snapshot, downloading it only if the sha has moved."""
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if self.revision:
+            return self._serve_local_or_download()
+
+        try:
+            sha = self.remote_revision()
+        except OSError as e:
+            logger.warning(f"Could not check {self.repo_id} for updates: {e}")
+            if snapshot:
+                snapshot.checked_at = time.time()
+                return snapshot.path
+            return self._serve(self.download_files(local_files_only=True))
+
+        if snapshot and snapshot.sha == sha:
+            snapshot.checked_at = time.time()
+            return snapshot.path
+        return self._serve_local_or_download(sha)
+
+    def _serve_local_or_download(self, revision: str | None = None) -> str:
+        """Serve a revision from the local cache, downloading it if missing.
+
+        Processes sharing the cache swap revisions one at a time. While a
+        process holds the refresh lock of the repo, the others keep serving
+        their current snapshot, or wait for the lock if they serve none yet.
         """
-        cache_path = self.download_files(local_files_only=True)
-        last_modified = os.path.getmtime(cache_path)
-        if time.time() - last_modified > self.update_interval:
-            self.download_files()
-            os.utime(cache_path, None)
+        snapshot = self._snapshots.get(self._snapshot_key)
+        lock = RefreshLock.for_repo(self.repo_id, self.lock_dir, self.refresh_timeout)
+        locked = lock.acquire(timeout=0 if snapshot else self.refresh_timeout)
+        if not locked and snapshot:
+            logger.info(f"{self.repo_id} is being refreshed by another process")
+            # Check again once the other process is likely done
+            snapshot.checked_at = (
+                time.time() - self.update_interval + self.refresh_retry
+            )
+            return snapshot.path
+        if not locked:  # pragma: no cover
+            logger.warning(f"Timed out waiting for the refresh of {self.repo_id}")
+        try:
+            try:
+                path = self.download_files(local_files_only=True, revision=revision)
+            except LocalEntryNotFoundError:
+                return self._fetch(revision)
+            return self._serve(path)
+        finally:
+            if locked:
+                lock.release()
+
+    def _housekeep(self) -> None:
+        """Prune old revisions if enabled. Failures are only logged."""
+        if self.cache_keep_revisions is None:
+            return
+        try:
+            self.prune_cache()
+        except Exception as e:  # pragma: no cover
+            logger.warning(f"Could not prune the cache of {self.repo_id}: {e}")
+
+    def prune_cache(self, keep: int | None = None, max_size: int | None = None) -> int:
+        """Remove old revisions of the repo from the local cache.
+
+        Revisions served in this process are never removed. Keep at least two
+        revisions when processes share the cache, since others may still
+        serve the previous one.
 
-    def download_files(self, local_files_only: bool = False) -> str:
-        """Download all files from the Hugging Face Hub.
+        Args:
+            keep: Number of most recent revisions to keep. Defaults to
+                `cache_keep_revisions`, or 3 if that is disabled.
+            max_size: Size budget of the repo in bytes. Defaults to
+                `cache_max_size`.
+
+        Returns:
+            The number of bytes freed.
+        """
+        protected = {
+            snapshot.sha
+            for (repo_id, _), snapshot in self._snapshots.items()
+            if repo_id == self.repo_id
+        }
+        freed = self.backend.prune(
+            self.repo_id,
+            keep=keep or self.cache_keep_revisions or 3,
+            max_size=max_size if max_size is not None else self.cache_max_size,
+            protected=protected,
+        )
+        if freed:
+            logger.info(f"Freed {freed} bytes from the cache of {self.repo_id}")
+        return freed
+
+    def cache_report(self) -> dict[str, int]:
+        """Get the local cache size of each repo of the backend, in bytes."""
+        return self.backend.cache_usage()
+
+    def _serve(self, path: str) -> str:
+        """Record the snapshot at path as the one served by this hub.
+
+        The snapshot is partial unless the backend recorded it as complete,
+        as snapshots resolved from the local cache may come from a scoped
+        download, or from an interrupted update.
+        """
+        sha = self.backend.snapshot_revision(path)
+        self._update_ref(path, sha)
+        previous = self._snapshots.get(self._snapshot_key)
+        if previous and previous.sha != sha:
+            self._keep_warm(previous, sha, path)
+        self._snapshots[self._snapshot_key] = Snapshot(
+            sha=sha,
+            path=path,
+            checked_at=time.time(),
+            partial=not self.backend.is_complete(path),
+        )
+        return path
+
+    def _update_ref(self, path: str, sha: str) -> None:
+        """Point the local ref of the hub's revision at the snapshot served.
+
+        Revisions are fetched by commit sha, so that hubs restarted offline
+        would otherwise resolve the ref to an older snapshot, or to none.
+        """
+        ref = self.revision or DEFAULT_REVISION
+        if self.offline or ref == sha:
+            return
+        try:
+            self.backend.update_ref(path, ref)
+        except OSError as e:  # pragma: no cover
+            logger.warning(f"Could not update the local ref of {self.repo_id}: {e}")
+
+    def remote_revision(self) -> str:
+        """Get the current commit sha of the repo with a single query."""
+        self._check_online()
+        return self.backend.resolve_revision(self.repo_id, self.revision)
+
+    def _check_online(self) -> None:
+        """Fail fast before contacting the Hub in offline mode."""
+        if self.offline:
+            raise OfflineModeIsEnabled(f"{self.repo_id} is offline")
+
+    def _offline_miss(self, what: str) -> LocalEntryNotFoundError:
+        """Error of a file missing from the local cache in offline mode."""
+        return LocalEntryNotFoundError(
+            f"{what} of {self.repo_id} is not in the local cache, and the hub is "
+            f"offline. Warm the cache with `aic-hub warm` or unset {OFFLINE_ENV}."
+        )
+
+    def _served(self) -> tuple[str, str]:
+        """Get the path and sha of the snapshot served.
+
+        Cached entries of the previously served revision are evicted.
+        """
+        path = self._lazy_update()
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if snapshot and snapshot.path == path:
+            revision = snapshot.sha
+        else:
+            revision = self.backend.snapshot_revision(path)
+        previous = self._revisions.get(self._snapshot_key)
+        if previous != revision:
+            if previous:
+                self._cache.evict(lambda key: key[:2] == (self.repo_id, previous))
+            self._revisions[self._snapshot_key] = revision
+        return path, revision
+
+    def _snapshot_path(self) -> str:
+        """Get the path of the snapshot served."""
+        return self._served()[0]
+
+    def _current_revision(self) -> str:
+        """Get the revision currently served."""
+        return self._served()[1]
+
+    def _load_cached(
+        self, filename: str, subdir: str, loader: Callable[[str], Any]
+    ) -> Any:
+        """Load an object from the repo, reusing it while the revision is unchanged.
+
+        Args:
+            filename: Name of the file, with or without extension.
+            subdir: Subdirectory of the file in the repo.
+            loader: Function that builds the object from the local file path.
+        """
+        name = filename.split(".")[0]
+        key = (self.repo_id, self._current_revision(), subdir, name)
+        value = self._cache.get(key)
+        if value is None:
+            value = self._flights.do(
+                key, lambda: self._load_uncached(key, filename, subdir, loader)
+            )
+        return value
+
+    def _load_uncached(
+        self,
+        key: tuple[str, str, str, str],
+        filename: str,
+        subdir: str,
+        loader: Callable[[str], Any],
+    ) -> Any:
+        """Load an object from the file and cache it."""
+        value = loader(self._resolve_file_path(filename, subdir))
+        self._cache.set(key, value)
+        return value
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Clear the process-wide cache of loaded objects."""
+        cls._cache.clear()
+        cls._misses.clear()
+        cls._revisions.clear()
+        cls._snapshots.clear()
+
+    def download_files(
+        self,
+        local_files_only: bool = False,
+        revision: str | None = None,
+        allow_patterns: list[str] | None = None,
+    ) -> str:
+        """Download the files in scope from the Hugging Face Hub.
 
         This should be called at the service start up, as well as when any
         changes are made to the repo.
+
+        Args:
+            local_files_only: Only resolve the snapshot from the local cache.
+            revision: Revision to download. Defaults to the pinned revision.
+            allow_patterns: Glob patterns of the files to download. Defaults to
+                the scope of the hub.
         """
-        return snapshot_download(
-            repo_id=self.repo_id,
-            repo_type=self.repo_type,
-            local_files_only=local_files_only,
+        revision = revision or self.revision
+        if local_files_only:
+            try:
+                return self.backend.snapshot(
+                    self.repo_id, revision=revision, local_files_only=True
+                )
+            except LocalEntryNotFoundError as e:
+                if self.offline:
+                    raise self._offline_miss("The snapshot") from e
+                raise
+        if self.offline:
+            raise self._offline_miss("The snapshot")
+        patterns = allow_patterns or self.scope_patterns(revision)
+        path = self.backend.snapshot(
+            self.repo_id, revision=revision, allow_patterns=patterns
         )
+        if set(self._section_patterns) <= set(patterns):
+            self.backend.mark_complete(path)
+        return self._serve(path)
+
+    @property
+    def _section_patterns(self) -> list[str]:
+        """Patterns of all agents, tools and result types."""
+        return [
+            f"{subdir}/*"
+            for subdir in (self.agents_dir, self.tools_dir, self.result_types_dir)
+        ]
+
+    def scope_patterns(self, revision: str | None = None) -> list[str]:
+        """Get the glob patterns of the files this hub downloads.
+
+        The index file is always in scope.
+
+        Args:
+            revision: Revision to read the agent config from, if scoped to one.
+        """
+        if self.agent_name:
+            config_path = self.backend.file_path(
+                self.repo_id,
+                f"{self.agents_dir}/{self._check_extension(self.agent_name, '.json')}",
+                revision or self.revision,
+                local_files_only=self.offline,
+            )
+            patterns = self.agent_closure(self.agent_name, self._read_json(config_path))
+        else:
+            patterns = self.allow_patterns or self._section_patterns
+        return [*patterns, self.index_file]
+
+    @classmethod
+    def agent_closure(cls, agent_name: str, config: dict) -> list[str]:
+        """Get the glob patterns of the files an agent config needs.
+
+        Result types are parsed for the names of hub result types, e.g.
+        `Person` for `list[Person]`. Invalid ones are skipped, and fail when
+        the agent is built.
+        """
+        from aic_core.agent.type_resolver import ResultTypeResolver
+
+        result_types: set[str] = set()
+        for type_str in config.get("result_type", []):
+            try:
+                result_types |= ResultTypeResolver.hub_names(type_str)
+            except ValueError:
+                continue
+        return [
+            glob.escape(
+                f"{cls.agents_dir}/{cls._check_extension(agent_name, '.json')}"
+            ),
+            *(
+                glob.escape(f"{cls.tools_dir}/{cls._check_extension(name, '.py')}")
+                for name in config.get("known_tools", [])
+            ),
+            *(
+                glob.escape(f"{cls.result_types_dir}/{name}.py")
+                for name in sorted(result_types)
+            ),
+        ]
 
     def get_file_path(self, filename: str, subdir: str) -> str:
         """Get the local path to a file in the repo."""
         self._lazy_update()
+        return self._resolve_file_path(filename, subdir)
+
+    def _resolve_file_path(self, filename: str, subdir: str) -> str:
+        """Get the local path to a file, downloading it if not cached."""
         match subdir:
             case self.tools_dir:
                 extension = ".py"
@@ -84,38 +528,377 @@ class AgentHub:
             case _:  # pragma: no cover
                 raise ValueError(f"Invalid subdir: {subdir}")
 
-        filename = self._check_extension(filename, extension)
+        path_in_repo = f"{subfolder}/{self._check_extension(filename, extension)}"
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if snapshot:
+            # Files of the served snapshot need no lookup
+            file_path = os.path.join(snapshot.path, *path_in_repo.split("/"))
+            if os.path.isfile(file_path):
+                return file_path
+        revision = snapshot.sha if snapshot else self.revision
+        key = (self.repo_id, revision, path_in_repo)
+        error = self._misses.get(key)
+        if error:
+            raise error
         try:
-            file_path = hf_hub_download(
-                repo_id=self.repo_id,
-                filename=filename,
-                subfolder=subfolder,
-                local_files_only=True,
-                repo_type=self.repo_type,
-            )
-        except LocalEntryNotFoundError:
-            file_path = hf_hub_download(
-                repo_id=self.repo_id,
-                filename=filename,
-                subfolder=subfolder,
-                repo_type=self.repo_type,
+            file_path = self.backend.file_path(
+                self.repo_id, path_in_repo, revision, local_files_only=True
             )
+        except LocalEntryNotFoundError as e:
+            if self.offline:
+                raise self._offline_miss(path_in_repo) from e
+            try:
+                file_path = self.backend.file_path(self.repo_id, path_in_repo, revision)
+            except EntryNotFoundError as e:
+                self._misses.add(key, e)
+                raise
         return file_path
 
+    def locate(self, name: str, subdirs: Iterable[str] = SECTIONS) -> str | None:
+        """Find the subdirectory of a name with a single manifest lookup.
+
+        Args:
+            name: Name of the file, with or without extension.
+            subdirs: Subdirectories to look in, in order.
+
+        Returns:
+            The first subdirectory listing the name, or None.
+        """
+        manifest = self.load_manifest()
+        for subdir in subdirs:
+            if manifest.get(subdir, name.split(".")[0]):
+                return subdir
+        return None
+
     def delete_file(self, filename: str, subdir: str) -> None:
         """Delete a file from the Hugging Face Hub."""
-        delete_file(
-            path_in_repo=f"{subdir}/{filename}",
-            repo_id=self.repo_id,
-            repo_type=self.repo_type,
+        self._stage(
+            CommitOperationDelete(path_in_repo=f"{subdir}/{filename}"),
+            lambda manifest: manifest.remove(subdir, filename.split(".")[0]),
+            commit_message=f"Delete {filename}",
+        )
+
+    def load_manifest(self) -> Manifest:
+        """Load the manifest of the served snapshot.
+
+        The manifest is built from the snapshot files if the repo has no
+        index file yet. Callers must not modify the returned manifest.
+        """
+        path, revision = self._served()
+        key = (self.repo_id, revision, "", "index")
+        manifest = self._cache.get(key)
+        if manifest is None:
+            index_path = os.path.join(path, self.index_file)
+            if os.path.isfile(index_path):
+                with open(index_path) as file:
+                    manifest = Manifest.model_validate_json(file.read())
+            else:
+                snapshot = self._snapshots.get(self._snapshot_key)
+                if snapshot and snapshot.partial:
+                    path = self.download_files(
+                        revision=revision, allow_patterns=self._section_patterns
+                    )
+                manifest = Manifest.from_directory(path)
+            self._cache.set(key, manifest)
+        return manifest
+
+    def load_index(self) -> Manifest | None:
+        """Load the manifest of the served snapshot if the repo has an index file.
+
+        Unlike `load_manifest`, repo files are never scanned or downloaded.
+        """
+        path = self._snapshot_path()
+        if not os.path.isfile(os.path.join(path, self.index_file)):
+            return None
+        return self.load_manifest()
+
+    def _remote_manifest(self, revision: str) -> Manifest:
+        """Load the manifest of a revision on the Hub."""
+        self._check_online()
+        try:
+            index_path = self.backend.file_path(self.repo_id, self.index_file, revision)
+        except EntryNotFoundError:
+            path = self.backend.snapshot(
+                self.repo_id, revision, allow_patterns=self._section_patterns
+            )
+            return Manifest.from_directory(path)
+        with open(index_path) as file:
+            return Manifest.model_validate_json(file.read())
+
+    def _stage(
+        self,
+        operation: CommitOperation,
+        update_manifest: ManifestUpdate,
+        commit_message: str,
+    ) -> None:
+        """Commit an operation, or add it to the current batch."""
+        if self._batch is not None:
+            self._batch.append((operation, update_manifest))
+        else:
+            self._commit_with_manifest([operation], [update_manifest], commit_message)
+
+    @contextmanager
+    def batch(self, commit_message: str | None = None) -> Iterator["AgentHub"]:
+        """Collect uploads and deletes and push them as a single commit.
+
+        Nothing is pushed if the block raises.
+
+        Example:
+            ```python
+            with hub.batch("Publish agent"):
+                hub.upload_content("my_tool", tool_code, AgentHub.tools_dir)
+                hub.upload_content("my_agent", config_json, AgentHub.agents_dir)
+            ```
+        """
+        if self._batch is not None:
+            raise RuntimeError("A batch is already in progress")
+        self._batch = []
+        try:
+            yield self
+            staged = self._batch
+        finally:
+            self._batch = None
+        if staged:
+            operations, updates = zip(*staged, strict=True)
+            self._commit_with_manifest(
+                list(operations),
+                list(updates),
+                commit_message or f"Update {len(operations)} files",
+            )
+
+    def _commit_with_manifest(
+        self,
+        operations: list[CommitOperation],
+        manifest_updates: list[ManifestUpdate],
+        commit_message: str,
+    ) -> None:
+        """Commit operations together with the updated manifest.
+
+        The commit is based on the current head, so a concurrent change to the
+        repo makes it fail instead of silently dropping manifest entries.
+        Afterwards only the committed files are downloaded locally, provided
+        the head was the revision served.
+        """
+        head = self.remote_revision()
+        manifest = self._remote_manifest(head)
+        for update_manifest in manifest_updates:
+            update_manifest(manifest)
+        index = CommitOperationAdd(
+            path_in_repo=self.index_file,
+            path_or_fileobj=manifest.model_dump_json(indent=2).encode("utf-8"),
+        )
+        sha = self.backend.commit(
+            self.repo_id,
+            [*operations, index],
+            commit_message=commit_message,
+            revision=self.revision,
+            parent_commit=head,
+        )
+        self._advance_snapshot(
+            head,
+            sha,
+            changed_paths=[
+                op.path_in_repo
+                for op in [*operations, index]
+                if isinstance(op, CommitOperationAdd)
+            ],
+            stale_paths=[
+                op.path_in_repo
+                for op in operations
+                if isinstance(op, CommitOperationDelete)
+            ],
         )
 
+    def _advance_snapshot(
+        self,
+        parent: str,
+        revision: str,
+        changed_paths: Iterable[str],
+        stale_paths: Iterable[str] = (),
+        *,
+        files: dict[str, str] | None = None,
+        partial: bool = False,
+    ) -> str:
+        """Serve a new revision, fetching only the changed files if possible.
+
+        The changed files are only known relative to the parent revision, so
+        the revision is served through `_serve_local_or_download` if another
+        one is served. Cached objects built from unchanged files are carried
+        over to the new revision.
+
+        Args:
+            parent: Commit sha the changed paths are relative to.
+            revision: Commit sha of the new revision.
+            changed_paths: Files added or changed since the parent revision.
+            stale_paths: Other files of the parent revision not to reuse,
+                e.g. deleted ones.
+            files: Blob ids of the files of the new revision, if listed.
+            partial: Whether agents, tools or result types changed in the new
+                revision are left out, to be fetched on demand.
+
+        Returns:
+            The path to the new snapshot.
+        """
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if snapshot and snapshot.sha == revision:  # pragma: no cover
+            return snapshot.path
+        if (
+            snapshot is None
+            or snapshot.sha != parent
+            or not os.path.isdir(snapshot.path)
+        ):
+            return self._serve_local_or_download(revision)
+
+        changed, stale = set(changed_paths), set(stale_paths)
+        new_path = self.backend.advance(
+            self.repo_id, snapshot.path, revision, changed, stale
+        )
+        self._carry_over_cache(snapshot.sha, revision, (changed | stale).__contains__)
+        partial = snapshot.partial or partial
+        if not partial:
+            self.backend.mark_complete(new_path)
+        self._update_ref(new_path, revision)
+        self._snapshots[self._snapshot_key] = Snapshot(
+            sha=revision,
+            path=new_path,
+            checked_at=time.time(),
+            partial=partial,
+            files=files,
+        )
+        return new_path
+
+    def sync(self, revision: str | None = None) -> str:
+        """Serve a revision right away, e.g. when notified of an update.
+
+        Args:
+            revision: Commit sha to serve. Defaults to the head of the repo.
+
+        Returns:
+            The path to the served snapshot.
+        """
+        revision = revision or self.remote_revision()
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if snapshot and snapshot.sha == revision:
+            snapshot.checked_at = time.time()
+            return snapshot.path
+        return self._serve_local_or_download(revision)
+
+    def _fetch(self, revision: str | None) -> str:
+        """Download a revision, fetching only the files changed since the served one.
+
+        The changed files are found by comparing the blob ids of the repo
+        trees of both revisions, so commits made outside this client are
+        picked up too. Revisions are downloaded in full if the backend cannot
+        list the trees.
+        """
+        if self.offline:
+            raise self._offline_miss(f"Revision {revision}")
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if snapshot is None or revision is None:
+            return self.download_files(revision=revision)
+        old = self._file_ids(snapshot)
+        new = self.backend.file_ids(self.repo_id, revision)
+        if old is None or new is None:
+            return self.download_files(revision=revision)
+        changed = {path for path, blob_id in new.items() if old.get(path) != blob_id}
+        # The snapshot is shared by the hubs of the repo whatever their scope,
+        # so changes out of this hub's scope are left to be fetched on demand
+        fetched = self._matching(changed, self.scope_patterns(revision))
+        left_out = changed - fetched
+        return self._advance_snapshot(
+            snapshot.sha,
+            revision,
+            changed_paths=fetched,
+            stale_paths=left_out | (old.keys() - new.keys()),
+            files=new,
+            partial=bool(self._matching(left_out, self._section_patterns)),
+        )
+
+    @staticmethod
+    def _matching(paths: Iterable[str], patterns: list[str]) -> set[str]:
+        """Get the paths matching any of the glob patterns."""
+        return {
+            path
+            for path in paths
+            if any(fnmatch(path, pattern) for pattern in patterns)
+        }
+
+    def _file_ids(self, snapshot: Snapshot) -> dict[str, str] | None:
+        """Get the blob ids of the files of a snapshot, listing them once."""
+        if snapshot.files is None:
+            snapshot.files = self.backend.file_ids(self.repo_id, snapshot.sha)
+        return snapshot.files
+
+    def _path_in_repo(self, subdir: str, name: str) -> str:
+        """Get the path in the repo of a cached object."""
+        if not subdir:
+            # The manifest is cached as ("", "index")
+            return self.index_file
+        extension = ".json" if subdir == self.agents_dir else ".py"
+        return f"{subdir}/{name}{extension}"
+
+    def _keep_warm(self, previous: Snapshot, revision: str, path: str) -> None:
+        """Carry over the cached objects of files identical in a new snapshot.
+
+        The files of both snapshots are compared, since the index may not
+        reflect commits made outside this client.
+        """
+        if os.path.normpath(previous.path) == os.path.normpath(path):
+            # Modified in place, the previous content is gone
+            return
+        self._carry_over_cache(
+            previous.sha,
+            revision,
+            lambda path_in_repo: (
+                not _same_file(
+                    os.path.join(previous.path, *path_in_repo.split("/")),
+                    os.path.join(path, *path_in_repo.split("/")),
+                )
+            ),
+        )
+
+    def _carry_over_cache(
+        self, old_revision: str, new_revision: str, is_stale: Callable[[str], bool]
+    ) -> None:
+        """Reuse the cached objects of files unchanged between two revisions.
+
+        Args:
+            old_revision: Revision the objects were cached for.
+            new_revision: Revision to cache them for.
+            is_stale: Whether a file, by path in the repo, changed in between.
+        """
+        for key, value in self._cache.items():
+            if key[:2] == (self.repo_id, old_revision) and not is_stale(
+                self._path_in_repo(*key[2:])
+            ):
+                self._cache.set((self.repo_id, new_revision, *key[2:]), value)
+
+    def rebuild_manifest(self) -> None:
+        """Rebuild the manifest from the repo files and commit it.
+
+        Use this to add a manifest to an existing repo.
+        """
+
+        def rebuild(manifest: Manifest) -> None:
+            path = self.backend.snapshot(
+                self.repo_id, self.revision, allow_patterns=self._section_patterns
+            )
+            rebuilt = Manifest.from_directory(path)
+            for section in SECTIONS:
+                setattr(manifest, section, rebuilt.section(section))
+
+        self._commit_with_manifest([], [rebuild], commit_message="Rebuild index")
+
     def load_config(self, filename: str) -> dict:
         """Load a config from the Hugging Face Hub."""
         if not filename:  # pragma: no cover
             return {}
-        file_path = self.get_file_path(filename, self.agents_dir)
+        config = self._load_cached(filename, self.agents_dir, self._read_json)
+        return copy.deepcopy(config)
 
+    @staticmethod
+    def _read_json(file_path: str) -> dict:
+        """Read a JSON file."""
         with open(file_path) as file:
             return json.load(file)
 
@@ -124,24 +907,32 @@ class AgentHub:
         if not filename:  # pragma: no cover
             return None
         name_without_extension = filename.split(".")[0]
-        file_path = self.get_file_path(filename, self.tools_dir)
-        module = self._load_module(name_without_extension, file_path)
-        func = getattr(module, name_without_extension)
-        assert callable(func)
 
-        return func
+        def loader(file_path: str) -> Callable:
+            module = self._load_module(
+                name_without_extension, file_path, self.tools_dir
+            )
+            func = getattr(module, name_without_extension)
+            assert callable(func)
+            return func
+
+        return self._load_cached(filename, self.tools_dir, loader)
 
     def load_result_type(self, filename: str) -> type[BaseModel] | None:
         """Load a result type from the Hugging Face Hub."""
         if not filename:  # pragma: no cover
             return None
         name_without_extension = filename.split(".")[0]
-        file_path = self.get_file_path(filename, self.result_types_dir)
-        module = self._load_module(name_without_extension, file_path)
-        model = getattr(module, name_without_extension)
-        assert isinstance(model, type) and issubclass(model, BaseModel)
 
-        return model
+        def loader(file_path: str) -> type[BaseModel]:
+            module = self._load_module(
+                name_without_extension, file_path, self.result_types_dir
+            )
+            model = getattr(module, name_without_extension)
+            assert isinstance(model, type) and issubclass(model, BaseModel)
+            return model
+
+        return self._load_cached(filename, self.result_types_dir, loader)
 
     def upload_content(
         self,
@@ -162,29 +953,103 @@ class AgentHub:
 
         filename = self._check_extension(filename, extension)
 
-        upload_file(
-            path_or_fileobj=content.encode("utf-8"),
-            path_in_repo=f"{subdir}/{filename}",
-            repo_id=self.repo_id,
-            repo_type=self.repo_type,
+        self._stage(
+            CommitOperationAdd(
+                path_in_repo=f"{subdir}/{filename}",
+                path_or_fileobj=content.encode("utf-8"),
+            ),
+            lambda manifest: manifest.update(subdir, filename.split(".")[0], content),
             commit_message=f"Update {filename}",
         )
 
+    def upload_directory(self, path: str, commit_message: str | None = None) -> int:
+        """Upload the agents, tools and result types of a local directory.
+
+        The directory must follow the repo layout, and all files are pushed
+        as a single commit.
+
+        Returns:
+            The number of uploaded files.
+        """
+        count = 0
+        with self.batch(commit_message or f"Publish {os.path.basename(path)}"):
+            for subdir in SECTIONS:
+                subdir_path = os.path.join(path, subdir)
+                if not os.path.isdir(subdir_path):
+                    continue
+                extension = ".json" if subdir == self.agents_dir else ".py"
+                for filename in sorted(os.listdir(subdir_path)):
+                    file_path = os.path.join(subdir_path, filename)
+                    if not filename.endswith(extension) or not os.path.isfile(
+                        file_path
+                    ):
+                        continue
+                    with open(file_path) as file:
+                        self.upload_content(filename, file.read(), subdir)
+                    count += 1
+        return count
+
     def list_files(self, subdir: str) -> list[str]:
-        """List all files in the Hugging Face Hub."""
-        repo_dir = snapshot_download(
-            repo_id=self.repo_id, repo_type=self.repo_type, local_files_only=True
+        """List the names of the files in a subdirectory of the repo.
+
+        The served snapshot is listed, or the repo tree if the snapshot is
+        partial, so files committed without updating the index are listed
+        too. Partial snapshots are listed from the index if the hub is
+        offline or the backend cannot list trees.
+        """
+        path, _ = self._served()
+        snapshot = self._snapshots.get(self._snapshot_key)
+        if snapshot and snapshot.partial:
+            files = None if self.offline else self._file_ids(snapshot)
+            if files is None:
+                return self.load_manifest().names(subdir)
+            filenames = [
+                filename
+                for parent, _, filename in (p.rpartition("/") for p in files)
+                if parent == subdir
+            ]
+        else:
+            subdir_path = os.path.join(path, subdir)
+            if not os.path.isdir(subdir_path):
+                return []
+            filenames = [
+                filename
+                for filename in os.listdir(subdir_path)
+                if os.path.isfile(os.path.join(subdir_path, filename))
+            ]
+        return sorted({filename.split(".")[0] for filename in filenames})
+
+    async def aload_config(self, filename: str) -> dict:
+        """Load a config without blocking the event loop."""
+        if not filename:  # pragma: no cover
+            return {}
+        config = await self._flights.ado(
+            ("load", *self._snapshot_key, self.agents_dir, filename),
+            lambda: self._load_cached(filename, self.agents_dir, self._read_json),
+        )
+        return copy.deepcopy(config)
+
+    async def aload_tool(self, filename: str) -> Callable | None:
+        """Load a tool without blocking the event loop."""
+        return await self._flights.ado(
+            ("load", *self._snapshot_key, self.tools_dir, filename),
+            lambda: self.load_tool(filename),
         )
-        subdir_path = os.path.join(repo_dir, subdir)
 
-        if not os.path.exists(subdir_path):
-            return []
+    async def aload_result_type(self, filename: str) -> type[BaseModel] | None:
+        """Load a result type without blocking the event loop."""
+        return await self._flights.ado(
+            ("load", *self._snapshot_key, self.result_types_dir, filename),
+            lambda: self.load_result_type(filename),
+        )
 
-        if not os.path.isdir(subdir_path):
-            return []
+    async def alist_files(self, subdir: str) -> list[str]:
+        """List files without blocking the event loop."""
+        names = await self._flights.ado(
+            ("list", *self._snapshot_key, subdir), lambda: self.list_files(subdir)
+        )
+        return list(names)
 
-        return [
-            f.split(".")[0]
-            for f in os.listdir(subdir_path)
-            if os.path.isfile(os.path.join(subdir_path, f))
-        ]
+    async def aupload_content(self, filename: str, content: str, subdir: str) -> None:
+        """Upload a file without blocking the event loop."""
+        await asyncio.to_thread(self.upload_content, filename, content, subdir)
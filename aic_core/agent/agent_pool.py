@@ -0,0 +1,135 @@
+"""Process-wide pool of built agents."""
+
+import time
+from dataclasses import dataclass
+from pydantic_ai import Agent
+from aic_core.agent.agent import AgentConfig, AgentFactory
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.cache import LRUCache, SingleFlight
+from aic_core.agent.manifest import content_hash
+from aic_core.logging import get_logger
+
+
+logger = get_logger(__name__)
+PoolKey = tuple[str, str, str | None, str, str | None]
+"""(repo_id, agent_name, revision pin, config hash, credentials identity)."""
+
+
+@dataclass
+class PooledAgent:
+    """Agent held by the pool."""
+
+    agent: Agent
+    """The built agent."""
+    revision: str
+    """Commit sha of the repo the agent was built from."""
+    last_used: float
+    """Time the agent was last handed out."""
+
+
+class AgentPool:
+    """Share built agents across sessions and entry points.
+
+    Building an agent loads its tools and result types and sets up the model
+    provider and MCP servers. The pool builds each agent once and hands out
+    the same instance until its config or the served revision of its repo
+    changes, it stays idle for `idle_timeout` seconds, or more than `maxsize`
+    agents are pooled.
+
+    Example:
+        ```python
+        agent = AgentPool.get(repo_id, "my_agent")
+        ```
+    """
+
+    maxsize: int = 32
+    """Maximum number of pooled agents."""
+    idle_timeout: float = 1800
+    """Seconds after which an unused agent is evicted."""
+
+    _agents: LRUCache = LRUCache(maxsize=maxsize)
+    """Pooled agents by pool key."""
+    _flights: SingleFlight = SingleFlight()
+    """Concurrent builds of the same agent, deduplicated."""
+
+    @staticmethod
+    def fingerprint(config: AgentConfig) -> str:
+        """Hash of an agent config."""
+        return content_hash(config.model_dump_json())
+
+    @staticmethod
+    def credentials_id(api_key: str | None) -> str | None:
+        """Identity of an API key that does not reveal the key."""
+        return content_hash(api_key)[:16] if api_key else None
+
+    @classmethod
+    def get(
+        cls,
+        repo_id: str,
+        agent_name: str,
+        api_key: str | None = None,
+        revision: str | None = None,
+    ) -> Agent:
+        """Get a ready agent, building it if needed.
+
+        Args:
+            repo_id: The repo ID.
+            agent_name: Name of the agent config in the repo.
+            api_key: API key of the model provider. Defaults to the environment.
+            revision: Revision of the repo to pin.
+        """
+        cls.evict_idle()
+        hub = AgentHub(repo_id, revision=revision, agent_name=agent_name)
+        config = AgentConfig(**hub.load_config(agent_name))
+        served = hub._current_revision()
+        key: PoolKey = (
+            repo_id,
+            agent_name,
+            revision,
+            cls.fingerprint(config),
+            cls.credentials_id(api_key),
+        )
+        pooled = cls._agents.get(key)
+        if pooled is None or pooled.revision != served:
+            pooled = cls._flights.do(
+                (key, served), lambda: cls._build(key, config, served, api_key)
+            )
+        pooled.last_used = time.monotonic()
+        return pooled.agent
+
+    @classmethod
+    def _build(
+        cls, key: PoolKey, config: AgentConfig, revision: str, api_key: str | None
+    ) -> PooledAgent:
+        """Build an agent and add it to the pool."""
+        logger.info(f"Building agent {key[1]} of {key[0]}@{revision}")
+        agent = AgentFactory(config, revision=key[2]).create_agent(api_key)
+        pooled = PooledAgent(agent=agent, revision=revision, last_used=time.monotonic())
+        cls._agents.maxsize = cls.maxsize
+        cls._agents.set(key, pooled)
+        return pooled
+
+    @classmethod
+    def evict_idle(cls) -> int:
+        """Evict the agents unused for `idle_timeout` seconds.
+
+        Returns:
+            The number of evicted agents.
+        """
+        deadline = time.monotonic() - cls.idle_timeout
+        idle = {
+            key for key, pooled in cls._agents.items() if pooled.last_used < deadline
+        }
+        return cls._agents.evict(idle.__contains__) if idle else 0
+
+    @classmethod
+    def invalidate(cls, repo_id: str | None = None) -> int:
+        """Evict the agents of a repo, e.g. after changing their tools in place.
+
+        Args:
+            repo_id: The repo ID. Defaults to all repos.
+
+        Returns:
+            The number of evicted agents.
+        """
+        return cls._agents.evict(lambda key: repo_id is None or key[0] == repo_id)
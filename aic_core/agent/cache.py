@@ -0,0 +1,165 @@
+"""In-process caches shared by the agent hub."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+
+T = TypeVar("T")
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache.
+
+    Values are evicted in least-recently-used order once `maxsize` is reached.
+    `None` is never stored so that `get` can use it to signal a miss.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        """Initialise the cache."""
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of cached entries."""
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether the key is cached."""
+        return key in self._data
+
+    def get(self, key: Hashable) -> Any | None:
+        """Get a value and mark it as recently used."""
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Set a value, evicting the least recently used entries if needed."""
+        if value is None:  # pragma: no cover
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self) -> list[tuple[Any, Any]]:
+        """Get a snapshot of the cached items, without marking them as used."""
+        with self._lock:
+            return list(self._data.items())
+
+    def evict(self, predicate: Callable[[Any], bool]) -> int:
+        """Evict all entries whose key matches the predicate.
+
+        Returns:
+            The number of evicted entries.
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls with the same key.
+
+    The first caller of a key runs the function, and callers arriving while it
+    runs wait for and share its result or exception. Works across threads and
+    event loops, since waiters only hold a `concurrent.futures.Future`.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the call registry."""
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        """Get the future of the call in flight, and whether the caller leads."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, call: Callable[[], T]) -> T:
+        """Run the call and publish its outcome to the waiters."""
+        try:
+            result = call()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        """Run the call, or wait for the one in flight with the same key."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        return self._finish(key, future, call)
+
+    async def ado(self, key: Hashable, call: Callable[[], T]) -> T:
+        """Run the blocking call in a worker thread, deduplicated by key.
+
+        Waiters do not take a worker thread.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        return await asyncio.to_thread(self._finish, key, future, call)
+
+
+class NegativeCache:
+    """Thread-safe record of lookups known to fail, for a limited time.
+
+    The error of a failed lookup is kept for `ttl` seconds so that it can be
+    raised again without repeating the lookup.
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 1024) -> None:
+        """Initialise the cache.
+
+        Args:
+            ttl: Seconds a failure is remembered for.
+            maxsize: Maximum number of remembered failures.
+        """
+        self.ttl = ttl
+        self._errors = LRUCache(maxsize)
+
+    def add(self, key: Hashable, error: Exception) -> None:
+        """Remember that the lookup of a key failed."""
+        self._errors.set(key, (time.monotonic() + self.ttl, error))
+
+    def get(self, key: Hashable) -> Exception | None:
+        """Get the error of a recent failed lookup, if any."""
+        entry = self._errors.get(key)
+        if entry is None:
+            return None
+        expires_at, error = entry
+        if time.monotonic() >= expires_at:
+            self._errors.evict(lambda k: k == key)
+            return None
+        return error
+
+    def clear(self) -> None:
+        """Forget all failures."""
+        self._errors.clear()
@@ -0,0 +1,90 @@
+"""Tools that load their implementation on the first call."""
+
+import asyncio
+import inspect
+import threading
+from collections.abc import Callable
+from dataclasses import replace
+from typing import Any
+from pydantic import ValidationError, validate_call
+from pydantic_ai import ModelRetry, RunContext, Tool
+from pydantic_ai.tools import ToolDefinition
+
+
+class LazyTool(Tool):
+    """Tool described by its metadata, whose function is loaded when first called.
+
+    Building an agent then costs nothing per tool: the name, description and
+    JSON schema of the parameters are all the model needs until it calls the
+    tool. The tool is built through the public `Tool` API, with a `prepare`
+    function that describes the parameters from the schema. Arguments are
+    validated against the loaded function's signature, and invalid ones make
+    the model retry.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str | None,
+        parameters_json_schema: dict,
+        loader: Callable[[], Callable],
+        max_retries: int = 1,
+    ) -> None:
+        """Initialise the tool.
+
+        Args:
+            name: Name of the tool.
+            description: Description of the tool.
+            parameters_json_schema: JSON schema of the function parameters.
+            loader: Loads the tool function.
+            max_retries: Maximum number of retries of the tool. Unlike for
+                `Tool`, it cannot be left to the agent default.
+        """
+        super().__init__(
+            self._call,
+            takes_ctx=False,
+            max_retries=max_retries,
+            name=name,
+            prepare=self._prepare,
+        )
+        self.description = description or ""
+        self.parameters_json_schema = parameters_json_schema
+        self._loader = loader
+        self._function: Callable | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the function has been loaded."""
+        return self._function is not None
+
+    def load(self) -> Callable:
+        """Load the function, once, wrapped to validate its arguments."""
+        with self._lock:
+            if self._function is None:
+                self._function = validate_call(self._loader())
+            return self._function
+
+    async def _prepare(
+        self, ctx: RunContext[Any], tool_def: ToolDefinition
+    ) -> ToolDefinition:
+        """Describe the tool from its metadata."""
+        return replace(
+            tool_def,
+            description=self.description,
+            parameters_json_schema=self.parameters_json_schema,
+        )
+
+    async def _call(self, **kwargs: Any) -> Any:
+        """Load the function in a worker thread if needed, then call it."""
+        function = (
+            self._function
+            if self._function is not None
+            else await asyncio.to_thread(self.load)
+        )
+        try:
+            if inspect.iscoroutinefunction(function):
+                return await function(**kwargs)
+            return await asyncio.to_thread(function, **kwargs)
+        except ValidationError as e:
+            raise ModelRetry(str(e)) from e
@@ -0,0 +1,124 @@
+"""Cross-process locks coordinating the refresh of hub snapshots."""
+
+import os
+import re
+import time
+from filelock import FileLock, Timeout
+from huggingface_hub.constants import HF_HUB_CACHE
+from aic_core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def default_lock_dir() -> str:
+    """Directory of the refresh locks, next to the Hugging Face Hub cache."""
+    return os.path.join(os.path.dirname(HF_HUB_CACHE), "aic_locks")
+
+
+class RefreshLock:
+    """File lock held by the one process refreshing a repo snapshot.
+
+    The lock is released by the OS when its holder dies. A holder that hangs
+    is detected by the age of a stamp file it writes on acquisition: after
+    `stale_after` seconds the lock file is replaced, so that the next process
+    can take over. The lock file itself cannot be used, since every attempt to
+    acquire it touches it.
+    """
+
+    def __init__(self, path: str, stale_after: float = 300) -> None:
+        """Initialise the lock.
+
+        Args:
+            path: Path to the lock file.
+            stale_after: Seconds after which a held lock is considered stale.
+        """
+        self.path = path
+        self.stamp_path = f"{path}.stamp"
+        self.stale_after = stale_after
+        self.poll_interval = 1.0
+        """Seconds between staleness checks while waiting."""
+        self._lock = FileLock(path)
+
+    @classmethod
+    def for_repo(
+        cls, repo_id: str, lock_dir: str | None = None, stale_after: float = 300
+    ) -> "RefreshLock":
+        """Get the refresh lock of a repo."""
+        name = re.sub(r"[^\w.-]", "_", repo_id.replace("/", "--"))
+        return cls(
+            os.path.join(lock_dir or default_lock_dir(), f"{name}.lock"), stale_after
+        )
+
+    def _break_if_stale(self) -> bool:
+        """Remove the held lock file if it was acquired too long ago.
+
+        Returns:
+            Whether the lock file was removed.
+        """
+        try:
+            age = time.time() - os.stat(self.stamp_path).st_mtime
+        except FileNotFoundError:
+            return False
+        if age <= self.stale_after:
+            return False
+        logger.warning(f"Breaking stale refresh lock {self.path}")
+        for path in (self.path, self.stamp_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # pragma: no cover
+                pass
+        return True
+
+    def _open(self) -> int:
+        """Open the file at `path`, to tell later whether it was replaced."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        return os.open(self.path, os.O_RDONLY | os.O_CREAT)
+
+    def _is_current(self, fd: int) -> bool:
+        """Whether a file opened from `path` is still the file at `path`."""
+        try:
+            return os.path.samestat(os.fstat(fd), os.stat(self.path))
+        except FileNotFoundError:
+            return False
+
+    def acquire(self, timeout: float = 0) -> bool:
+        """Try to acquire the lock.
+
+        Args:
+            timeout: Seconds to wait for the holder. Zero makes a single attempt.
+
+        Returns:
+            Whether the lock was acquired.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(deadline - time.monotonic(), 0)
+            fd = self._open()
+            try:
+                self._lock.acquire(timeout=min(remaining, self.poll_interval))
+            except Timeout:
+                os.close(fd)
+                if self._break_if_stale():
+                    continue
+                if time.monotonic() >= deadline:
+                    return False
+                continue
+            # The locked file was opened after fd, so it is the file at `path`
+            # if fd still is. Holding fd open keeps its inode from being reused.
+            current = self._is_current(fd)
+            os.close(fd)
+            if current:
+                with open(self.stamp_path, "w") as file:
+                    file.write(str(os.getpid()))
+                return True
+            # The file was replaced while acquiring it
+            self._lock.release()
+
+    def release(self) -> None:
+        """Release the lock."""
+        try:
+            os.remove(self.stamp_path)
+        except FileNotFoundError:  # pragma: no cover
+            pass
+        self._lock.release()
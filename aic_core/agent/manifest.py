@@ -0,0 +1,350 @@
+"""Manifest index of the files in an agent hub repo."""
+
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Literal
+from pydantic import BaseModel
+
+
+MANIFEST_VERSION = 1
+SECTIONS = ("agents", "tools", "result_types")
+
+
+JSON_TYPES = {
+    "str": "string",
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+}
+
+
+def _annotation_schema(node: ast.expr) -> dict | None:
+    """JSON schema of a type annotation, if it only uses built-in types."""
+    schema: dict | None = None
+    match node:
+        case ast.Name(id=name) if name in JSON_TYPES:
+            schema = {"type": JSON_TYPES[name]}
+        case ast.Constant(value=None):
+            schema = {"type": "null"}
+        case ast.BinOp(left=left, op=ast.BitOr(), right=right):
+            options = [_annotation_schema(left), _annotation_schema(right)]
+            if all(options):
+                schema = {
+                    "anyOf": [
+                        item
+                        for option in options
+                        for item in option.get("anyOf", [option])  # type: ignore[union-attr]
+                    ]
+                }
+        case ast.Subscript(value=ast.Name(id="list"), slice=items):
+            items_schema = _annotation_schema(items)
+            if items_schema:
+                schema = {"items": items_schema, "type": "array"}
+        case ast.Subscript(
+            value=ast.Name(id="dict"),
+            slice=ast.Tuple(elts=[ast.Name(id="str"), values]),
+        ):
+            values_schema = _annotation_schema(values)
+            if values_schema:
+                schema = {"additionalProperties": values_schema, "type": "object"}
+    return schema
+
+
+def _docstring_style(docstring: str) -> Literal["google", "numpy", "sphinx"]:
+    """Guess the style of a docstring, defaulting to Google style."""
+    if re.search(r"^\s*:(param|arg|returns?|raises?)\b", docstring, re.MULTILINE):
+        return "sphinx"
+    if re.search(r"^\s*-{3,}\s*$", docstring, re.MULTILINE):
+        return "numpy"
+    return "google"
+
+
+def docstring_descriptions(docstring: str) -> tuple[str, dict[str, str]]:
+    """Describe a tool and its parameters from its docstring, like pydantic_ai.
+
+    Returns:
+        The description, with the returns section appended as XML, and the
+        descriptions of the parameters by name.
+    """
+    from griffe import Docstring, DocstringSectionKind
+
+    style = _docstring_style(docstring)
+    parsed = Docstring(
+        docstring,
+        lineno=1,
+        parser=style,
+        parser_options={"returns_named_value": False, "returns_multiple_items": False}
+        if style == "google"
+        else None,
+    )
+    # Parameter types are in the signature, not the docstring
+    griffe_logger = logging.getLogger("griffe")
+    level = griffe_logger.level
+    griffe_logger.setLevel(logging.ERROR)
+    try:
+        sections: dict[DocstringSectionKind, Any] = {}
+        for section in parsed.parse():
+            sections.setdefault(section.kind, section.value)
+    finally:
+        griffe_logger.setLevel(level)
+
+    description = sections.get(DocstringSectionKind.text, "")
+    parameters = {
+        param.name: param.description
+        for param in sections.get(DocstringSectionKind.parameters, [])
+    }
+    if returns := sections.get(DocstringSectionKind.returns):
+        type_tag = (
+            f"<type>{returns[0].annotation}</type>\n" if returns[0].annotation else ""
+        )
+        returns_xml = (
+            f"<returns>\n{type_tag}<description>{returns[0].description}"
+            "</description>\n</returns>"
+        )
+        description = (
+            f"<summary>{description}</summary>\n{returns_xml}"
+            if description
+            else returns_xml
+        )
+    return description, parameters
+
+
+def parameters_schema(
+    node: ast.FunctionDef | ast.AsyncFunctionDef,
+    descriptions: dict[str, str] | None = None,
+) -> dict | None:
+    """JSON schema of the parameters of a tool function, without executing it.
+
+    Args:
+        node: The function definition.
+        descriptions: Descriptions of the parameters by name.
+
+    Returns:
+        The schema, or None if a parameter is not annotated with built-in
+        types, in which case only the loaded function can tell.
+    """
+    args = node.args
+    if args.posonlyargs or args.vararg or args.kwarg:
+        return None
+    params = [*args.args, *args.kwonlyargs]
+    defaults = [
+        *[None] * (len(args.args) - len(args.defaults)),
+        *args.defaults,
+        *args.kw_defaults,
+    ]
+    properties, required = {}, []
+    for param, default in zip(params, defaults, strict=True):
+        schema = _annotation_schema(param.annotation) if param.annotation else None
+        if schema is None:
+            return None
+        if descriptions and param.arg in descriptions:
+            schema = {"description": descriptions[param.arg], **schema}
+        properties[param.arg] = schema
+        if default is None:
+            required.append(param.arg)
+    return {
+        "additionalProperties": False,
+        "properties": properties,
+        "required": required,
+        "type": "object",
+    }
+
+
+def _binding(tree: ast.Module, name: str) -> ast.stmt | None:
+    """Get the last top-level statement of a module that binds a name."""
+    binding = None
+    for node in tree.body:
+        match node:
+            case ast.FunctionDef() | ast.AsyncFunctionDef() | ast.ClassDef():
+                names = {node.name}
+            case ast.Assign(targets=targets):
+                names = {t.id for t in targets if isinstance(t, ast.Name)}
+            case ast.AnnAssign(target=ast.Name(id=target), value=value) if value:
+                names = {target}
+            case ast.ImportFrom(names=aliases):
+                names = {alias.asname or alias.name for alias in aliases}
+            case _:
+                continue
+        if name in names:
+            binding = node
+    return binding
+
+
+def content_hash(content: str | bytes) -> str:
+    """SHA-256 hex digest of a file content."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class ToolEntry(BaseModel):
+    """Manifest entry of a tool or result type."""
+
+    name: str
+    """Name of the function or Pydantic model."""
+    sha256: str
+    """SHA-256 of the source file."""
+    signature: str | None = None
+    """Signature of the function, or fields of the model."""
+    description: str | None = None
+    """Description of the function as pydantic_ai derives it from the
+    docstring, or docstring of the model."""
+    parameters: dict | None = None
+    """JSON schema of the function parameters, with their descriptions, if
+    they use built-in types."""
+    bound: bool = False
+    """Whether the name is bound by an assignment or an import, e.g.
+    `add = _add`, rather than defined by the file."""
+
+    @classmethod
+    def from_source(cls, name: str, source: str) -> "ToolEntry":
+        """Build an entry by parsing, not executing, the source code.
+
+        Names assigned a function or class of the file, e.g. `add = _add`,
+        are described by it. Other assigned or imported names are only
+        recorded as bound.
+        """
+        entry = cls(name=name, sha256=content_hash(source))
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return entry
+        definitions = {
+            node.name: node
+            for node in tree.body
+            if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef)
+        }
+        node = _binding(tree, name)
+        if isinstance(node, ast.Assign | ast.AnnAssign):
+            entry.bound = True
+            if isinstance(node.value, ast.Name):
+                node = definitions.get(node.value.id, node)
+        elif isinstance(node, ast.ImportFrom):
+            entry.bound = True
+        if isinstance(node, ast.ClassDef):
+            fields = [
+                ast.unparse(stmt.target) + ": " + ast.unparse(stmt.annotation)
+                for stmt in node.body
+                if isinstance(stmt, ast.AnnAssign)
+            ]
+            entry.signature = f"({', '.join(fields)})"
+            entry.description = ast.get_docstring(node)
+        elif isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef):
+            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+            entry.signature = f"({ast.unparse(node.args)}){returns}"
+            docstring = ast.get_docstring(node)
+            descriptions: dict[str, str] = {}
+            if docstring:
+                entry.description, descriptions = docstring_descriptions(docstring)
+            entry.parameters = parameters_schema(node, descriptions)
+        return entry
+
+
+class AgentEntry(BaseModel):
+    """Manifest entry of an agent config."""
+
+    name: str
+    """Name of the agent config file."""
+    sha256: str
+    """SHA-256 of the config file."""
+    model: str | None = None
+    """Model name of the agent."""
+    result_type: list[str] = []
+    """Result types of the agent."""
+    known_tools: list[str] = []
+    """Hub tools of the agent."""
+    hf_tools: list[str] = []
+    """Hugging Face tools of the agent."""
+    mcp_servers: list[str] = []
+    """MCP servers of the agent."""
+
+    @classmethod
+    def from_source(cls, name: str, source: str) -> "AgentEntry":
+        """Build an entry from the JSON config."""
+        entry = cls(name=name, sha256=content_hash(source))
+        try:
+            config = json.loads(source)
+        except json.JSONDecodeError:
+            return entry
+        fields = {key: config[key] for key in cls.model_fields if key in config}
+        return entry.model_copy(update=fields)
+
+
+class Manifest(BaseModel):
+    """Index of the agents, tools and result types in a repo.
+
+    The manifest is stored as `index.json` at the root of the repo and kept up
+    to date by `AgentHub.upload_content` and `AgentHub.delete_file`, so that
+    listing and searching never touch the individual files.
+    """
+
+    version: int = MANIFEST_VERSION
+    """Version of the manifest format."""
+    agents: dict[str, AgentEntry] = {}
+    """Agent configs by name."""
+    tools: dict[str, ToolEntry] = {}
+    """Tools by name."""
+    result_types: dict[str, ToolEntry] = {}
+    """Result types by name."""
+
+    def section(self, subdir: str) -> dict:
+        """Get the entries of a repo subdirectory."""
+        if subdir not in SECTIONS:
+            return {}
+        return getattr(self, subdir)
+
+    def names(self, subdir: str) -> list[str]:
+        """List the entry names of a repo subdirectory."""
+        return list(self.section(subdir))
+
+    def get(self, subdir: str, name: str) -> AgentEntry | ToolEntry | None:
+        """Get an entry by subdirectory and name."""
+        return self.section(subdir).get(name)
+
+    def update(self, subdir: str, name: str, content: str) -> None:
+        """Add or replace the entry of a file."""
+        if subdir not in SECTIONS:
+            raise ValueError(f"Invalid type: {subdir}")
+        entry_cls: type[AgentEntry | ToolEntry] = (
+            AgentEntry if subdir == "agents" else ToolEntry
+        )
+        self.section(subdir)[name] = entry_cls.from_source(name, content)
+
+    def remove(self, subdir: str, name: str) -> bool:
+        """Remove the entry of a file.
+
+        Returns:
+            Whether an entry was removed.
+        """
+        return self.section(subdir).pop(name, None) is not None
+
+    def search(self, query: str) -> list[AgentEntry | ToolEntry]:
+        """Find entries whose name or description contains the query."""
+        query = query.lower()
+        return [
+            entry
+            for subdir in SECTIONS
+            for entry in self.section(subdir).values()
+            if query in entry.name.lower()
+            or query in (getattr(entry, "description", None) or "").lower()
+        ]
+
+    @classmethod
+    def from_directory(cls, path: str) -> "Manifest":
+        """Build a manifest by scanning a local snapshot of the repo."""
+        manifest = cls()
+        for subdir in SECTIONS:
+            subdir_path = os.path.join(path, subdir)
+            if not os.path.isdir(subdir_path):
+                continue
+            for filename in sorted(os.listdir(subdir_path)):
+                file_path = os.path.join(subdir_path, filename)
+                if not os.path.isfile(file_path):
+                    continue
+                with open(file_path) as file:
+                    manifest.update(subdir, filename.split(".")[0], file.read())
+        return manifest
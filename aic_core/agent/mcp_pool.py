@@ -0,0 +1,440 @@
+"""Process-wide pool of long-lived MCP server connections."""
+
+import asyncio
+import atexit
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, TypeVar
+from urllib.parse import urlparse
+import anyio
+import httpx
+from mcp.client.streamable_http import streamablehttp_client
+from pydantic_ai.mcp import MCPServer, MCPServerHTTP, MCPServerStdio
+from pydantic_ai.tools import ToolDefinition
+from aic_core.logging import get_logger
+
+
+logger = get_logger(__name__)
+T = TypeVar("T")
+ServerKey = tuple[str, tuple[str, ...], tuple[tuple[str, str], ...] | None]
+"""(command or URL, args, environment variables) of a server."""
+CONNECTION_ERRORS = (
+    anyio.BrokenResourceError,
+    anyio.ClosedResourceError,
+    anyio.EndOfStream,
+    httpx.TransportError,
+)
+"""Errors raised by requests to a server that is gone."""
+
+
+def is_url(command: str) -> bool:
+    """Whether a server entry is the URL of a network server."""
+    return urlparse(command).scheme in ("http", "https")
+
+
+def server_key(
+    command: str, args: Sequence[str] = (), env: dict[str, str] | None = None
+) -> ServerKey:
+    """Key of a server command line or URL in the pool."""
+    return command, tuple(args), tuple(sorted(env.items())) if env is not None else None
+
+
+@dataclass
+class MCPServerStreamableHTTP(MCPServer):
+    """MCP server that connects over the streamable HTTP transport."""
+
+    url: str
+    """The URL of the MCP endpoint, e.g. `http://localhost:8000/mcp`."""
+    headers: dict[str, Any] | None = None
+    """HTTP headers sent with each request."""
+    timeout: float = 30
+    """Seconds to wait for the HTTP requests."""
+    sse_read_timeout: float = 60 * 5
+    """Seconds to wait for new messages of an event stream."""
+
+    @asynccontextmanager
+    async def client_streams(self) -> AsyncIterator[Any]:
+        """Open the streams of a session with the server."""
+        async with streamablehttp_client(
+            self.url,
+            headers=self.headers,
+            timeout=timedelta(seconds=self.timeout),
+            sse_read_timeout=timedelta(seconds=self.sse_read_timeout),
+        ) as (read_stream, write_stream, _):
+            yield read_stream, write_stream
+
+    def _get_log_level(self) -> None:
+        """No log level is set."""
+        return None
+
+
+def build_server(key: ServerKey) -> MCPServer:
+    """Build the MCP server of a key.
+
+    URLs whose path ends with `/sse` use the SSE transport, other URLs the
+    streamable HTTP transport. Anything else is a command run over stdio.
+    """
+    command, args, env = key
+    if not is_url(command):
+        return MCPServerStdio(
+            command, list(args), env=dict(env) if env is not None else None
+        )
+    if urlparse(command).path.rstrip("/").endswith("/sse"):
+        return MCPServerHTTP(command)
+    return MCPServerStreamableHTTP(command)
+
+
+class MCPConnection:
+    """Connection to one MCP server, used on the event loop of the pool.
+
+    The server context is entered and exited by a single task, as the MCP
+    clients require, while requests are served from any task. A stdio server
+    runs as a subprocess of the connection; a network server keeps one
+    session, over keep-alive HTTP connections.
+    """
+
+    def __init__(self, key: ServerKey, max_concurrency: int) -> None:
+        """Initialise the connection.
+
+        Args:
+            key: Command line of the server.
+            max_concurrency: Maximum number of requests in flight.
+        """
+        self.key = key
+        self.starts = 0
+        """Number of times the server was started or connected to."""
+        self._server: MCPServer | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def running(self) -> bool:
+        """Whether the server was started and its session is open."""
+        return self._server is not None and not (
+            self._task is None or self._task.done()
+        )
+
+    async def start(self) -> MCPServer:
+        """Start the server unless it is running."""
+        async with self._start_lock:
+            if not self.running:
+                await self._spawn()
+            assert self._server is not None
+            return self._server
+
+    async def restart(self, server: MCPServer) -> MCPServer:
+        """Restart a server, unless another request already did."""
+        async with self._start_lock:
+            if self._server is server or not self.running:
+                await self.stop()
+                await self._spawn()
+            assert self._server is not None
+            return self._server
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Stop the server."""
+        task, self._task, self._server = self._task, None, None
+        if task is None:
+            return
+        self._stop.set()
+        await asyncio.wait({task}, timeout=timeout)
+        if not task.done():  # pragma: no cover
+            logger.warning(f"MCP server {self.key[0]} did not stop in {timeout}s")
+            task.cancel()
+
+    async def request(self, call: Callable[[MCPServer], Awaitable[T]]) -> T:
+        """Send a request, restarting the server once if it is gone."""
+        async with self._semaphore:
+            server = await self.start()
+            try:
+                return await self._until_gone(call(server), self._task)
+            except CONNECTION_ERRORS:
+                logger.warning(f"MCP server {self.key[0]} is gone, restarting it")
+                server = await self.restart(server)
+                return await self._until_gone(call(server), self._task)
+
+    async def check_health(self, timeout: float) -> bool:
+        """Ping the server, restarting it if it does not answer.
+
+        Returns:
+            Whether the server answered. Servers not started count as healthy.
+        """
+        server, task = self._server, self._task
+        if server is None or task is None:
+            return True
+        try:
+            # Listing the tools is the cheapest request of the public API
+            ping = self._until_gone(server.list_tools(), task)
+            await asyncio.wait_for(ping, timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP server {self.key[0]} failed its health check: {e!r}")
+        await self.restart(server)
+        return False
+
+    @staticmethod
+    async def _until_gone(request: Awaitable[T], task: asyncio.Task | None) -> T:
+        """Await a request, failing if the session task of the server ends first.
+
+        The clients do not answer the requests in flight when their session
+        fails, e.g. when a network server restarts.
+
+        Raises:
+            anyio.ClosedResourceError: If the session ended first.
+        """
+        future = asyncio.ensure_future(request)
+        try:
+            if task is not None:
+                await asyncio.wait({future, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not future.done():
+                raise anyio.ClosedResourceError
+            return await future
+        finally:
+            future.cancel()
+
+    async def _spawn(self) -> None:
+        """Start the server and wait until its session is initialised."""
+        server = build_server(self.key)
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._serve(server, ready, self._stop))
+        await ready
+        self._server = server
+        self.starts += 1
+        logger.info(f"Started MCP server {self.key[0]}")
+
+    async def _serve(
+        self, server: MCPServer, ready: asyncio.Future, stop: asyncio.Event
+    ) -> None:
+        """Keep the server context open until stopped."""
+        try:
+            async with server:
+                ready.set_result(None)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.debug(f"MCP server {self.key[0]} exited with {e!r}")
+        finally:
+            if not ready.done():  # pragma: no cover
+                ready.cancel()
+
+
+class MCPServerPool:
+    """Share MCP servers across agents, sessions and event loops.
+
+    Each distinct command line runs as one process, started on first use and
+    kept up until the interpreter exits. Each distinct URL gets one session
+    with a network server, which can itself serve many workers. Connections
+    are driven by an event loop in a daemon thread, so they outlive the event
+    loops of the requests. Running servers are pinged every `health_interval`
+    seconds, and restarted if they do not answer or when a request finds them
+    gone. At most `max_concurrency` requests are sent to a server at once.
+
+    Example:
+        ```python
+        servers = [
+            MCPServerPool.get("feedly-mcp"),
+            MCPServerPool.get("http://localhost:8000/mcp"),
+        ]
+        agent = Agent(model, mcp_servers=servers)
+        result = await agent.run(prompt)  # No need for `agent.run_mcp_servers()`
+        ```
+    """
+
+    max_concurrency: int = 4
+    """Maximum number of requests in flight per server."""
+    health_interval: float = 30
+    """Seconds between health checks of the running servers."""
+    health_timeout: float = 10
+    """Seconds a server has to answer a health check."""
+
+    _connections: dict[ServerKey, MCPConnection] = {}
+    """Connections by server command line."""
+    _loop: asyncio.AbstractEventLoop | None = None
+    """Event loop the connections run on."""
+    _thread: threading.Thread | None = None
+    """Thread running the event loop."""
+    _lock = threading.Lock()
+    """Guards the connections and the event loop."""
+    _exit_handler: bool = False
+    """Whether the pool is shut down at exit."""
+
+    @classmethod
+    def get(
+        cls, command: str, args: Sequence[str] = (), env: dict[str, str] | None = None
+    ) -> "PooledMCPServer":
+        """Get an MCP server for agents, served by the pool.
+
+        Args:
+            command: The command to run, or the URL of a network server.
+                URLs ending with `/sse` use the SSE transport, others the
+                streamable HTTP transport.
+            args: The arguments of the command.
+            env: The environment variables of the server process.
+        """
+        return PooledMCPServer(command, list(args), env)
+
+    @classmethod
+    def connection(cls, key: ServerKey) -> MCPConnection:
+        """Get the connection of a server, adding it if needed."""
+        with cls._lock:
+            connection = cls._connections.get(key)
+            if connection is None:
+                connection = MCPConnection(key, cls.max_concurrency)
+                cls._connections[key] = connection
+            return connection
+
+    @classmethod
+    async def request(
+        cls, key: ServerKey, call: Callable[[MCPServer], Awaitable[T]]
+    ) -> T:
+        """Send a request to a server from any event loop."""
+        return await cls.run(cls.connection(key).request(call))
+
+    @classmethod
+    async def run(cls, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the event loop of the pool."""
+        future = asyncio.run_coroutine_threadsafe(coroutine, cls._event_loop())
+        return await asyncio.wrap_future(future)
+
+    @classmethod
+    async def check_health(cls) -> list[ServerKey]:
+        """Ping the running servers, restarting those that do not answer.
+
+        Must run on the event loop of the pool, see `run`.
+
+        Returns:
+            The command lines of the restarted servers.
+        """
+        with cls._lock:
+            connections = list(cls._connections.values())
+        healthy = await asyncio.gather(
+            *(conn.check_health(cls.health_timeout) for conn in connections),
+            return_exceptions=True,
+        )
+        return [
+            conn.key
+            for conn, ok in zip(connections, healthy, strict=True)
+            if ok is not True
+        ]
+
+    @classmethod
+    def shutdown(cls, timeout: float = 10) -> None:
+        """Stop all server processes and the event loop of the pool."""
+        with cls._lock:
+            loop, thread = cls._loop, cls._thread
+            connections = list(cls._connections.values())
+            cls._loop = cls._thread = None
+            cls._connections.clear()
+        if loop is None or thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            cls._stop_all(connections, timeout), loop
+        )
+        try:
+            future.result(timeout * 2)
+        except Exception as e:  # pragma: no cover
+            logger.warning(f"Failed to stop the MCP servers: {e!r}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+    @classmethod
+    def _event_loop(cls) -> asyncio.AbstractEventLoop:
+        """Get the event loop of the pool, starting it if needed."""
+        with cls._lock:
+            if cls._loop is None:
+                loop = asyncio.new_event_loop()
+                cls._thread = threading.Thread(
+                    target=loop.run_forever, name="mcp-pool", daemon=True
+                )
+                cls._thread.start()
+                asyncio.run_coroutine_threadsafe(cls._monitor_health(), loop)
+                cls._loop = loop
+                if not cls._exit_handler:
+                    atexit.register(cls.shutdown)
+                    cls._exit_handler = True
+            return cls._loop
+
+    @classmethod
+    async def _monitor_health(cls) -> None:
+        """Check the health of the servers every `health_interval` seconds."""
+        while True:
+            await asyncio.sleep(cls.health_interval)
+            for key in await cls.check_health():
+                logger.info(f"Restarted MCP server {key[0]}")
+
+    @staticmethod
+    async def _stop_all(connections: list[MCPConnection], timeout: float) -> None:
+        """Stop the connections, then cancel the remaining tasks of the loop."""
+        await asyncio.gather(
+            *(conn.stop(timeout) for conn in connections), return_exceptions=True
+        )
+        current = asyncio.current_task()
+        for task in asyncio.all_tasks():
+            if task is not current:
+                task.cancel()
+
+
+@dataclass
+class PooledMCPServer(MCPServer):
+    """MCP server of an agent, served by `MCPServerPool`.
+
+    The server is always running for the agent: its process starts on first
+    use and is stopped by the pool, so entering it as a context manager, e.g.
+    through `Agent.run_mcp_servers`, does nothing.
+    """
+
+    command: str
+    """The command to run, or the URL of a network server."""
+    args: Sequence[str] = ()
+    """The arguments to pass to the command."""
+    env: dict[str, str] | None = None
+    """The environment variables of the server process."""
+    is_running: bool = field(default=True, init=False, repr=False, compare=False)
+    """Always true, the pool starts the process when needed."""
+
+    @property
+    def key(self) -> ServerKey:
+        """Key of the command line of the server in the pool."""
+        return server_key(self.command, self.args, self.env)
+
+    async def list_tools(self) -> list[ToolDefinition]:
+        """Retrieve the tools of the server."""
+        return await MCPServerPool.request(self.key, lambda server: server.list_tools())
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any]) -> Any:
+        """Call a tool on the server."""
+        return await MCPServerPool.request(
+            self.key, lambda server: server.call_tool(tool_name, arguments)
+        )
+
+    @asynccontextmanager
+    async def client_streams(self) -> AsyncIterator[Any]:
+        """Open the streams of a dedicated session with the server.
+
+        The pooled session stays on the event loop of the pool, so callers
+        driving a session themselves get their own, through the transport of
+        the server. For a stdio server this starts another process.
+        """
+        async with build_server(self.key).client_streams() as streams:
+            yield streams
+
+    def _get_log_level(self) -> None:
+        """No log level is set."""
+        return None
+
+    async def __aenter__(self) -> "PooledMCPServer":
+        """Do nothing, the pool starts the process on first use."""
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        """Do nothing, the process is shared."""
@@ -0,0 +1,140 @@
+"""Cache of modules loaded from hub repos, keyed by the hash of their source."""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import re
+import sys
+import tempfile
+import threading
+from types import CodeType, ModuleType
+from huggingface_hub.constants import HF_HUB_CACHE
+from aic_core.logging import get_logger
+
+
+logger = get_logger(__name__)
+MODULE_PREFIX = "aic_hub"
+
+
+def module_qualname(repo_id: str, subdir: str, name: str) -> str:
+    """Stable `sys.modules` name of a hub module.
+
+    Example:
+        `module_qualname("user/space", "tools", "add")` returns
+        `"aic_hub.user__space.tools.add"`.
+    """
+    repo = re.sub(r"\W", "_", repo_id.replace("/", "__"))
+    return ".".join([MODULE_PREFIX, repo, subdir, name])
+
+
+class ModuleCache:
+    """Load modules by the SHA-256 of their source.
+
+    An unchanged module is reused from memory. Otherwise its bytecode is loaded
+    from `bytecode_dir` when available, so that the source is compiled at most
+    once across processes. Loaded modules are registered in `sys.modules` under
+    their qualified name, so that two repos with the same file name never
+    collide.
+    """
+
+    def __init__(self, bytecode_dir: str | None = None) -> None:
+        """Initialise the cache.
+
+        Args:
+            bytecode_dir: Directory to persist bytecode in. Defaults to
+                `aic_bytecode` next to the Hugging Face Hub cache.
+        """
+        self.bytecode_dir = bytecode_dir or os.path.join(
+            os.path.dirname(HF_HUB_CACHE), "aic_bytecode"
+        )
+        self._modules: dict[str, tuple[str, ModuleType]] = {}
+        self._lock = threading.RLock()
+        self.compiled = 0
+        """Number of modules compiled from source by this process."""
+
+    def _bytecode_path(self, source_hash: str) -> str:
+        """Path of the persisted bytecode of a source."""
+        cache_tag = sys.implementation.cache_tag
+        return os.path.join(self.bytecode_dir, f"{source_hash}.{cache_tag}.pyc")
+
+    def _read_bytecode(self, source_hash: str) -> CodeType | None:
+        """Read persisted bytecode, if valid for this interpreter."""
+        try:
+            with open(self._bytecode_path(source_hash), "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        magic = importlib.util.MAGIC_NUMBER
+        if not data.startswith(magic):  # pragma: no cover
+            return None
+        try:
+            code = marshal.loads(data[len(magic) :])
+        except (EOFError, ValueError, TypeError):  # pragma: no cover
+            return None
+        return code if isinstance(code, CodeType) else None
+
+    def _write_bytecode(self, source_hash: str, code: CodeType) -> None:
+        """Persist bytecode atomically. Failures are only logged."""
+        try:
+            os.makedirs(self.bytecode_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.bytecode_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as file:
+                file.write(importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+            os.replace(tmp_path, self._bytecode_path(source_hash))
+        except OSError as e:  # pragma: no cover
+            logger.warning(f"Could not persist bytecode: {e}")
+
+    def _get_code(self, source: bytes, source_hash: str, path: str) -> CodeType:
+        """Get the code object of a source, compiling it if not persisted."""
+        code = self._read_bytecode(source_hash)
+        if code is None:
+            code = compile(source, path, "exec", dont_inherit=True)
+            self.compiled += 1
+            self._write_bytecode(source_hash, code)
+        return code
+
+    def compile_file(self, path: str) -> CodeType:
+        """Compile a source file and persist its bytecode, without executing it."""
+        with open(path, "rb") as file:
+            source = file.read()
+        return self._get_code(source, hashlib.sha256(source).hexdigest(), path)
+
+    def load(self, qualname: str, path: str) -> ModuleType:
+        """Load the module at path under a qualified name.
+
+        Args:
+            qualname: Name of the module in `sys.modules`.
+            path: Path to the source file.
+        """
+        with open(path, "rb") as file:
+            source = file.read()
+        source_hash = hashlib.sha256(source).hexdigest()
+
+        with self._lock:
+            cached = self._modules.get(qualname)
+            if cached and cached[0] == source_hash:
+                return cached[1]
+
+            code = self._get_code(source, source_hash, path)
+            module = ModuleType(qualname)
+            module.__file__ = path
+            sys.modules[qualname] = module
+            try:
+                exec(code, module.__dict__)
+            except BaseException:
+                # Keep serving the previous version, if any
+                if cached:
+                    sys.modules[qualname] = cached[1]
+                else:
+                    sys.modules.pop(qualname, None)
+                raise
+            self._modules[qualname] = (source_hash, module)
+            return module
+
+    def clear(self) -> None:
+        """Forget all loaded modules. Persisted bytecode is kept."""
+        with self._lock:
+            for qualname in self._modules:
+                sys.modules.pop(qualname, None)
+            self._modules.clear()
@@ -0,0 +1,143 @@
+"""Background refresher for hub snapshots."""
+
+import atexit
+import threading
+import time
+from dataclasses import dataclass
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class RefreshMetrics:
+    """Metrics of a hub refresher."""
+
+    refreshes: int = 0
+    """Number of successful refresh cycles."""
+    updates: int = 0
+    """Number of refreshes that swapped in a new revision."""
+    failures: int = 0
+    """Number of failed refresh cycles."""
+    last_refresh: float | None = None
+    """Time of the last successful refresh."""
+    last_duration: float | None = None
+    """Duration in seconds of the last refresh cycle."""
+    last_error: str | None = None
+    """Error of the last failed refresh cycle."""
+
+
+class HubRefresher:
+    """Poll the Hub for new revisions in a daemon thread.
+
+    While a refresher is running, request paths of hubs with the same repo
+    reference always serve the last good snapshot and never query the Hub.
+    New revisions are downloaded in the background and swapped in atomically,
+    after which old revisions are pruned from the local cache if
+    `AgentHub.cache_keep_revisions` is set.
+
+    Example:
+        ```python
+        refresher = HubRefresher(AgentHub(repo_id)).start()
+        ...
+        refresher.stop()
+        ```
+    """
+
+    def __init__(self, hub: AgentHub, interval: float | None = None) -> None:
+        """Initialise the refresher.
+
+        Args:
+            hub: The hub to refresh.
+            interval: Seconds between refreshes. Defaults to the hub's
+                `update_interval`.
+        """
+        if hub.revision:
+            raise ValueError(f"{hub.repo_id}@{hub.revision} is pinned")
+        self.hub = hub
+        self.interval = interval if interval is not None else hub.update_interval
+        self.metrics = RefreshMetrics()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the refresher thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh(self) -> bool:
+        """Run one refresh cycle.
+
+        Offline hubs are never refreshed.
+
+        Returns:
+            Whether a new revision was swapped in.
+        """
+        if self.hub.offline:
+            return False
+        start = time.monotonic()
+        try:
+            sha = self.hub.remote_revision()
+            current = AgentHub._snapshots.get(self.hub._snapshot_key)
+            updated = current is None or current.sha != sha
+            if updated:
+                # Readers keep the old snapshot until the download completes
+                self.hub._serve_local_or_download(sha)
+                # Another process may be downloading it, in which case the
+                # next cycle swaps it in
+                served = AgentHub._snapshots.get(self.hub._snapshot_key)
+                updated = served is not None and served.sha == sha
+            else:
+                current.checked_at = time.time()  # type: ignore[union-attr]
+        except Exception as e:
+            self.metrics.failures += 1
+            self.metrics.last_error = str(e)
+            logger.warning(f"Failed to refresh {self.hub.repo_id}: {e}")
+            return False
+        finally:
+            self.metrics.last_duration = time.monotonic() - start
+
+        self.metrics.refreshes += 1
+        self.metrics.updates += int(updated)
+        self.metrics.last_refresh = time.time()
+        if updated:
+            self.hub._housekeep()
+        return updated
+
+    def _run(self) -> None:
+        """Refresh until stopped."""
+        self.refresh()
+        while not self._stop_event.wait(self.interval):
+            self.refresh()
+
+    def start(self) -> "HubRefresher":
+        """Start refreshing in a daemon thread."""
+        if self.running:  # pragma: no cover
+            return self
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"hub-refresher-{self.hub.repo_id}", daemon=True
+        )
+        AgentHub._refreshed_keys.add(self.hub._snapshot_key)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the refresher and wait for the current cycle to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        AgentHub._refreshed_keys.discard(self.hub._snapshot_key)
+        atexit.unregister(self.stop)
+
+    def __enter__(self) -> "HubRefresher":
+        """Start the refresher."""
+        return self.start()
+
+    def __exit__(self, *args: object) -> None:
+        """Stop the refresher."""
+        self.stop()
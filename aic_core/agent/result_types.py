@@ -1,9 +1,11 @@
-"""Streamlit MCP server with Pydantic models."""
+"""Streamlit MCP server with Pydantic models.
+
+The models do not depend on Streamlit, which is only imported to render them.
+"""
 
 from __future__ import annotations
 from collections.abc import Callable
 from typing import Any, Literal
-import streamlit as st
 from pydantic import BaseModel
 from pydantic_ai.messages import ToolCallPart, ToolReturnPart
 
@@ -71,6 +73,8 @@ class ComponentRegistry:
         input_callback: Callable | None = None,
     ) -> Any:
         """Generate a component based on the parameters."""
+        import streamlit as st
+
         class_name = tool_call_part.tool_name.replace("final_result_", "")
         model = ComponentRegistry.get_component_class(class_name)
         params = model.model_validate(tool_call_part.args_as_dict())
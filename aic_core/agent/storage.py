@@ -0,0 +1,645 @@
+"""Storage backends for agent hub repos."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Collection, Sequence
+from huggingface_hub import (
+    CachedRepoInfo,
+    CommitOperationAdd,
+    CommitOperationDelete,
+    HfApi,
+    HFCacheInfo,
+    hf_hub_download,
+    scan_cache_dir,
+    snapshot_download,
+)
+from huggingface_hub.errors import (
+    CacheNotFound,
+    EntryNotFoundError,
+    RevisionNotFoundError,
+)
+from huggingface_hub.hf_api import RepoFile
+
+
+CommitOperation = CommitOperationAdd | CommitOperationDelete
+COMPLETE_MARKER = ".aic_complete"
+"""File marking snapshots of the HF cache that hold all the hub files."""
+
+
+def _operation_bytes(operation: CommitOperationAdd) -> bytes:
+    """Read the content of an add operation."""
+    with operation.as_file() as file:
+        return file.read()
+
+
+class StorageBackend(ABC):
+    """Storage of the files of agent hub repos.
+
+    Files are addressed by their path in the repo, e.g. `tools/my_tool.py`, and
+    every backend serves them from a local snapshot directory so that tools can
+    be imported from a file path. Missing files raise `EntryNotFoundError`.
+    """
+
+    @abstractmethod
+    def resolve_revision(self, repo_id: str, revision: str | None = None) -> str:
+        """Get the commit sha of a revision, or of the head if not given."""
+
+    @abstractmethod
+    def snapshot(
+        self,
+        repo_id: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+        allow_patterns: list[str] | None = None,
+    ) -> str:
+        """Get the local path of a snapshot of the repo.
+
+        Args:
+            repo_id: The repo ID.
+            revision: Revision of the snapshot. Defaults to the head.
+            local_files_only: Only resolve the snapshot locally.
+            allow_patterns: If given, only files matching one of these glob
+                patterns need to be fetched. Other files may still be present.
+
+        Raises:
+            LocalEntryNotFoundError: If `local_files_only` is set and the
+                revision is not available locally.
+        """
+
+    @abstractmethod
+    def snapshot_revision(self, path: str) -> str:
+        """Get the commit sha of a snapshot path returned by `snapshot`."""
+
+    @abstractmethod
+    def file_path(
+        self,
+        repo_id: str,
+        path_in_repo: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+    ) -> str:
+        """Get the local path of a file in the repo."""
+
+    @abstractmethod
+    def commit(
+        self,
+        repo_id: str,
+        operations: Sequence[CommitOperation],
+        commit_message: str,
+        revision: str | None = None,
+        parent_commit: str | None = None,
+    ) -> str:
+        """Commit operations to the repo.
+
+        Args:
+            repo_id: The repo ID.
+            operations: Files to add or delete.
+            commit_message: The commit message.
+            revision: Branch to commit to. Defaults to the main branch.
+            parent_commit: If given, the commit fails when the head has moved.
+
+        Returns:
+            The sha of the new commit.
+        """
+
+    def is_complete(self, snapshot_path: str) -> bool:
+        """Whether a local snapshot holds all the agents, tools and result types.
+
+        Snapshots fetched with `allow_patterns` may only hold some of them.
+        Backends that always serve the whole repo need not override this.
+        """
+        return True
+
+    def mark_complete(self, snapshot_path: str) -> None:
+        """Record that a local snapshot holds all the agents, tools and result types."""
+        return None
+
+    def update_ref(self, snapshot_path: str, ref: str) -> None:
+        """Point a ref at the revision of a local snapshot.
+
+        Offline lookups of the ref, e.g. of the head of the repo, then resolve
+        to that snapshot. Backends that resolve refs themselves need not
+        override this.
+        """
+        return None
+
+    def file_ids(self, repo_id: str, revision: str) -> dict[str, str] | None:
+        """Get the blob id of every file of a revision, by path in the repo.
+
+        Files with the same id in two revisions have the same content.
+
+        Returns:
+            The blob ids, or None if the backend cannot list them, in which
+            case new revisions are fetched in full.
+        """
+        return None
+
+    def advance(
+        self,
+        repo_id: str,
+        snapshot_path: str,
+        revision: str,
+        changed_paths: set[str],
+        stale_paths: set[str],
+    ) -> str:
+        """Get the local snapshot of a new revision.
+
+        Backends can use the served snapshot and the paths that changed since
+        then to avoid fetching unchanged files.
+
+        Args:
+            repo_id: The repo ID.
+            snapshot_path: Local path of the served snapshot.
+            revision: Commit sha of the new revision.
+            changed_paths: Files to fetch from the new revision.
+            stale_paths: Files of the served snapshot that must not be reused,
+                e.g. deleted files, or changed files that are not fetched.
+
+        Returns:
+            The local path of the new snapshot.
+        """
+        return self.snapshot(repo_id, revision)
+
+    def prune(
+        self,
+        repo_id: str,
+        keep: int,
+        max_size: int | None = None,
+        protected: Collection[str] = (),
+    ) -> int:
+        """Remove old local snapshots of a repo.
+
+        Args:
+            repo_id: The repo ID.
+            keep: Number of most recent revisions to keep.
+            max_size: If given, older kept revisions are also removed until
+                the repo takes at most this many bytes.
+            protected: Revisions never removed, e.g. the ones being served.
+
+        Returns:
+            The number of bytes freed.
+        """
+        return 0
+
+    def cache_usage(self) -> dict[str, int]:
+        """Get the local disk usage of each repo, in bytes."""
+        return {}
+
+
+class HfHubBackend(StorageBackend):
+    """Repos on the Hugging Face Hub, served from the local HF cache."""
+
+    def __init__(self, repo_type: str = "space") -> None:
+        """Initialise the backend.
+
+        Args:
+            repo_type: Type of the repos on the Hub.
+        """
+        self.repo_type = repo_type
+
+    def resolve_revision(self, repo_id: str, revision: str | None = None) -> str:
+        """Get the commit sha of a revision with a single Hub query."""
+        info = HfApi().repo_info(repo_id, repo_type=self.repo_type, revision=revision)
+        if not info.sha:  # pragma: no cover
+            raise ValueError(f"Could not resolve revision of {repo_id}")
+        return info.sha
+
+    def snapshot(
+        self,
+        repo_id: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+        allow_patterns: list[str] | None = None,
+    ) -> str:
+        """Download a snapshot to the HF cache, or resolve it locally."""
+        return snapshot_download(
+            repo_id=repo_id,
+            repo_type=self.repo_type,
+            revision=revision,
+            local_files_only=local_files_only,
+            allow_patterns=allow_patterns,
+        )
+
+    def snapshot_revision(self, path: str) -> str:
+        """Snapshot directories of the HF cache are named after their sha."""
+        return os.path.basename(os.path.normpath(path))
+
+    def is_complete(self, snapshot_path: str) -> bool:
+        """Whether the snapshot was marked complete.
+
+        The HF cache resolves a revision to its snapshot directory whatever
+        the files fetched into it, so completeness is recorded in the
+        directory itself, and removed along with it.
+        """
+        return os.path.isfile(os.path.join(snapshot_path, COMPLETE_MARKER))
+
+    def mark_complete(self, snapshot_path: str) -> None:
+        """Write the marker file into the snapshot directory."""
+        with open(os.path.join(snapshot_path, COMPLETE_MARKER), "w"):
+            pass
+
+    def update_ref(self, snapshot_path: str, ref: str) -> None:
+        """Write the ref file of the HF cache.
+
+        The HF cache only writes the refs of revisions downloaded by name, not
+        by commit sha.
+        """
+        sha = self.snapshot_revision(snapshot_path)
+        repo_dir = os.path.dirname(os.path.dirname(os.path.normpath(snapshot_path)))
+        ref_path = os.path.join(repo_dir, "refs", *ref.split("/"))
+        try:
+            with open(ref_path) as file:
+                if file.read() == sha:
+                    return
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        tmp_path = f"{ref_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(sha)
+        os.replace(tmp_path, ref_path)
+
+    def file_path(
+        self,
+        repo_id: str,
+        path_in_repo: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+    ) -> str:
+        """Download a file to the HF cache, or resolve it locally."""
+        subfolder, _, filename = path_in_repo.rpartition("/")
+        return hf_hub_download(
+            repo_id=repo_id,
+            filename=filename,
+            subfolder=subfolder or None,
+            local_files_only=local_files_only,
+            repo_type=self.repo_type,
+            revision=revision,
+        )
+
+    def commit(
+        self,
+        repo_id: str,
+        operations: Sequence[CommitOperation],
+        commit_message: str,
+        revision: str | None = None,
+        parent_commit: str | None = None,
+    ) -> str:
+        """Create a single commit on the Hub."""
+        commit = HfApi().create_commit(
+            repo_id=repo_id,
+            operations=operations,
+            commit_message=commit_message,
+            repo_type=self.repo_type,
+            revision=revision,
+            parent_commit=parent_commit,
+        )
+        return commit.oid  # type: ignore[union-attr]
+
+    def file_ids(self, repo_id: str, revision: str) -> dict[str, str]:
+        """List the git blob ids of the repo tree with a single Hub query."""
+        tree = HfApi().list_repo_tree(
+            repo_id, recursive=True, revision=revision, repo_type=self.repo_type
+        )
+        return {item.path: item.blob_id for item in tree if isinstance(item, RepoFile)}
+
+    def advance(
+        self,
+        repo_id: str,
+        snapshot_path: str,
+        revision: str,
+        changed_paths: set[str],
+        stale_paths: set[str],
+    ) -> str:
+        """Build the new snapshot by downloading only the changed files.
+
+        Unchanged files are linked from the served snapshot.
+        """
+        new_path = os.path.join(
+            os.path.dirname(os.path.normpath(snapshot_path)), revision
+        )
+        # The new snapshot is only complete once all the files are in
+        self._link_snapshot_files(
+            snapshot_path,
+            new_path,
+            skip={*changed_paths, *stale_paths, COMPLETE_MARKER},
+        )
+        for path_in_repo in changed_paths:
+            self.file_path(repo_id, path_in_repo, revision)
+        return new_path
+
+    @staticmethod
+    def _link_snapshot_files(src_dir: str, dst_dir: str, skip: set[str]) -> None:
+        """Link the files of a snapshot into another one, except skipped paths."""
+        os.makedirs(dst_dir, exist_ok=True)
+        for root, _, files in os.walk(src_dir):
+            for name in files:
+                src = os.path.join(root, name)
+                path_in_repo = os.path.relpath(src, src_dir).replace(os.sep, "/")
+                dst = os.path.join(dst_dir, path_in_repo)
+                if path_in_repo in skip or os.path.lexists(dst):
+                    continue
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                if os.path.islink(src):
+                    # Blob links are relative and the directory depth is the same
+                    os.symlink(os.readlink(src), dst)
+                else:  # pragma: no cover
+                    shutil.copy2(src, dst)
+
+    def _scan_cache(self) -> HFCacheInfo | None:
+        """Scan the HF cache, if any."""
+        try:
+            return scan_cache_dir()
+        except CacheNotFound:
+            return None
+
+    def _cached_repo(self, info: HFCacheInfo, repo_id: str) -> CachedRepoInfo | None:
+        """Find a repo in the HF cache."""
+        for repo in info.repos:
+            if repo.repo_id == repo_id and repo.repo_type == self.repo_type:
+                return repo
+        return None
+
+    def prune(
+        self,
+        repo_id: str,
+        keep: int,
+        max_size: int | None = None,
+        protected: Collection[str] = (),
+    ) -> int:
+        """Delete old snapshots, and the blobs only they use, from the HF cache.
+
+        Revisions are ordered by the creation of their snapshot directory.
+        """
+        info = self._scan_cache()
+        repo = info and self._cached_repo(info, repo_id)
+        if not info or not repo:
+            return 0
+        revisions = sorted(
+            repo.revisions,
+            key=lambda revision: os.stat(revision.snapshot_path).st_mtime,
+            reverse=True,
+        )
+        # Oldest first
+        evictable = [
+            revision.commit_hash
+            for revision in revisions[keep:][::-1]
+            if revision.commit_hash not in protected
+        ]
+        if max_size is not None:
+            kept = [
+                revision.commit_hash
+                for revision in revisions[:keep][::-1]
+                if revision.commit_hash not in protected
+            ]
+            while kept and (
+                repo.size_on_disk
+                - info.delete_revisions(*evictable).expected_freed_size
+                > max_size
+            ):
+                evictable.append(kept.pop(0))
+        if not evictable:
+            return 0
+        strategy = info.delete_revisions(*evictable)
+        strategy.execute()
+        return strategy.expected_freed_size
+
+    def cache_usage(self) -> dict[str, int]:
+        """Get the size of each repo in the HF cache."""
+        info = self._scan_cache()
+        if not info:
+            return {}
+        return {
+            repo.repo_id: repo.size_on_disk
+            for repo in info.repos
+            if repo.repo_type == self.repo_type
+        }
+
+
+class LocalDirectoryBackend(StorageBackend):
+    """Repos stored as plain directories, e.g. baked into a container image.
+
+    The repo `user/space` lives in `<root>/user/space`. A directory holds a
+    single revision, its current content, whose sha is a fingerprint of the
+    file paths, sizes and modification times. Commits write to the directory.
+    """
+
+    def __init__(self, root: str) -> None:
+        """Initialise the backend.
+
+        Args:
+            root: Directory containing one subdirectory per repo.
+        """
+        self.root = root
+
+    def _repo_path(self, repo_id: str) -> str:
+        """Directory of a repo."""
+        return os.path.join(self.root, *repo_id.split("/"))
+
+    def snapshot_revision(self, path: str) -> str:
+        """Fingerprint of the files in the directory."""
+        digest = hashlib.sha1()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                stat = os.stat(file_path)
+                rel_path = os.path.relpath(file_path, path)
+                digest.update(
+                    f"{rel_path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode()
+                )
+        return digest.hexdigest()
+
+    def resolve_revision(self, repo_id: str, revision: str | None = None) -> str:
+        """Fingerprint of the repo directory. Only one revision is available."""
+        return self.snapshot_revision(self._repo_path(repo_id))
+
+    def snapshot(
+        self,
+        repo_id: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+        allow_patterns: list[str] | None = None,
+    ) -> str:
+        """The repo directory itself.
+
+        The whole repo is always served, whatever the patterns.
+        """
+        return self._repo_path(repo_id)
+
+    def file_path(
+        self,
+        repo_id: str,
+        path_in_repo: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+    ) -> str:
+        """Path of the file in the repo directory."""
+        path = os.path.join(self._repo_path(repo_id), *path_in_repo.split("/"))
+        if not os.path.isfile(path):
+            raise EntryNotFoundError(f"{path_in_repo} not found in {repo_id}")
+        return path
+
+    def commit(
+        self,
+        repo_id: str,
+        operations: Sequence[CommitOperation],
+        commit_message: str,
+        revision: str | None = None,
+        parent_commit: str | None = None,
+    ) -> str:
+        """Write the operations to the repo directory."""
+        repo_path = self._repo_path(repo_id)
+        if parent_commit and parent_commit != self.snapshot_revision(repo_path):
+            raise ValueError(f"{repo_id} has changed since {parent_commit}")
+        for operation in operations:
+            path = os.path.join(repo_path, *operation.path_in_repo.split("/"))
+            if isinstance(operation, CommitOperationDelete):
+                if os.path.isfile(path):
+                    os.remove(path)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(_operation_bytes(operation))
+            os.replace(tmp_path, path)
+        return self.snapshot_revision(repo_path)
+
+
+class InMemoryBackend(StorageBackend):
+    """Repos held in memory, for tests and offline benchmarks.
+
+    Every commit is kept, and snapshots are materialised once per revision in
+    a temporary directory so that tools can be imported from a file path.
+    Unknown repos start out empty.
+    """
+
+    def __init__(self, repos: dict[str, dict[str, str | bytes]] | None = None) -> None:
+        """Initialise the backend.
+
+        Args:
+            repos: Initial files of each repo, by path in the repo.
+        """
+        self._commits: dict[str, dict[str, dict[str, bytes]]] = {}
+        self._heads: dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="aic-hub-")
+        for repo_id, files in (repos or {}).items():
+            ops = [
+                CommitOperationAdd(
+                    path_in_repo=path,
+                    path_or_fileobj=content.encode("utf-8")
+                    if isinstance(content, str)
+                    else content,
+                )
+                for path, content in files.items()
+            ]
+            self.commit(repo_id, ops, "Initial commit")
+
+    @staticmethod
+    def _tree_sha(files: dict[str, bytes], parent: str) -> str:
+        """Sha of a commit, from its parent and its files."""
+        digest = hashlib.sha1(parent.encode())
+        for path in sorted(files):
+            digest.update(path.encode() + b"\0" + hashlib.sha1(files[path]).digest())
+        return digest.hexdigest()
+
+    def _files(self, repo_id: str, revision: str | None) -> tuple[str, dict]:
+        """Get the sha and files of a revision."""
+        with self._lock:
+            commits = self._commits.setdefault(repo_id, {})
+            if not commits:
+                sha = self._tree_sha({}, "")
+                commits[sha] = {}
+                self._heads[repo_id] = sha
+            sha = revision or "main"
+            if sha == "main":
+                sha = self._heads[repo_id]
+            if sha not in commits:
+                raise RevisionNotFoundError(f"{repo_id}@{revision} not found")
+            return sha, commits[sha]
+
+    def resolve_revision(self, repo_id: str, revision: str | None = None) -> str:
+        """Get the sha of a revision."""
+        return self._files(repo_id, revision)[0]
+
+    def file_ids(self, repo_id: str, revision: str) -> dict[str, str]:
+        """Hash the files of a revision."""
+        _, files = self._files(repo_id, revision)
+        return {
+            path: hashlib.sha1(content).hexdigest() for path, content in files.items()
+        }
+
+    def snapshot(
+        self,
+        repo_id: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+        allow_patterns: list[str] | None = None,
+    ) -> str:
+        """Materialise the revision once, and return its directory.
+
+        The whole repo is always served, whatever the patterns.
+        """
+        sha, files = self._files(repo_id, revision)
+        path = os.path.join(self._tmpdir.name, *repo_id.split("/"), sha)
+        if os.path.isdir(path):
+            return path
+        tmp_path = tempfile.mkdtemp(dir=self._tmpdir.name)
+        for path_in_repo, content in files.items():
+            file_path = os.path.join(tmp_path, *path_in_repo.split("/"))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "wb") as file:
+                file.write(content)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:  # pragma: no cover
+            # Materialised concurrently by another thread
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        return path
+
+    def snapshot_revision(self, path: str) -> str:
+        """Snapshot directories are named after their sha."""
+        return os.path.basename(os.path.normpath(path))
+
+    def file_path(
+        self,
+        repo_id: str,
+        path_in_repo: str,
+        revision: str | None = None,
+        local_files_only: bool = False,
+    ) -> str:
+        """Path of the file in the materialised snapshot."""
+        _, files = self._files(repo_id, revision)
+        if path_in_repo not in files:
+            raise EntryNotFoundError(f"{path_in_repo} not found in {repo_id}")
+        path = self.snapshot(repo_id, revision)
+        return os.path.join(path, *path_in_repo.split("/"))
+
+    def commit(
+        self,
+        repo_id: str,
+        operations: Sequence[CommitOperation],
+        commit_message: str,
+        revision: str | None = None,
+        parent_commit: str | None = None,
+    ) -> str:
+        """Record a new commit on top of the head."""
+        with self._lock:
+            head, files = self._files(repo_id, None)
+            if parent_commit and parent_commit != head:
+                raise ValueError(f"{repo_id} has changed since {parent_commit}")
+            files = dict(files)
+            for operation in operations:
+                if isinstance(operation, CommitOperationDelete):
+                    files.pop(operation.path_in_repo, None)
+                else:
+                    files[operation.path_in_repo] = _operation_bytes(operation)
+            sha = self._tree_sha(files, head)
+            self._commits[repo_id][sha] = files
+            self._heads[repo_id] = sha
+            return sha
@@ -0,0 +1,149 @@
+"""Resolve the result types of agent configs without evaluating code."""
+
+import ast
+from collections.abc import Sequence
+from typing import Any, Optional, Union
+from aic_core.agent.cache import LRUCache
+from aic_core.agent.result_types import ComponentRegistry
+
+
+PRIMITIVES: dict[str, Any] = {
+    "Any": Any,
+    "None": None,
+    **{t.__name__: t for t in (str, int, float, bool, bytes, list, dict, tuple, set)},
+}
+"""Built-in types that result types can name."""
+GENERICS: dict[str, Any] = {**PRIMITIVES, "Optional": Optional, "Union": Union}
+"""Types that result types can subscript, e.g. `list[str]` or `Optional[str]`."""
+
+
+class ResultTypeResolver:
+    """Map result type names to classes.
+
+    A name is resolved, in order, to a primitive such as `str`, a component
+    registered in `ComponentRegistry`, or a result type of the hub repo.
+    Generic primitives such as `list[str]`, and unions such as `int | None`
+    or `Optional[int]`, are parsed, never evaluated.
+
+    The output type of each unique tuple of classes is built once and shared.
+    Hub result types are reused by the hub
+    while their source is unchanged, so repeated agent builds hit the cache.
+    """
+
+    _output_types: LRUCache = LRUCache(maxsize=256)
+    """Output types by tuple of resolved classes."""
+
+    def __init__(self, repo_id: str, revision: str | None = None) -> None:
+        """Initialise the resolver.
+
+        Args:
+            repo_id: Repo of the hub result types.
+            revision: Revision of the repo to load hub result types from.
+        """
+        self.repo_id = repo_id
+        self.revision = revision
+
+    def resolve_name(self, type_str: str) -> Any:
+        """Resolve one result type name to a class.
+
+        Raises:
+            ValueError: If the name is not a valid type expression.
+        """
+        try:
+            node = ast.parse(type_str.strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid result type: {type_str}") from e
+        return self._resolve_node(node, type_str)
+
+    def _resolve_node(self, node: ast.expr, type_str: str) -> Any:
+        """Resolve a node of a type expression."""
+        match node:
+            case ast.Constant(value=None):
+                return None
+            case ast.Name(id=name) if name in PRIMITIVES:
+                return PRIMITIVES[name]
+            case ast.Name(id=name) if ComponentRegistry.contains_component(name):
+                return ComponentRegistry.get_component_class(name)
+            case ast.Name(id=name):
+                from aic_core.agent.agent_hub import AgentHub
+
+                hub = AgentHub(self.repo_id, revision=self.revision)
+                return hub.load_result_type(name)
+            case ast.BinOp(left=left, op=ast.BitOr(), right=right):
+                return Union[  # noqa: UP007
+                    self._resolve_node(left, type_str),
+                    self._resolve_node(right, type_str),
+                ]
+            case ast.Subscript(value=ast.Name(id=name), slice=args) if name in GENERICS:
+                elements = args.elts if isinstance(args, ast.Tuple) else [args]
+                params = tuple(self._resolve_node(arg, type_str) for arg in elements)
+                try:
+                    return GENERICS[name][params if len(params) > 1 else params[0]]
+                except TypeError as e:
+                    raise ValueError(f"Invalid result type: {type_str}") from e
+            case _:
+                raise ValueError(f"Invalid result type: {type_str}")
+
+    @classmethod
+    def hub_names(cls, type_str: str) -> set[str]:
+        """Get the names of a type expression that refer to hub result types.
+
+        Nothing is loaded, so this is cheap enough to validate configs.
+
+        Raises:
+            ValueError: If the name is not a valid type expression.
+        """
+        try:
+            node = ast.parse(type_str.strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid result type: {type_str}") from e
+        return cls._hub_names(node, type_str)
+
+    @classmethod
+    def _hub_names(cls, node: ast.expr, type_str: str) -> set[str]:
+        """Get the hub result type names of a node of a type expression."""
+        match node:
+            case ast.Constant(value=None):
+                return set()
+            case ast.Name(id=name) if name in PRIMITIVES:
+                return set()
+            case ast.Name(id=name) if ComponentRegistry.contains_component(name):
+                return set()
+            case ast.Name(id=name):
+                return {name}
+            case ast.BinOp(left=left, op=ast.BitOr(), right=right):
+                return cls._hub_names(left, type_str) | cls._hub_names(right, type_str)
+            case ast.Subscript(value=ast.Name(id=name), slice=args) if name in GENERICS:
+                elements = args.elts if isinstance(args, ast.Tuple) else [args]
+                return set().union(*(cls._hub_names(arg, type_str) for arg in elements))
+            case _:
+                raise ValueError(f"Invalid result type: {type_str}")
+
+    def resolve(self, type_strs: Sequence[str]) -> Any:
+        """Resolve the result type names of a config to the agent output type.
+
+        Returns:
+            `str` if no names are given, the class of a single name, or the
+            union of the classes.
+        """
+        return self._output_type(self._classes(type_strs))
+
+    def _classes(self, type_strs: Sequence[str]) -> tuple[Any, ...]:
+        """Resolve result type names to a tuple of classes."""
+        return tuple(self.resolve_name(type_str) for type_str in type_strs) or (str,)
+
+    @classmethod
+    def _output_type(cls, classes: tuple[Any, ...]) -> Any:
+        """Get the output type of a tuple of classes."""
+        output_type = cls._output_types.get(classes)
+        if output_type is None:
+            output_type = (
+                classes[0] if len(classes) == 1 else Union.__getitem__(classes)
+            )
+            cls._output_types.set(classes, output_type)
+        return output_type
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Clear the output types."""
+        cls._output_types.clear()
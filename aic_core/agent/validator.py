@@ -0,0 +1,201 @@
+"""Validate agent configs without building the agent."""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+from aic_core.agent.manifest import Manifest, ToolEntry
+from aic_core.agent.type_resolver import ResultTypeResolver
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from aic_core.agent.agent import AgentConfig
+
+
+SUPPORTED_PROVIDERS = ("openai",)
+"""Model providers `AgentFactory.create_agent` can build."""
+SHELL_CHARACTERS = set("|&;<>$`'\"\\")
+"""Characters that have no effect, as MCP server commands run without a shell."""
+
+
+@dataclass(frozen=True)
+class ConfigError:
+    """Problem found in an agent config."""
+
+    field: str
+    """Name of the config field."""
+    value: str
+    """Offending value of the field."""
+    message: str
+    """Description of the problem."""
+
+    def __str__(self) -> str:
+        """Format the error for display."""
+        return f"{self.field}: {self.message}"
+
+
+class InvalidConfigError(ValueError):
+    """Raised when an agent config fails validation."""
+
+    def __init__(self, errors: list[ConfigError]) -> None:
+        """Initialise the error.
+
+        Args:
+            errors: The problems found in the config.
+        """
+        super().__init__("Invalid agent config:\n" + "\n".join(map(str, errors)))
+        self.errors = errors
+
+
+class ConfigValidator:
+    """Check an agent config against the manifest of its repo.
+
+    Unlike `AgentFactory.create_agent`, no tool or result type code is run and
+    no model provider or MCP server is set up: the model name, result types,
+    tools and MCP server commands are checked against the manifest, which is
+    loaded at most once.
+
+    Example:
+        ```python
+        errors = ConfigValidator(config).validate()
+        ```
+    """
+
+    def __init__(self, config: "AgentConfig", revision: str | None = None) -> None:
+        """Initialise the validator.
+
+        Args:
+            config: The agent config.
+            revision: Revision of the repo to check the tools and result types
+                against.
+        """
+        self.config = config
+        self.revision = revision
+        self._manifest: Manifest | None = None
+
+    @property
+    def manifest(self) -> Manifest:
+        """Manifest of the repo of the config."""
+        if self._manifest is None:
+            from aic_core.agent.agent_hub import AgentHub
+
+            hub = AgentHub(self.config.repo_id, revision=self.revision)
+            self._manifest = hub.load_manifest()
+        return self._manifest
+
+    def validate(self) -> list[ConfigError]:
+        """Find all the problems of the config.
+
+        Returns:
+            The problems found, empty if the config is valid.
+        """
+        return [
+            *self.validate_model(),
+            *self.validate_result_types(),
+            *self.validate_known_tools(),
+            *self.validate_hf_tools(),
+            *self.validate_mcp_servers(),
+        ]
+
+    def validate_model(self) -> list[ConfigError]:
+        """Check the model name is `provider:name` with a supported provider."""
+        model = self.config.model
+        provider, _, name = model.partition(":")
+        if not name:
+            message = "Model must be given as provider:name"
+        elif provider not in SUPPORTED_PROVIDERS:
+            message = f"Unsupported model provider {provider}"
+        else:
+            return []
+        return [ConfigError("model", model, message)]
+
+    def validate_result_types(self) -> list[ConfigError]:
+        """Check the result types are valid and found in the repo."""
+        from aic_core.agent.agent_hub import AgentHub
+
+        resolver = ResultTypeResolver(self.config.repo_id, revision=self.revision)
+        errors = []
+        for type_str in self.config.result_type:
+            try:
+                names = resolver.hub_names(type_str)
+            except ValueError as e:
+                errors.append(ConfigError("result_type", type_str, str(e)))
+                continue
+            for name in sorted(names):
+                message = self._check_entry(AgentHub.result_types_dir, name)
+                if message:
+                    errors.append(ConfigError("result_type", type_str, message))
+        return errors
+
+    def validate_known_tools(self) -> list[ConfigError]:
+        """Check the tools are found in the repo and define their function."""
+        from aic_core.agent.agent_hub import AgentHub
+
+        errors = []
+        for name in self.config.known_tools:
+            message = self._check_entry(AgentHub.tools_dir, name.split(".")[0])
+            if message:
+                errors.append(ConfigError("known_tools", name, message))
+        return errors
+
+    def validate_hf_tools(self) -> list[ConfigError]:
+        """Check the Hugging Face tools are valid `repo_id[@revision]` names."""
+        from huggingface_hub.errors import HFValidationError
+        from huggingface_hub.utils import validate_repo_id
+
+        errors = []
+        for tool_name in self.config.hf_tools:
+            repo_id, at, revision = tool_name.partition("@")
+            try:
+                validate_repo_id(repo_id)
+            except HFValidationError as e:
+                errors.append(ConfigError("hf_tools", tool_name, str(e)))
+                continue
+            if at and not revision:
+                message = "Revision must not be empty"
+                errors.append(ConfigError("hf_tools", tool_name, message))
+        return errors
+
+    def validate_mcp_servers(self) -> list[ConfigError]:
+        """Check the MCP server commands can run without a shell, and URLs."""
+        errors = []
+        for server in self.config.mcp_servers:
+            if not server.strip():
+                continue
+            message = self._check_mcp_server(server)
+            if message:
+                errors.append(ConfigError("mcp_servers", server, message))
+        return errors
+
+    @staticmethod
+    def _check_mcp_server(server: str) -> str | None:
+        """Check an MCP server command line or URL.
+
+        Returns:
+            The problem found, if any.
+        """
+        command, *args = server.split()
+        url = urlparse(command)
+        if url.scheme in ("http", "https"):
+            if not url.netloc:
+                return f"URL must include a host, got {command}"
+            if args:
+                return "URLs of network servers take no arguments"
+            return None
+        if command.startswith("-"):
+            return f"Command must come before options, got {command}"
+        if SHELL_CHARACTERS & set(server):
+            return "Commands run without a shell, remove quotes and operators"
+        return None
+
+    def _check_entry(self, subdir: str, name: str) -> str | None:
+        """Check a tool or result type of the manifest.
+
+        Returns:
+            The problem found, if any.
+        """
+        entry = self.manifest.get(subdir, name)
+        if not isinstance(entry, ToolEntry):
+            return f"{name} not found in {self.config.repo_id}/{subdir}"
+        if entry.signature is None and not entry.bound:
+            return f"{subdir}/{name} does not define {name}"
+        return None
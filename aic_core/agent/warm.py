@@ -0,0 +1,120 @@
+"""Warm the caches of a hub repo before serving it."""
+
+import json
+import os
+import re
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from huggingface_hub.constants import HF_HUB_CACHE
+from aic_core.agent.agent import AgentConfig, AgentFactory
+from aic_core.agent.agent_hub import AgentHub
+
+
+def default_marker_path(repo_id: str) -> str:
+    """Path of the warm-cache marker of a repo, next to the HF cache."""
+    name = re.sub(r"[^\w.-]", "_", repo_id.replace("/", "--"))
+    return os.path.join(os.path.dirname(HF_HUB_CACHE), "aic_warm", f"{name}.json")
+
+
+@dataclass
+class WarmReport:
+    """Outcome of warming a repo."""
+
+    repo_id: str
+    """The repo ID."""
+    revision: str
+    """Commit sha that was warmed."""
+    agents: list[str]
+    """Agents that were built."""
+    modules: int = 0
+    """Number of tool and result type modules compiled."""
+    timings: dict[str, float] = field(default_factory=dict)
+    """Seconds spent in each stage."""
+    finished_at: float = 0.0
+    """Time the warm-up finished."""
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str) -> Iterator[None]:
+    """Record the duration of a stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+def _compile_modules(path: str) -> int:
+    """Compile the tools and result types of a snapshot and persist them.
+
+    Returns:
+        The number of compiled modules.
+    """
+    count = 0
+    for subdir in (AgentHub.tools_dir, AgentHub.result_types_dir):
+        subdir_path = os.path.join(path, subdir)
+        if not os.path.isdir(subdir_path):
+            continue
+        for filename in sorted(os.listdir(subdir_path)):
+            if filename.endswith(".py"):
+                AgentHub._modules.compile_file(os.path.join(subdir_path, filename))
+                count += 1
+    return count
+
+
+def warm(
+    repo_id: str,
+    revision: str | None = None,
+    agents: Sequence[str] = (),
+    marker_path: str | None = None,
+) -> WarmReport:
+    """Download, compile and build the agents of a repo, then write a marker.
+
+    Args:
+        repo_id: The repo ID.
+        revision: Revision to pin. Defaults to the head of the repo.
+        agents: Agents to warm. Defaults to all agents of the repo, in which
+            case all agents, tools and result types are downloaded.
+        marker_path: Where to write the marker. Defaults to
+            `default_marker_path(repo_id)`.
+
+    Returns:
+        The report, also written to the marker as JSON.
+    """
+    hub = AgentHub(repo_id, revision=revision)
+    timings: dict[str, float] = {}
+
+    with _timed(timings, "download"):
+        patterns = None
+        if agents:
+            closures = (
+                AgentHub(repo_id, revision, agent_name=agent).scope_patterns()
+                for agent in agents
+            )
+            patterns = list(dict.fromkeys(p for closure in closures for p in closure))
+        path = hub.download_files(allow_patterns=patterns)
+        names = list(agents) or hub.list_files(hub.agents_dir)
+
+    with _timed(timings, "compile"):
+        modules = _compile_modules(path)
+
+    with _timed(timings, "build"):
+        for name in names:
+            config = AgentConfig(**hub.load_config(name))
+            AgentFactory(config, revision=revision).create_agent(dry_run=True)
+
+    report = WarmReport(
+        repo_id=repo_id,
+        revision=hub._current_revision(),
+        agents=names,
+        modules=modules,
+        timings=timings,
+        finished_at=time.time(),
+    )
+    marker_path = marker_path or default_marker_path(repo_id)
+    os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+    with open(marker_path, "w") as file:
+        json.dump(asdict(report), file, indent=2)
+    return report
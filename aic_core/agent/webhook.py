@@ -0,0 +1,172 @@
+"""Receiver of Hugging Face Hub webhooks that refreshes hub snapshots."""
+
+import hmac
+import json
+import threading
+from collections.abc import Iterable
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    """Handle webhook deliveries of a receiver."""
+
+    server: "_WebhookServer"
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Refresh the hubs of the updated repo."""
+        receiver = self.server.receiver
+        secret = self.headers.get("X-Webhook-Secret", "")
+        if receiver.secret and not hmac.compare_digest(secret, receiver.secret):
+            self._reply(401, {"error": "Invalid secret"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._reply(400, {"error": "Invalid payload"})
+            return
+        try:
+            refreshed = receiver.handle(payload)
+        except Exception as e:
+            logger.warning(f"Failed to handle webhook: {e}")
+            self._reply(500, {"error": str(e)})
+            return
+        self._reply(200, {"refreshed": refreshed})
+
+    def _reply(self, status: int, body: dict) -> None:
+        """Send a JSON response."""
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Log requests with the package logger."""
+        logger.debug(format % args)
+
+
+class _WebhookServer(ThreadingHTTPServer):
+    """HTTP server with a reference to its receiver."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], receiver: "WebhookReceiver"):
+        super().__init__(address, _WebhookHandler)
+        self.receiver = receiver
+
+
+class WebhookReceiver:
+    """Serve an endpoint for Hub webhooks that refreshes hubs on repo updates.
+
+    On a content update of a repo, the hubs of that repo switch to the new
+    head revision right away, fetching only the files that changed. Polling
+    every `update_interval` stays in place in case a delivery is missed.
+
+    Configure a webhook on the Hub with the `repo.content` scope, pointing at
+    the URL of the receiver, and with the same secret.
+
+    Example:
+        ```python
+        receiver = WebhookReceiver([AgentHub(repo_id)], secret="...", port=8001)
+        receiver.start()
+        ...
+        receiver.stop()
+        ```
+    """
+
+    def __init__(
+        self,
+        hubs: Iterable[AgentHub],
+        secret: str | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Initialise the receiver.
+
+        Args:
+            hubs: The hubs to refresh. Pinned hubs are never refreshed.
+            secret: Secret the webhook sends in the `X-Webhook-Secret` header.
+                Deliveries without it are rejected.
+            host: Host to listen on.
+            port: Port to listen on. Zero picks a free port.
+        """
+        self.hubs = [hub for hub in hubs if not hub.revision]
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self._server: _WebhookServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """URL of the webhook endpoint."""
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def running(self) -> bool:
+        """Whether the server thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def handle(self, payload: dict) -> list[str]:
+        """Handle a webhook payload.
+
+        Args:
+            payload: The JSON payload of the webhook.
+
+        Returns:
+            The repo IDs of the refreshed hubs.
+        """
+        event = payload.get("event", {})
+        repo = payload.get("repo", {})
+        if event.get("scope") != "repo.content" or event.get("action") == "delete":
+            return []
+        repo_id, sha = repo.get("name"), repo.get("headSha")
+        refreshed = []
+        for hub in self.hubs:
+            if hub.repo_id != repo_id or repo.get("type") != hub.repo_type:
+                continue
+            if hub._snapshot_key not in AgentHub._snapshots:
+                continue  # Nothing served yet, the next load downloads the head
+            logger.info(f"Refreshing {repo_id} to {sha} on webhook")
+            AgentHub._flights.do(("update", *hub._snapshot_key), partial(hub.sync, sha))
+            refreshed.append(hub.repo_id)
+        return refreshed
+
+    def start(self) -> "WebhookReceiver":
+        """Start serving in a daemon thread."""
+        if self.running:  # pragma: no cover
+            return self
+        self._server = _WebhookServer((self.host, self.port), self)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="hub-webhook", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "WebhookReceiver":
+        """Start the receiver."""
+        return self.start()
+
+    def __exit__(self, *args: object) -> None:
+        """Stop the receiver."""
+        self.stop()
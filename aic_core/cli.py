@@ -0,0 +1,80 @@
+"""Command line interface for managing agent hub repos."""
+
+import argparse
+from collections.abc import Sequence
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.warm import warm as warm_repo
+
+
+def publish(args: argparse.Namespace) -> None:
+    """Publish a local directory to a repo in a single commit."""
+    hub = AgentHub(args.repo_id)
+    count = hub.upload_directory(args.directory, commit_message=args.message)
+    print(f"Published {count} files to {args.repo_id}")
+
+
+def warm(args: argparse.Namespace) -> None:
+    """Prefetch, compile and build the agents of a repo, reporting timings."""
+    report = warm_repo(
+        args.repo_id,
+        revision=args.revision,
+        agents=args.agent or (),
+        marker_path=args.marker,
+    )
+    for stage, seconds in report.timings.items():
+        print(f"{stage:<10}{seconds:8.3f}s")
+    print(
+        f"Warmed {report.repo_id}@{report.revision}: {len(report.agents)} agents, "
+        f"{report.modules} modules"
+    )
+    if args.keep_revisions:
+        freed = AgentHub(args.repo_id, args.revision).prune_cache(
+            keep=args.keep_revisions
+        )
+        print(f"Pruned {freed} bytes of older revisions")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(prog="aic-hub", description=__doc__)
+    subparsers = parser.add_subparsers(required=True)
+
+    publish_parser = subparsers.add_parser(
+        "publish",
+        help="Publish the agents, tools and result types of a local directory.",
+    )
+    publish_parser.add_argument("repo_id", help="Hugging Face repo ID.")
+    publish_parser.add_argument(
+        "directory",
+        help="Directory with agents/, tools/ and result_types/ subdirectories.",
+    )
+    publish_parser.add_argument("-m", "--message", help="Commit message.")
+    publish_parser.set_defaults(func=publish)
+
+    warm_parser = subparsers.add_parser(
+        "warm",
+        help="Prefetch, compile and build agents, e.g. at image build time.",
+    )
+    warm_parser.add_argument("repo_id", help="Hugging Face repo ID.")
+    warm_parser.add_argument("-r", "--revision", help="Revision to pin.")
+    warm_parser.add_argument(
+        "-a",
+        "--agent",
+        action="append",
+        help="Agent to warm. Can be repeated. Defaults to all agents.",
+    )
+    warm_parser.add_argument("--marker", help="Path of the warm-cache marker.")
+    warm_parser.add_argument(
+        "--keep-revisions",
+        type=int,
+        help="Prune all but this many recent revisions of the repo afterwards.",
+    )
+    warm_parser.set_defaults(func=warm)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run the CLI."""
+    args = build_parser().parse_args(argv)
+    args.func(args)
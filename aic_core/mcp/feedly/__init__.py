@@ -1,8 +1,36 @@
 """Feedly MCP server."""
 
+import argparse
+from collections.abc import Sequence
 from .server import server
 
 
-def main() -> None:  # pragma: no cover
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(prog="feedly-mcp", description=__doc__)
+    parser.add_argument(
+        "-t",
+        "--transport",
+        choices=TRANSPORTS,
+        default="stdio",
+        help="Transport to serve. Network transports serve many agent workers "
+        "from one process, at /sse or /mcp respectively.",
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="Host to listen on over the network."
+    )
+    parser.add_argument(
+        "-p", "--port", type=int, default=8000, help="Port to listen on."
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
     """Start the MCP server."""
-    server.run()
+    args = build_parser().parse_args(argv)
+    server.settings.host = args.host
+    server.settings.port = args.port
+    server.run(transport=args.transport)
@@ -5,7 +5,6 @@ import streamlit as st
 from code_editor import code_editor
 from pydantic_ai.models import KnownModelName
 from aic_core.agent.agent import AgentConfig
-from aic_core.agent.agent_hub import AgentHub
 from aic_core.agent.result_types import ComponentRegistry
 from aic_core.streamlit.mixins import AgentSelectorMixin, ToolSelectorMixin
 from aic_core.streamlit.page import AICPage
@@ -127,10 +126,8 @@ class AgentConfigPage(AICPage, AgentSelectorMixin, ToolSelectorMixin):
         )
 
     def save_config(self, config: AgentConfig) -> None:
-        """Save the config and trigger a re-download of the files."""
+        """Save the config. Only the changed files are re-downloaded."""
         config.push_to_hub()
-        hf_repo = AgentHub(self.repo_id)
-        hf_repo.download_files()
 
     def run(self) -> None:
         """Main function."""
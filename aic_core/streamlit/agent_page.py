@@ -13,6 +13,7 @@ from pydantic_ai.messages import (
     UserPromptPart,
 )
 from aic_core.agent.agent import AICAgent
+from aic_core.agent.agent_pool import AgentPool
 from aic_core.agent.result_types import ComponentRegistry
 from aic_core.streamlit.mixins import AgentSelectorMixin
 from aic_core.streamlit.page import AICPage
@@ -119,7 +120,9 @@ class AgentPage(AICPage, AgentSelectorMixin):
         self.display_chat_history()
 
         agent_name = self.agent_selector(self.repo_id)
-        self.agent = AICAgent(self.repo_id, agent_name)
+        # Reruns and sessions share the agent built for the config
+        agent = AgentPool.get(self.repo_id, agent_name)
+        self.agent = AICAgent(self.repo_id, agent_name, agent)
         st.sidebar.button("Reset chat history", on_click=self.reset_chat_history)
         user_input = st.chat_input("Enter a message")
 
@@ -49,7 +49,7 @@ class ToolConfigPage(AICPage, ToolSelectorMixin):
         return module
 
     def save_tool(self, tool_name: str, code: str) -> None:
-        """Save tool."""
+        """Save tool. Only the changed files are re-downloaded."""
         hf_repo = AgentHub(self.repo_id)
         try:
             # Test loading the code as a module
@@ -70,16 +70,23 @@ class ToolConfigPage(AICPage, ToolSelectorMixin):
         except Exception as e:  # pragma: no cover
             st.error(f"Error loading code as module: {str(e)}")
             st.stop()
-        hf_repo.download_files()
 
     def edit_tool(self, tool_name: str) -> None:
         """Edit tool."""
         hf_repo = AgentHub(self.repo_id)
         if tool_name:
-            try:
-                file_path = hf_repo.get_file_path(tool_name, AgentHub.tools_dir)
-            except EntryNotFoundError:
-                file_path = hf_repo.get_file_path(tool_name, AgentHub.result_types_dir)
+            subdir = hf_repo.locate(
+                tool_name, [AgentHub.tools_dir, AgentHub.result_types_dir]
+            )
+            if subdir:
+                file_path = hf_repo.get_file_path(tool_name, subdir)
+            else:  # Not indexed
+                try:
+                    file_path = hf_repo.get_file_path(tool_name, AgentHub.tools_dir)
+                except EntryNotFoundError:
+                    file_path = hf_repo.get_file_path(
+                        tool_name, AgentHub.result_types_dir
+                    )
             with open(file_path) as f:
                 default_code = f.read()
         else:
@@ -1,12 +1,33 @@
+import itertools
 import os
+import threading
+import time
 from typing import Union
 from unittest.mock import AsyncMock, MagicMock, Mock, patch
 import pytest
-from huggingface_hub.errors import LocalEntryNotFoundError
+from huggingface_hub.errors import LocalEntryNotFoundError, RepositoryNotFoundError
+from pydantic import BaseModel
 from pydantic_ai import Agent, Tool
 from pydantic_ai.messages import ModelRequest, RetryPromptPart, TextPart
-from aic_core.agent.agent import AgentConfig, AgentFactory, AICAgent, MCPServerStdio
+from aic_core.agent.agent import (
+    AgentConfig,
+    AgentFactory,
+    AICAgent,
+    configure_logfire,
+)
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.lazy_tools import LazyTool
+from aic_core.agent.mcp_pool import PooledMCPServer
 from aic_core.agent.result_types import TableOutput
+from aic_core.agent.storage import InMemoryBackend
+from aic_core.agent.validator import InvalidConfigError
+
+
+@pytest.fixture(autouse=True)
+def clear_hf_tools():
+    AgentFactory.clear_hf_tools()
+    yield
+    AgentFactory.clear_hf_tools()
 
 
 def test_agent_config_initialization():
@@ -27,7 +48,7 @@ def test_agent_config_initialization():
     assert config.mcp_servers == []
 
 
-@patch("aic_core.agent.agent.AgentHub")
+@patch("aic_core.agent.agent_hub.AgentHub")
 def test_from_hub(mock_agent_hub):
     """Test loading config from Hugging Face Hub."""
     # Create a Mock instance for the repo
@@ -48,9 +69,10 @@ def test_from_hub(mock_agent_hub):
     assert config.name == "TestAgent"
     assert config.system_prompt == "Test prompt"
     mock_repo.load_config.assert_called_with("agent")
+    mock_agent_hub.assert_called_once_with("test-repo", agent_name="agent")
 
 
-@patch("aic_core.agent.agent.AgentHub")
+@patch("aic_core.agent.agent_hub.AgentHub")
 def test_push_to_hub(mock_agent_hub):
     """Test pushing config to Hugging Face Hub."""
     mock_repo = Mock()
@@ -58,9 +80,22 @@ def test_push_to_hub(mock_agent_hub):
 
     config = AgentConfig(model="openai:gpt-4o", name="TestAgent", repo_id="test-repo")
 
-    config.push_to_hub()
+    with patch.object(AgentFactory, "create_agent") as mock_create_agent:
+        config.push_to_hub()
 
     mock_repo.upload_content.assert_called_once()
+    mock_create_agent.assert_not_called()
+
+
+@patch("aic_core.agent.agent_hub.AgentHub")
+def test_push_to_hub_invalid(mock_agent_hub):
+    """Test invalid configs are not pushed."""
+    config = AgentConfig(model="gpt-4o", name="TestAgent", repo_id="test-repo")
+
+    with pytest.raises(InvalidConfigError, match="model"):
+        config.push_to_hub()
+
+    mock_agent_hub.return_value.upload_content.assert_not_called()
 
 
 @pytest.fixture
@@ -141,7 +176,7 @@ def test_get_result_type_single(agent_factory):
     assert isinstance(agent_factory.get_result_type(), type(str))
 
 
-@patch("aic_core.agent.agent.AgentHub")
+@patch("aic_core.agent.agent_hub.AgentHub")
 def test_get_result_type_structured_output(mock_agent_hub, agent_factory):
     # Setup mock for AgentHub
     mock_repo = Mock()
@@ -166,7 +201,7 @@ def test_get_result_type_known_type(agent_factory):
     assert result == TableOutput
 
 
-@patch("aic_core.agent.agent.AgentHub")
+@patch("aic_core.agent.agent_hub.AgentHub")
 def test_get_tools(mock_agent_hub, agent_factory):
     # Setup mocks
     def example_tool():
@@ -188,23 +223,21 @@ def test_get_tools(mock_agent_hub, agent_factory):
 def test_get_mcp_servers(agent_factory):
     servers = agent_factory.get_mcp_servers()
     assert len(servers) == 2
-    assert servers[0] == MCPServerStdio("command1", ["arg1", "arg2"])
-    assert servers[1] == MCPServerStdio("command2", [])
+    assert servers[0] == PooledMCPServer("command1", ["arg1", "arg2"])
+    assert servers[1] == PooledMCPServer("command2", [])
 
 
-@patch("aic_core.agent.agent.OpenAIProvider")
+@patch("pydantic_ai.providers.openai.OpenAIProvider")
 def test_create_agent(mock_provider, agent_factory):
     # Setup mocks
     mock_provider_instance = Mock()
     mock_provider.return_value = mock_provider_instance
 
     with (
-        patch.object(AgentFactory, "get_tools") as mock_get_tools,
-        patch.object(AgentFactory, "get_result_type") as mock_get_result_type,
+        patch.object(AgentFactory, "_tool_loaders", return_value=[]),
+        patch.object(AgentFactory, "_result_type_loaders", return_value=[]),
         patch.object(AgentFactory, "get_mcp_servers") as mock_get_mcp_servers,
     ):
-        mock_get_tools.return_value = []
-        mock_get_result_type.return_value = str
         mock_get_mcp_servers.return_value = []
 
         agent = agent_factory.create_agent("test-api-key")
@@ -213,19 +246,35 @@ def test_create_agent(mock_provider, agent_factory):
         mock_provider.assert_called_once_with(api_key="test-api-key")
 
 
-def test_agent_with_logfire():
-    """Test agent initialization with logfire."""
-    with patch.dict(os.environ, {"LOGFIRE_TOKEN": "test-token"}):
-        with patch("logfire.configure") as mock_configure:
-            with patch("logfire.instrument_pydantic_ai") as mock_instrument:
-                # Re-import to trigger the logfire configuration
-                from importlib import reload
-                import aic_core.agent.agent
+def test_agent_with_logfire(agent_factory):
+    """Test logfire is configured once, when the first agent is created."""
+    configure_logfire.cache_clear()
+    with (
+        patch.dict(os.environ, {"LOGFIRE_TOKEN": "test-token"}),
+        patch("logfire.configure") as mock_configure,
+        patch("logfire.instrument_pydantic_ai") as mock_instrument,
+        patch.object(AgentFactory, "_tool_loaders", return_value=[]),
+        patch.object(AgentFactory, "_result_type_loaders", return_value=[]),
+        patch.object(AgentFactory, "get_mcp_servers", return_value=[]),
+    ):
+        agent_factory.create_agent("test-api-key")
+        agent_factory.create_agent("test-api-key")
+
+        mock_configure.assert_called_once()
+        mock_instrument.assert_called_once()
+    configure_logfire.cache_clear()
 
-                reload(aic_core.agent.agent)
 
-                mock_configure.assert_called_once()
-                mock_instrument.assert_called_once()
+def test_agent_without_logfire():
+    """Test logfire is not configured without a token."""
+    configure_logfire.cache_clear()
+    with (
+        patch.dict(os.environ, {}, clear=True),
+        patch("logfire.configure") as mock_configure,
+    ):
+        assert configure_logfire() is False
+        mock_configure.assert_not_called()
+    configure_logfire.cache_clear()
 
 
 @pytest.mark.asyncio
@@ -261,7 +310,7 @@ async def test_aic_agent_skip_retry_msgs():
 
     with (
         patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}),
-        patch("aic_core.agent.agent.AgentHub", return_value=mock_hub),
+        patch("aic_core.agent.agent_hub.AgentHub", return_value=mock_hub),
         patch("pydantic_ai.models.openai.OpenAIModel") as mock_model_cls,
         patch("pydantic_ai.providers.openai.OpenAIProvider") as mock_provider_cls,
         patch("openai.AsyncOpenAI") as mock_openai_cls,
@@ -340,8 +389,8 @@ def test_get_mcp_servers_with_empty_server(agent_factory):
     agent_factory.config.mcp_servers = ["command1", "", "command2"]
     servers = agent_factory.get_mcp_servers()
     assert len(servers) == 2
-    assert servers[0] == MCPServerStdio("command1", [])
-    assert servers[1] == MCPServerStdio("command2", [])
+    assert servers[0] == PooledMCPServer("command1", [])
+    assert servers[1] == PooledMCPServer("command2", [])
 
 
 def test_get_mcp_servers_with_whitespace(agent_factory):
@@ -349,5 +398,213 @@ def test_get_mcp_servers_with_whitespace(agent_factory):
     agent_factory.config.mcp_servers = ["command1", "   ", "command2"]
     servers = agent_factory.get_mcp_servers()
     assert len(servers) == 2
-    assert servers[0] == MCPServerStdio("command1", [])
-    assert servers[1] == MCPServerStdio("command2", [])
+    assert servers[0] == PooledMCPServer("command1", [])
+    assert servers[1] == PooledMCPServer("command2", [])
+
+
+@patch("aic_core.agent.agent.load_tool")
+def test_hf_to_pai_tools_caches_misses(mock_load_tool):
+    mock_load_tool.side_effect = [
+        LocalEntryNotFoundError("Not found locally"),
+        RepositoryNotFoundError("Not found"),
+    ]
+    for _ in range(2):
+        with pytest.raises(RepositoryNotFoundError):
+            AgentFactory.hf_to_pai_tools("missing_tool")
+    assert mock_load_tool.call_count == 2
+
+
+@patch("aic_core.agent.agent.load_tool")
+def test_hf_to_pai_tools_offline(mock_load_tool):
+    mock_load_tool.side_effect = LocalEntryNotFoundError("Not found locally")
+    with (
+        patch.object(AgentHub, "offline", True),
+        pytest.raises(LocalEntryNotFoundError, match="offline"),
+    ):
+        AgentFactory.hf_to_pai_tools("missing_tool")
+    mock_load_tool.assert_called_once_with(
+        "missing_tool", trust_remote_code=True, local_files_only=True
+    )
+
+
+@patch("aic_core.agent.agent.load_tool")
+def test_hf_to_pai_tools_shared(mock_load_tool):
+    def forward(query: str) -> str:
+        """Search the web."""
+        return query
+
+    mock_load_tool.return_value = Mock(forward=forward)
+    mock_load_tool.return_value.name = "search"
+    tool = AgentFactory.hf_to_pai_tools("user/search")
+    assert AgentFactory.hf_to_pai_tools("user/search") is tool
+    assert AgentFactory.hf_to_pai_tools("user/search@v1") is not tool
+    mock_load_tool.assert_called_with(
+        "user/search", trust_remote_code=True, local_files_only=True, revision="v1"
+    )
+    assert mock_load_tool.call_count == 2
+    metrics = AgentFactory.hf_tool_metrics
+    assert (metrics.conversions, metrics.hits) == (2, 1)
+    assert metrics.hit_rate == 1 / 3
+
+
+def test_get_tools_lazy():
+    backend = InMemoryBackend()
+    hub = AgentHub("test-repo", backend=backend)
+    hub.upload_content(
+        "add", "def add(a: int, b: int) -> int:\n    return a + b\n", "tools"
+    )
+    hub.upload_content(
+        "scale",
+        "from decimal import Decimal\n\ndef scale(x: Decimal) -> Decimal:\n"
+        "    return x * 2\n",
+        "tools",
+    )
+    config = AgentConfig(
+        model="openai:gpt-4o", known_tools=["add", "scale"], repo_id="test-repo"
+    )
+    with (
+        patch.object(AgentHub, "default_backend", backend),
+        patch.object(AgentHub, "load_tool", wraps=hub.load_tool) as mock_load_tool,
+    ):
+        add, scale = AgentFactory(config).get_tools()
+        # Tools without a schema in the manifest are loaded right away
+        mock_load_tool.assert_called_once_with("scale")
+        assert isinstance(add, LazyTool) and not add.loaded
+        assert not isinstance(scale, LazyTool)
+        assert add.load()(1, 2) == 3
+    AgentHub.clear_cache()
+
+
+def echo(text: str) -> str:
+    return text
+
+
+def make_hf_tool(name):
+    tool = Mock()
+    tool.name = name
+    tool.description = f"The {name} tool."
+    tool.forward = echo
+    return tool
+
+
+def test_get_tools_loads_concurrently_in_order():
+    config = AgentConfig(
+        model="openai:gpt-4o", hf_tools=["user/a", "user/b", "user/c"], repo_id="r"
+    )
+    barrier = threading.Barrier(3, timeout=5)
+
+    def load_tool(repo_id, **kwargs):
+        barrier.wait()  # Only passes if all three tools load at once
+        return make_hf_tool(repo_id.split("/")[1])
+
+    with patch("aic_core.agent.agent.load_tool", side_effect=load_tool):
+        tools = AgentFactory(config).get_tools()
+    assert [tool.name for tool in tools] == ["a", "b", "c"]
+
+
+def test_get_tools_reports_all_errors():
+    config = AgentConfig(
+        model="openai:gpt-4o", hf_tools=["user/a", "user/b", "user/c"], repo_id="r"
+    )
+
+    def load_tool(repo_id, **kwargs):
+        if repo_id != "user/b":
+            raise RepositoryNotFoundError(f"{repo_id} not found")
+        return make_hf_tool("b")
+
+    with patch("aic_core.agent.agent.load_tool", side_effect=load_tool):
+        with pytest.raises(ExceptionGroup, match="HF tool user/a, HF tool user/c") as e:
+            AgentFactory(config).get_tools()
+    assert [str(error) for error in e.value.exceptions] == [
+        "user/a not found",
+        "user/c not found",
+    ]
+
+
+def test_get_tools_single_error_is_raised_as_is(monkeypatch):
+    config = AgentConfig(
+        model="openai:gpt-4o", hf_tools=["user/a", "user/b"], repo_id="r"
+    )
+    monkeypatch.setattr(AgentFactory, "max_workers", 1)
+
+    def load_tool(repo_id, **kwargs):
+        if repo_id == "user/b":
+            raise RepositoryNotFoundError(f"{repo_id} not found")
+        assert threading.current_thread() is threading.main_thread()
+        return make_hf_tool("a")
+
+    with patch("aic_core.agent.agent.load_tool", side_effect=load_tool):
+        with pytest.raises(RepositoryNotFoundError, match="user/b not found"):
+            AgentFactory(config).get_tools()
+
+
+def test_get_result_type_loads_hub_types_concurrently():
+    config = AgentConfig(
+        model="openai:gpt-4o", result_type=["Person", "Pet", "str"], repo_id="r"
+    )
+    barrier = threading.Barrier(2, timeout=5)
+
+    class Person(BaseModel):
+        name: str
+
+    class Pet(BaseModel):
+        species: str
+
+    types = {"Person": Person, "Pet": Pet}
+    calls = itertools.count()
+
+    def load_result_type(name):
+        # Only the first two loads are concurrent, the resolver then hits them
+        if next(calls) < 2:
+            barrier.wait()
+        return types[name]
+
+    with patch("aic_core.agent.agent_hub.AgentHub") as mock_agent_hub:
+        mock_agent_hub.return_value.load_result_type.side_effect = load_result_type
+        result_type = AgentFactory(config).get_result_type()
+    assert result_type == Union[Person, Pet, str]  # noqa: UP007
+
+
+def test_create_agent_loads_in_one_pool(monkeypatch):
+    monkeypatch.setattr(AgentFactory, "max_workers", 2)
+    config = AgentConfig(
+        model="openai:gpt-4o",
+        result_type=["Person", "Pet"],
+        hf_tools=["user/a", "user/b"],
+        repo_id="r",
+    )
+
+    class Person(BaseModel):
+        name: str
+
+    class Pet(BaseModel):
+        species: str
+
+    types = {"Person": Person, "Pet": Pet}
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def track(value):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return value
+
+    with (
+        patch("aic_core.agent.agent_hub.AgentHub") as mock_agent_hub,
+        patch(
+            "aic_core.agent.agent.load_tool",
+            side_effect=lambda repo_id, **kwargs: track(make_hf_tool(repo_id[-1])),
+        ),
+    ):
+        mock_agent_hub.return_value.load_result_type.side_effect = lambda name: track(
+            types[name]
+        )
+        agent = AgentFactory(config).create_agent(dry_run=True)
+    assert sorted(agent._function_tools) == ["a", "b"]
+    # Result types and tools are loaded by the same `max_workers` threads
+    assert peak == 2
@@ -1,10 +1,17 @@
-import time
+import asyncio
 from collections.abc import Callable
 from unittest.mock import Mock, mock_open, patch
 import pytest
-from huggingface_hub.errors import LocalEntryNotFoundError
+from huggingface_hub import CommitOperationDelete
+from huggingface_hub.errors import (
+    EntryNotFoundError,
+    LocalEntryNotFoundError,
+    OfflineModeIsEnabled,
+)
 from pydantic import BaseModel
-from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.agent_hub import OFFLINE_ENV, AgentHub, _env_flag
+from aic_core.agent.manifest import Manifest
+from aic_core.agent.storage import HfHubBackend, InMemoryBackend, StorageBackend
 
 
 # Test fixtures and helper classes
@@ -28,73 +35,149 @@ def test_init():
     assert repo.repo_id == "test-repo"
 
 
-@patch("aic_core.agent.agent_hub.snapshot_download")
-def test_load_files(mock_snapshot):
+@patch("aic_core.agent.storage.snapshot_download")
+@patch.object(HfHubBackend, "update_ref")
+@patch.object(HfHubBackend, "mark_complete")
+def test_load_files(mock_mark_complete, mock_update_ref, mock_snapshot):
     repo = AgentHub("test-repo")
     repo.download_files()
+    mock_mark_complete.assert_called_once_with(mock_snapshot.return_value)
     mock_snapshot.assert_called_once_with(
-        repo_id="test-repo", repo_type="space", local_files_only=False
+        repo_id="test-repo",
+        repo_type="space",
+        revision=None,
+        local_files_only=False,
+        allow_patterns=["agents/*", "tools/*", "result_types/*", "index.json"],
     )
 
 
-@patch("aic_core.agent.agent_hub.hf_hub_download")
+@patch("aic_core.agent.storage.hf_hub_download")
 def test_load_config(mock_download):
     repo = AgentHub("test-repo")
     mock_download.return_value = "config.json"
 
     with (
         patch("builtins.open", mock_open(read_data='{"key": "value"}')),
-        patch("aic_core.agent.agent_hub.AgentHub._lazy_update"),
+        patch(
+            "aic_core.agent.agent_hub.AgentHub._lazy_update",
+            return_value="/fake/snapshots/abc",
+        ),
     ):
         result = repo.load_config("config")
         assert result == {"key": "value"}
 
 
-@patch("aic_core.agent.agent_hub.hf_hub_download")
-@patch("aic_core.agent.agent_hub.importlib.util")
-def test_load_tool(mock_importlib, mock_download):
+@patch("aic_core.agent.storage.hf_hub_download")
+@patch.object(AgentHub, "_modules")
+def test_load_tool(mock_modules, mock_download):
     repo = AgentHub("test-repo")
     mock_download.return_value = "/path/to/tool.py"
 
     # Setup mock module
     mock_module = Mock()
     mock_module.tool = dummy_function
-    mock_spec = Mock()
-    mock_spec.loader = Mock()
-
-    mock_importlib.spec_from_file_location.return_value = mock_spec
-    mock_importlib.module_from_spec.return_value = mock_module
+    mock_modules.load.return_value = mock_module
 
     with (
-        patch("aic_core.agent.agent_hub.AgentHub._lazy_update"),
+        patch(
+            "aic_core.agent.agent_hub.AgentHub._lazy_update",
+            return_value="/fake/snapshots/abc",
+        ),
     ):
         result = repo.load_tool("tool")
         assert isinstance(result, Callable)
 
 
-@patch("aic_core.agent.agent_hub.hf_hub_download")
-@patch("aic_core.agent.agent_hub.importlib.util")
-def test_load_structured_output(mock_importlib, mock_download):
+@patch("aic_core.agent.storage.hf_hub_download")
+@patch.object(AgentHub, "_modules")
+def test_load_structured_output(mock_modules, mock_download):
     repo = AgentHub("test-repo")
     mock_download.return_value = "/path/to/model.py"
 
     # Setup mock module
     mock_module = Mock()
     mock_module.model = DummyModel
-    mock_spec = Mock()
-    mock_spec.loader = Mock()
-
-    mock_importlib.spec_from_file_location.return_value = mock_spec
-    mock_importlib.module_from_spec.return_value = mock_module
+    mock_modules.load.return_value = mock_module
 
     with (
-        patch("aic_core.agent.agent_hub.AgentHub._lazy_update"),
+        patch(
+            "aic_core.agent.agent_hub.AgentHub._lazy_update",
+            return_value="/fake/snapshots/abc",
+        ),
     ):
         result = repo.load_result_type("model")
         assert issubclass(result, BaseModel)
+        mock_modules.load.assert_called_once_with(
+            "aic_hub.test_repo.result_types.model", "/path/to/model.py"
+        )
+
+
+@patch("aic_core.agent.storage.hf_hub_download")
+def test_load_config_cached_per_revision(mock_download):
+    repo = AgentHub("test-repo")
+    mock_download.return_value = "config.json"
+
+    with (
+        patch("builtins.open", mock_open(read_data='{"key": "value"}')) as m_open,
+        patch.object(
+            AgentHub, "_lazy_update", return_value="/fake/snapshots/abc"
+        ) as mock_update,
+    ):
+        first = repo.load_config("config")
+        first["key"] = "mutated"
+        second = AgentHub("test-repo").load_config("config.json")
+        assert second == {"key": "value"}
+        assert mock_download.call_count == 1
+        assert m_open.call_count == 1
+
+        # A new revision invalidates the cached entries of the old one
+        mock_update.return_value = "/fake/snapshots/def"
+        repo.load_config("config")
+        assert mock_download.call_count == 2
+        assert ("test-repo", "abc", "agents", "config") not in AgentHub._cache
+        assert ("test-repo", "def", "agents", "config") in AgentHub._cache
+
+
+@patch("aic_core.agent.storage.hf_hub_download")
+def test_load_tool_cached(mock_download):
+    repo = AgentHub("test-repo")
+    mock_download.return_value = "/path/to/tool.py"
+
+    with (
+        patch.object(AgentHub, "_lazy_update", return_value="/fake/snapshots/abc"),
+        patch.object(AgentHub, "_load_module") as mock_load_module,
+    ):
+        mock_load_module.return_value = Mock(tool=dummy_function)
+        assert repo.load_tool("tool") is dummy_function
+        assert repo.load_tool("tool") is dummy_function
+        mock_load_module.assert_called_once_with("tool", "/path/to/tool.py", "tools")
+
+        # Other repos do not share entries
+        AgentHub("other-repo").load_tool("tool")
+        assert mock_load_module.call_count == 2
+
 
+@pytest.fixture
+def mock_commit():
+    with (
+        patch.object(AgentHub, "remote_revision", return_value="head"),
+        patch.object(AgentHub, "_remote_manifest", return_value=Manifest()),
+        patch.object(AgentHub, "_advance_snapshot"),
+        patch("aic_core.agent.storage.HfApi") as mock_api,
+    ):
+        mock_api.return_value.create_commit.return_value = Mock(oid="new-head")
+        yield mock_api.return_value.create_commit
 
-def test_upload_content():
+
+def committed(mock_create_commit):
+    """Get the operations and manifest of the last commit."""
+    operations = mock_create_commit.call_args.kwargs["operations"]
+    *file_ops, index_op = operations
+    assert index_op.path_in_repo == "index.json"
+    return file_ops, Manifest.model_validate_json(index_op.path_or_fileobj)
+
+
+def test_upload_content(mock_commit):
     # Initialize the repo
     repo = AgentHub("test-repo")
 
@@ -111,18 +194,21 @@ def test_upload_content():
     ]
 
     for filename, content, subdir, extension in test_cases:
-        with patch("aic_core.agent.agent_hub.upload_file") as mock_upload:
-            # Call the method
-            repo.upload_content(filename, content, subdir)
-
-            # Verify upload_file was called with correct arguments
-            mock_upload.assert_called_once_with(
-                path_or_fileobj=content.encode("utf-8"),
-                path_in_repo=f"{subdir}/{filename}{extension}",
-                repo_id=repo.repo_id,
-                repo_type=repo.repo_type,
-                commit_message=f"Update {filename}{extension}",
-            )
+        mock_commit.reset_mock()
+        # Call the method
+        repo.upload_content(filename, content, subdir)
+
+        # Verify one commit with the file and the updated manifest
+        mock_commit.assert_called_once()
+        kwargs = mock_commit.call_args.kwargs
+        assert kwargs["repo_id"] == repo.repo_id
+        assert kwargs["repo_type"] == repo.repo_type
+        assert kwargs["commit_message"] == f"Update {filename}{extension}"
+        assert kwargs["parent_commit"] == "head"
+        (file_op,), manifest = committed(mock_commit)
+        assert file_op.path_in_repo == f"{subdir}/{filename}{extension}"
+        assert file_op.path_or_fileobj == content.encode("utf-8")
+        assert manifest.names(subdir) == [filename]
 
 
 def test_upload_content_invalid_subdir():
@@ -132,101 +218,136 @@ def test_upload_content_invalid_subdir():
         repo.upload_content("test", "content", "invalid_dir")
 
 
-def test_upload_content_with_extension():
+def test_upload_content_with_extension(mock_commit):
     repo = AgentHub("test-repo")
 
-    with (
-        patch("aic_core.agent.agent_hub.upload_file") as mock_upload,
-    ):
-        # Call with filename that already has extension
-        repo.upload_content("test_tool.py", "content", "tools")
-
-        # Verify correct handling of existing extension
-        mock_upload.assert_called_once_with(
-            path_or_fileobj=b"content",
-            path_in_repo="tools/test_tool.py",
-            repo_id=repo.repo_id,
-            repo_type=repo.repo_type,
-            commit_message="Update test_tool.py",
-        )
+    # Call with filename that already has extension
+    repo.upload_content("test_tool.py", "content", "tools")
 
+    # Verify correct handling of existing extension
+    (file_op,), manifest = committed(mock_commit)
+    assert file_op.path_in_repo == "tools/test_tool.py"
+    assert manifest.names("tools") == ["test_tool"]
+    assert mock_commit.call_args.kwargs["commit_message"] == "Update test_tool.py"
 
-def test_list_files_existing_directory():
-    """Test listing files in an existing directory."""
-    with (
-        patch("aic_core.agent.agent_hub.snapshot_download") as mock_snapshot,
-        patch("os.path.exists") as mock_exists,
-        patch("os.path.isdir") as mock_isdir,
-        patch("os.listdir") as mock_listdir,
-        patch("os.path.isfile") as mock_isfile,
-    ):
-        # Setup mocks
-        mock_snapshot.return_value = "/fake/repo/path"
-        mock_exists.return_value = True
-        mock_isdir.return_value = True
-        mock_listdir.return_value = ["file1.py", "file2.py", "file3.json"]
-        mock_isfile.return_value = True
 
+def write_snapshot(path, files):
+    for name, content in files.items():
+        file_path = path / name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+    return str(path)
+
+
+def test_list_files_existing_directory(tmp_path):
+    """Test listing files in an existing directory."""
+    snapshot = write_snapshot(
+        tmp_path / "sha1",
+        {
+            "tools/file1.py": "def file1(): pass",
+            "tools/file2.py": "def file2(): pass",
+            "tools/file3.json": "{}",
+            "tools/nested/file4.py": "",
+        },
+    )
+    with patch.object(AgentHub, "_lazy_update", return_value=snapshot):
         hub = AgentHub("test-repo")
         files = hub.list_files("tools")
 
         # Verify results
         assert files == ["file1", "file2", "file3"]
-        mock_snapshot.assert_called_once_with(
-            repo_id=hub.repo_id, repo_type=hub.repo_type, local_files_only=True
-        )
 
 
-def test_list_files_nonexistent_directory():
+def test_list_files_nonexistent_directory(tmp_path):
     """Test listing files in a non-existent directory."""
-    with (
-        patch("aic_core.agent.agent_hub.snapshot_download") as mock_snapshot,
-        patch("os.path.exists") as mock_exists,
-    ):
-        mock_snapshot.return_value = "/fake/repo/path"
-        mock_exists.return_value = False
+    snapshot = write_snapshot(tmp_path / "sha1", {"tools/file1.py": ""})
+    with patch.object(AgentHub, "_lazy_update", return_value=snapshot):
+        hub = AgentHub("test-repo")
+        assert hub.list_files("nonexistent") == []
+        assert hub.list_files("agents") == []
 
+
+def test_list_files_not_a_directory(tmp_path):
+    """Test listing files when path exists but is not a directory."""
+    snapshot = write_snapshot(tmp_path / "sha1", {"agents": "not a dir"})
+    with patch.object(AgentHub, "_lazy_update", return_value=snapshot):
         hub = AgentHub("test-repo")
-        files = hub.list_files("nonexistent")
+        files = hub.list_files("agents")
 
         assert files == []
 
 
-def test_list_files_not_a_directory():
-    """Test listing files when path exists but is not a directory."""
-    with (
-        patch("aic_core.agent.agent_hub.snapshot_download") as mock_snapshot,
-        patch("os.path.exists") as mock_exists,
-        patch("os.path.isdir") as mock_isdir,
-    ):
-        mock_snapshot.return_value = "/fake/repo/path"
-        mock_exists.return_value = True
-        mock_isdir.return_value = False
-
+def test_load_manifest_prefers_index_file(tmp_path):
+    manifest = Manifest()
+    manifest.update("tools", "indexed", "def indexed(): pass")
+    snapshot = write_snapshot(
+        tmp_path / "sha1",
+        {
+            "index.json": manifest.model_dump_json(),
+            "tools/indexed.py": "def indexed(): pass",
+            "tools/not_indexed.py": "def not_indexed(): pass",
+        },
+    )
+    with patch.object(AgentHub, "_lazy_update", return_value=snapshot):
         hub = AgentHub("test-repo")
-        files = hub.list_files("not_a_dir")
+        assert hub.load_manifest().names("tools") == ["indexed"]
+        # Files committed without updating the index are listed too
+        assert hub.list_files("tools") == ["indexed", "not_indexed"]
+        # The parsed manifest is reused for the same revision
+        assert hub.load_manifest() is hub.load_manifest()
+
+
+def test_remote_manifest(tmp_path):
+    manifest = Manifest()
+    manifest.update("tools", "tool", "def tool(): pass")
+    index = tmp_path / "index.json"
+    index.write_text(manifest.model_dump_json())
+    hub = AgentHub("test-repo")
 
-        assert files == []
+    with patch(
+        "aic_core.agent.storage.hf_hub_download", return_value=str(index)
+    ) as mock_download:
+        assert hub._remote_manifest("head") == manifest
+        mock_download.assert_called_once_with(
+            repo_id="test-repo",
+            filename="index.json",
+            subfolder=None,
+            local_files_only=False,
+            repo_type="space",
+            revision="head",
+        )
+
+    # Repos without an index fall back to scanning a snapshot
+    snapshot = write_snapshot(tmp_path / "head", {"tools/other.py": ""})
+    with (
+        patch(
+            "aic_core.agent.storage.hf_hub_download",
+            side_effect=EntryNotFoundError("missing"),
+        ),
+        patch("aic_core.agent.storage.snapshot_download", return_value=snapshot),
+    ):
+        assert hub._remote_manifest("head").names("tools") == ["other"]
 
 
 @pytest.mark.parametrize("subdir", ["tools", "agents", "result_types"])
-def test_delete_file_valid_subdirs(subdir):
+def test_delete_file_valid_subdirs(subdir, mock_commit):
     # Arrange
     repo_id = "test-repo"
     hub = AgentHub(repo_id)
     filename = "test_file"
+    hub._remote_manifest.return_value.update(subdir, filename, "")
 
     # Act
-    with patch("aic_core.agent.agent_hub.delete_file") as mock_delete:
-        hub.delete_file(filename, subdir)
+    hub.delete_file(filename, subdir)
 
     # Assert
-    mock_delete.assert_called_once_with(
-        path_in_repo=f"{subdir}/{filename}", repo_id=repo_id, repo_type="space"
-    )
+    (file_op,), manifest = committed(mock_commit)
+    assert isinstance(file_op, CommitOperationDelete)
+    assert file_op.path_in_repo == f"{subdir}/{filename}"
+    assert manifest.names(subdir) == []
 
 
-def test_delete_file_invalid_subdir():
+def test_delete_file_invalid_subdir(mock_commit):
     # Arrange
     repo_id = "test-repo"
     hub = AgentHub(repo_id)
@@ -234,53 +355,313 @@ def test_delete_file_invalid_subdir():
     invalid_subdir = "invalid_dir"
 
     # Act & Assert
-    with patch("aic_core.agent.agent_hub.delete_file") as mock_delete:
-        hub.delete_file(filename, invalid_subdir)
-        mock_delete.assert_called_once_with(
-            path_in_repo=f"{invalid_subdir}/{filename}",
-            repo_id=repo_id,
+    hub.delete_file(filename, invalid_subdir)
+    (file_op,), _ = committed(mock_commit)
+    assert file_op.path_in_repo == f"{invalid_subdir}/{filename}"
+
+
+def test_rebuild_manifest(tmp_path, mock_commit):
+    snapshot = write_snapshot(
+        tmp_path / "head",
+        {"agents/agent.json": '{"model": "openai:gpt-4o"}', "tools/tool.py": ""},
+    )
+    with patch("aic_core.agent.storage.snapshot_download", return_value=snapshot):
+        AgentHub("test-repo").rebuild_manifest()
+
+    file_ops, manifest = committed(mock_commit)
+    assert file_ops == []
+    assert manifest.names("agents") == ["agent"]
+    assert manifest.agents["agent"].model == "openai:gpt-4o"
+    assert manifest.names("tools") == ["tool"]
+
+
+def test_batch_single_commit(mock_commit):
+    hub = AgentHub("test-repo")
+    with hub.batch("Publish agent"):
+        hub.upload_content("tool", "def tool(): pass", "tools")
+        hub.upload_content("Model", "class Model: pass", "result_types")
+        hub.delete_file("old.py", "tools")
+        mock_commit.assert_not_called()
+
+    mock_commit.assert_called_once()
+    assert mock_commit.call_args.kwargs["commit_message"] == "Publish agent"
+    file_ops, manifest = committed(mock_commit)
+    assert [op.path_in_repo for op in file_ops] == [
+        "tools/tool.py",
+        "result_types/Model.py",
+        "tools/old.py",
+    ]
+    assert manifest.names("tools") == ["tool"]
+    assert manifest.names("result_types") == ["Model"]
+    hub._advance_snapshot.assert_called_once_with(
+        "head",
+        "new-head",
+        changed_paths=["tools/tool.py", "result_types/Model.py", "index.json"],
+        stale_paths=["tools/old.py"],
+    )
+
+
+def test_batch_discarded_on_error(mock_commit):
+    hub = AgentHub("test-repo")
+    with pytest.raises(RuntimeError, match="boom"):
+        with hub.batch():
+            hub.upload_content("tool", "def tool(): pass", "tools")
+            raise RuntimeError("boom")
+    mock_commit.assert_not_called()
+
+    # The hub is usable again, and empty batches push nothing
+    with hub.batch():
+        pass
+    mock_commit.assert_not_called()
+
+
+def test_batch_not_reentrant():
+    hub = AgentHub("test-repo")
+    with pytest.raises(RuntimeError, match="already in progress"):
+        with hub.batch(), hub.batch():
+            pass  # pragma: no cover
+
+
+def test_upload_directory(tmp_path, mock_commit):
+    write_snapshot(
+        tmp_path,
+        {
+            "agents/agent.json": "{}",
+            "tools/tool.py": "def tool(): pass",
+            "tools/README.md": "ignored",
+            "notebooks/demo.ipynb": "ignored",
+        },
+    )
+    assert AgentHub("test-repo").upload_directory(str(tmp_path)) == 2
+    mock_commit.assert_called_once()
+    file_ops, _ = committed(mock_commit)
+    assert [op.path_in_repo for op in file_ops] == [
+        "agents/agent.json",
+        "tools/tool.py",
+    ]
+
+
+def test_advance_snapshot(tmp_path):
+    blobs = tmp_path / "blobs"
+    blobs.mkdir()
+    old = tmp_path / "snapshots" / "old"
+    for path, blob in [("tools/kept.py", "b1"), ("tools/changed.py", "b2")]:
+        (blobs / blob).write_text(path)
+        (old / path).parent.mkdir(parents=True, exist_ok=True)
+        (old / path).symlink_to(f"../../../blobs/{blob}")
+    (old / "tools" / "deleted.py").symlink_to("../../../blobs/b1")
+
+    def fake_hf_hub_download(repo_id, filename, subfolder, revision, **kwargs):
+        dst = tmp_path / "snapshots" / revision / subfolder / filename
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.write_text("new content")
+        return str(dst)
+
+    hub = AgentHub("test-repo")
+    hub._serve(str(old))
+    AgentHub._cache.set(("test-repo", "old", "tools", "kept"), "kept-func")
+    AgentHub._cache.set(("test-repo", "old", "tools", "changed"), "changed-func")
+
+    with patch(
+        "aic_core.agent.storage.hf_hub_download", side_effect=fake_hf_hub_download
+    ) as mock_download:
+        path = hub._advance_snapshot(
+            "old",
+            "new",
+            changed_paths=["tools/changed.py"],
+            stale_paths=["tools/deleted.py"],
+        )
+
+    new = tmp_path / "snapshots" / "new"
+    assert path == str(new)
+    mock_download.assert_called_once()
+    assert (new / "tools" / "kept.py").read_text() == "tools/kept.py"
+    assert (new / "tools" / "changed.py").read_text() == "new content"
+    assert not (new / "tools" / "deleted.py").exists()
+    assert AgentHub._snapshots[hub._snapshot_key].sha == "new"
+    assert AgentHub._cache.get(("test-repo", "new", "tools", "kept")) == "kept-func"
+    assert ("test-repo", "new", "tools", "changed") not in AgentHub._cache
+
+
+def test_keep_warm_compares_snapshot_files(tmp_path):
+    """Objects are carried over only for identical files, whatever the index."""
+    files = {"tools/kept.py": "kept", "tools/edited.py": "old"}
+    old = write_snapshot(tmp_path / "old", {"index.json": "{}", **files})
+    new = write_snapshot(
+        tmp_path / "new", {"index.json": "{}", **files, "tools/edited.py": "new"}
+    )
+    hub = AgentHub("test-repo")
+    hub._serve(old)
+    for name in ("kept", "edited", "missing"):
+        AgentHub._cache.set(("test-repo", "old", "tools", name), name)
+
+    hub._serve(new)
+    assert AgentHub._cache.get(("test-repo", "new", "tools", "kept")) == "kept"
+    assert ("test-repo", "new", "tools", "edited") not in AgentHub._cache
+    assert ("test-repo", "new", "tools", "missing") not in AgentHub._cache
+
+
+def test_advance_snapshot_without_served_snapshot():
+    hub = AgentHub("test-repo")
+    with patch.object(
+        AgentHub, "_serve_local_or_download", return_value="/snapshots/new"
+    ) as mock_serve:
+        path = hub._advance_snapshot("old", "new", ["tools/tool.py"])
+        assert path == "/snapshots/new"
+        mock_serve.assert_called_once_with("new")
+
+
+def test_advance_snapshot_from_other_parent(tmp_path):
+    """Changes relative to a revision other than the served one are not used."""
+    hub = AgentHub("test-repo")
+    hub._serve(write_snapshot(tmp_path / "served", {"tools/tool.py": ""}))
+    with (
+        patch.object(
+            AgentHub, "_serve_local_or_download", return_value="/snapshots/new"
+        ) as mock_serve,
+        patch.object(hub.backend, "advance") as mock_advance,
+    ):
+        path = hub._advance_snapshot("parent", "new", ["tools/tool.py"])
+    assert path == "/snapshots/new"
+    mock_serve.assert_called_once_with("new")
+    mock_advance.assert_not_called()
+
+
+class FakeHfApi:
+    """Stand-in for HfApi that serves a configurable commit sha."""
+
+    sha = "sha1"
+    calls = 0
+
+    def repo_info(self, repo_id, repo_type=None, revision=None):
+        FakeHfApi.calls += 1
+        if isinstance(FakeHfApi.sha, Exception):
+            raise FakeHfApi.sha
+        return Mock(sha=FakeHfApi.sha)
+
+
+@pytest.fixture
+def fake_api():
+    FakeHfApi.sha = "sha1"
+    FakeHfApi.calls = 0
+    with (
+        patch("aic_core.agent.storage.HfApi", FakeHfApi),
+        # The fake snapshot directories do not exist
+        patch.object(HfHubBackend, "mark_complete"),
+        patch.object(HfHubBackend, "update_ref"),
+    ):
+        yield FakeHfApi
+
+
+def fake_snapshot_download(repo_id, repo_type, revision, **kwargs):
+    return f"/cache/{repo_id}/snapshots/{revision or 'main-sha'}"
+
+
+def test_lazy_update(fake_api):
+    """Only one revision query per interval, and download only on a new sha."""
+    with patch(
+        "aic_core.agent.storage.snapshot_download",
+        side_effect=fake_snapshot_download,
+    ) as mock_snapshot:
+        hub = AgentHub("test-repo")
+
+        # First call resolves the sha and serves the locally cached snapshot
+        assert hub._lazy_update() == "/cache/test-repo/snapshots/sha1"
+        assert fake_api.calls == 1
+        mock_snapshot.assert_called_once_with(
+            repo_id="test-repo",
             repo_type="space",
+            revision="sha1",
+            local_files_only=True,
+            allow_patterns=None,
         )
 
+        # Fresh: no query and no download
+        assert AgentHub("test-repo")._lazy_update().endswith("sha1")
+        assert fake_api.calls == 1
+        assert mock_snapshot.call_count == 1
+
+        # Stale but unchanged: one query, no download
+        AgentHub._snapshots[hub._snapshot_key].checked_at -= hub.update_interval + 1
+        assert hub._lazy_update().endswith("sha1")
+        assert fake_api.calls == 2
+        assert mock_snapshot.call_count == 1
+
+        # Stale and moved: the new sha is served
+        AgentHub._snapshots[hub._snapshot_key].checked_at -= hub.update_interval + 1
+        fake_api.sha = "sha2"
+        assert hub._lazy_update().endswith("sha2")
+        assert fake_api.calls == 3
+        assert mock_snapshot.call_count == 2
 
-def test_lazy_update():
-    """Test the _lazy_update method."""
+
+def test_lazy_update_downloads_missing_revision(fake_api):
     with (
-        patch("aic_core.agent.agent_hub.AgentHub.download_files") as mock_download,
-        patch("os.path.getmtime") as mock_getmtime,
-        patch("os.utime") as mock_utime,
+        patch(
+            "aic_core.agent.storage.snapshot_download",
+            side_effect=[LocalEntryNotFoundError("missing"), "/cache/snapshots/sha1"],
+        ) as mock_snapshot,
+        patch.object(AgentHub, "prune_cache") as mock_prune,
+    ):
+        assert AgentHub("test-repo")._lazy_update() == "/cache/snapshots/sha1"
+        # Pruning never runs on the request path
+        mock_prune.assert_not_called()
+        mock_snapshot.assert_called_with(
+            repo_id="test-repo",
+            repo_type="space",
+            revision="sha1",
+            local_files_only=False,
+            allow_patterns=["agents/*", "tools/*", "result_types/*", "index.json"],
+        )
+
+
+def test_lazy_update_offline_keeps_serving(fake_api):
+    fake_api.sha = OSError("network down")
+    with patch(
+        "aic_core.agent.storage.snapshot_download",
+        side_effect=fake_snapshot_download,
     ):
-        # Setup
         hub = AgentHub("test-repo")
-        mock_download.return_value = "/fake/cache/path"
+        assert hub._lazy_update().endswith("main-sha")
 
-        # Test case 1: Cache is fresh (no update needed)
-        mock_getmtime.return_value = time.time()  # Current time
-        hub._lazy_update()
-        # Should only call snapshot_download once with local_files_only=True
-        assert mock_download.call_count == 1
-        mock_download.assert_called_with(local_files_only=True)
-        mock_utime.assert_not_called()
-
-        # Reset mocks
-        mock_download.reset_mock()
-        mock_utime.reset_mock()
-
-        # Test case 2: Cache is stale (update needed)
-        mock_getmtime.return_value = time.time() - (
-            hub.update_interval + 100
-        )  # Old timestamp
-        hub._lazy_update()
-        # Should call snapshot_download twice:
-        # 1. First with local_files_only=True
-        # 2. Then without local_files_only to update
-        assert mock_download.call_count == 2
-        mock_download.assert_any_call(local_files_only=True)
-        mock_download.assert_any_call()
-        mock_utime.assert_called_once_with("/fake/cache/path", None)
+        AgentHub._snapshots[hub._snapshot_key].checked_at -= hub.update_interval + 1
+        assert hub._lazy_update().endswith("main-sha")
+        assert fake_api.calls == 2
 
 
-@patch("aic_core.agent.agent_hub.hf_hub_download")
+def test_lazy_update_pinned_revision(fake_api):
+    with patch(
+        "aic_core.agent.storage.snapshot_download",
+        side_effect=fake_snapshot_download,
+    ) as mock_snapshot:
+        hub = AgentHub("test-repo", revision="v1")
+        assert hub._lazy_update().endswith("v1")
+        AgentHub._snapshots[hub._snapshot_key].checked_at = 0
+        assert hub._lazy_update().endswith("v1")
+
+        # A pinned hub never queries the Hub
+        assert fake_api.calls == 0
+        mock_snapshot.assert_called_once_with(
+            repo_id="test-repo",
+            repo_type="space",
+            revision="v1",
+            local_files_only=True,
+            allow_patterns=None,
+        )
+
+
+def test_download_files_records_served_snapshot(fake_api):
+    with patch(
+        "aic_core.agent.storage.snapshot_download",
+        side_effect=fake_snapshot_download,
+    ):
+        hub = AgentHub("test-repo")
+        hub.download_files(revision="sha3")
+        assert hub._lazy_update().endswith("sha3")
+        assert fake_api.calls == 0
+
+
+@patch("aic_core.agent.storage.hf_hub_download")
 def test_get_file_path_remote_download(mock_hf_download):
     """Test get_file_path when file is not found locally."""
     hub = AgentHub("test-repo")
@@ -305,6 +686,7 @@ def test_get_file_path_remote_download(mock_hf_download):
             subfolder="tools",
             local_files_only=True,
             repo_type="space",
+            revision=None,
         )
 
         # Second call should try remote download
@@ -312,7 +694,193 @@ def test_get_file_path_remote_download(mock_hf_download):
             repo_id="test-repo",
             filename="test_tool.py",
             subfolder="tools",
+            local_files_only=False,
             repo_type="space",
+            revision=None,
         )
 
         assert result == "/path/to/downloaded/file.py"
+
+
+@pytest.mark.asyncio
+async def test_async_loads_are_deduplicated():
+    backend = InMemoryBackend(
+        {
+            "test-repo": {
+                "agents/agent.json": '{"model": "test"}',
+                "tools/add.py": "def add(a, b):\n    return a + b\n",
+            }
+        }
+    )
+    hub = AgentHub("test-repo", backend=backend)
+    with (
+        patch.object(
+            backend, "resolve_revision", wraps=backend.resolve_revision
+        ) as mock_resolve,
+        patch.object(backend, "file_path", wraps=backend.file_path) as mock_file,
+    ):
+        tools = await asyncio.gather(*(hub.aload_tool("add") for _ in range(50)))
+        configs = await asyncio.gather(*(hub.aload_config("agent") for _ in range(2)))
+    assert mock_resolve.call_count == 1
+    # Files are read straight from the served snapshot
+    mock_file.assert_not_called()
+    assert all(tool is tools[0] for tool in tools)
+    assert tools[0](1, 2) == 3
+    assert configs[0] == {"model": "test"}
+    assert configs[0] is not configs[1]
+
+
+@pytest.mark.asyncio
+async def test_async_list_and_upload():
+    hub = AgentHub("test-repo", backend=InMemoryBackend())
+    assert await hub.alist_files(hub.tools_dir) == []
+    await hub.aupload_content("add", "def add(a, b):\n    return a + b\n", "tools")
+    assert await hub.alist_files(hub.tools_dir) == ["add"]
+    assert (await hub.aload_tool("add"))(2, 2) == 4
+
+
+def test_agent_closure():
+    config = {
+        "known_tools": ["add", "mul.py", "odd[1]"],
+        "result_type": ["str", "Report", "list[Person] | None", "list["],
+    }
+    assert AgentHub.agent_closure("helper", config) == [
+        "agents/helper.json",
+        "tools/add.py",
+        "tools/mul.py",
+        "tools/odd[[]1].py",
+        "result_types/Person.py",
+        "result_types/Report.py",
+    ]
+
+
+def test_download_files_scoped_to_agent(tmp_path):
+    config = tmp_path / "helper.json"
+    config.write_text('{"known_tools": ["add"], "result_type": ["str"]}')
+    hub = AgentHub("test-repo", agent_name="helper")
+    with (
+        patch("aic_core.agent.storage.hf_hub_download", return_value=str(config)),
+        patch(
+            "aic_core.agent.storage.snapshot_download", return_value="/snapshots/sha1"
+        ) as mock_snapshot,
+    ):
+        hub.download_files(revision="sha1")
+    assert mock_snapshot.call_args.kwargs["allow_patterns"] == [
+        "agents/helper.json",
+        "tools/add.py",
+        "index.json",
+    ]
+    assert AgentHub._snapshots[hub._snapshot_key].partial
+
+
+def test_load_manifest_of_partial_snapshot(tmp_path):
+    """Without an index, a partial snapshot is completed before listing."""
+    partial = write_snapshot(tmp_path / "sha1", {"tools/add.py": ""})
+    full = write_snapshot(
+        tmp_path / "full" / "sha1", {"tools/add.py": "", "tools/mul.py": ""}
+    )
+    hub = AgentHub("test-repo", allow_patterns=["tools/add.py"])
+    with patch("aic_core.agent.storage.snapshot_download", return_value=partial):
+        hub.download_files()
+    with (
+        patch.object(hub, "_lazy_update", return_value=partial),
+        patch(
+            "aic_core.agent.storage.snapshot_download", return_value=full
+        ) as mock_snapshot,
+    ):
+        assert hub.load_manifest().names("tools") == ["add", "mul"]
+    assert mock_snapshot.call_args.kwargs["allow_patterns"] == [
+        "agents/*",
+        "tools/*",
+        "result_types/*",
+    ]
+
+
+def test_resolve_file_path_from_served_snapshot(tmp_path):
+    snapshot = write_snapshot(tmp_path / "sha1", {"tools/tool.py": ""})
+    hub = AgentHub("test-repo")
+    hub._serve(snapshot)
+    with patch("aic_core.agent.storage.hf_hub_download") as mock_download:
+        assert hub._resolve_file_path("tool", "tools") == str(
+            tmp_path / "sha1" / "tools" / "tool.py"
+        )
+    mock_download.assert_not_called()
+
+
+def test_resolve_file_path_caches_misses(tmp_path):
+    hub = AgentHub("test-repo")
+    hub._serve(write_snapshot(tmp_path / "sha1", {}))
+    with patch(
+        "aic_core.agent.storage.hf_hub_download",
+        side_effect=[LocalEntryNotFoundError("local"), EntryNotFoundError("remote")],
+    ) as mock_download:
+        for _ in range(3):
+            with pytest.raises(EntryNotFoundError):
+                hub._resolve_file_path("missing", "tools")
+    assert mock_download.call_count == 2
+    assert mock_download.call_args.kwargs["revision"] == "sha1"
+
+    # A new revision is looked up again
+    hub._serve(write_snapshot(tmp_path / "sha2", {}))
+    with patch(
+        "aic_core.agent.storage.hf_hub_download", return_value="/path/missing.py"
+    ):
+        assert hub._resolve_file_path("missing", "tools") == "/path/missing.py"
+
+
+def test_locate(tmp_path):
+    hub = AgentHub("test-repo")
+    snapshot = write_snapshot(
+        tmp_path / "sha1", {"tools/tool.py": "", "result_types/Model.py": ""}
+    )
+    with patch.object(hub, "_lazy_update", return_value=snapshot):
+        assert hub.locate("tool") == "tools"
+        assert hub.locate("Model.py", ["tools", "result_types"]) == "result_types"
+        assert hub.locate("missing") is None
+
+
+def test_offline_fails_fast_on_empty_cache():
+    backend = Mock(spec=StorageBackend)
+    backend.snapshot.side_effect = LocalEntryNotFoundError("Not cached")
+    hub = AgentHub("test-repo", backend=backend, offline=True)
+    with pytest.raises(LocalEntryNotFoundError, match="offline"):
+        hub.load_tool("add")
+    backend.snapshot.assert_called_once_with(
+        "test-repo", revision=None, local_files_only=True
+    )
+    with pytest.raises(OfflineModeIsEnabled):
+        hub.upload_content("add", "def add(): ...", hub.tools_dir)
+    with pytest.raises(OfflineModeIsEnabled):
+        hub.sync()
+    backend.resolve_revision.assert_not_called()
+    backend.commit.assert_not_called()
+
+
+def test_offline_serves_cached_snapshot(tmp_path):
+    (tmp_path / "tools").mkdir()
+    (tmp_path / "tools" / "add.py").write_text("def add(a, b):\n    return a + b\n")
+    backend = Mock(spec=StorageBackend)
+    backend.snapshot.return_value = str(tmp_path)
+    backend.snapshot_revision.return_value = "sha1"
+    backend.file_path.side_effect = LocalEntryNotFoundError("Not cached")
+    hub = AgentHub("test-repo", backend=backend, offline=True)
+
+    assert hub.load_tool("add")(1, 2) == 3
+    # The update check is a no-op
+    AgentHub._snapshots[hub._snapshot_key].checked_at = 0
+    assert hub._lazy_update() == str(tmp_path)
+    with pytest.raises(LocalEntryNotFoundError, match="offline"):
+        hub.load_tool("mul")
+    backend.file_path.assert_called_once_with(
+        "test-repo", "tools/mul.py", "sha1", local_files_only=True
+    )
+    backend.resolve_revision.assert_not_called()
+
+
+def test_env_flag(monkeypatch):
+    monkeypatch.setenv(OFFLINE_ENV, "1")
+    assert _env_flag(OFFLINE_ENV)
+    monkeypatch.setenv(OFFLINE_ENV, "false")
+    assert not _env_flag(OFFLINE_ENV)
+    assert AgentHub("test-repo", offline=True).offline
+    assert not AgentHub("test-repo", offline=False).offline
@@ -0,0 +1,68 @@
+from unittest.mock import Mock, patch
+import pytest
+from aic_core.agent.agent import AgentFactory
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.agent_pool import AgentPool
+
+
+CONFIG = {"model": "openai:gpt-4o", "repo_id": "test-repo"}
+
+
+@pytest.fixture(autouse=True)
+def clear_pool():
+    AgentPool.invalidate()
+    yield
+    AgentPool.invalidate()
+
+
+@pytest.fixture
+def hub():
+    with (
+        patch.object(AgentHub, "load_config", return_value=dict(CONFIG)) as config,
+        patch.object(AgentHub, "_current_revision", return_value="sha1") as revision,
+        patch.object(
+            AgentFactory, "create_agent", side_effect=lambda api_key: Mock()
+        ) as create_agent,
+    ):
+        yield config, revision, create_agent
+
+
+def test_agent_is_shared(hub):
+    _, _, create_agent = hub
+    agent = AgentPool.get("test-repo", "helper")
+    assert AgentPool.get("test-repo", "helper") is agent
+    create_agent.assert_called_once_with(None)
+
+    # Other credentials, agents and pins get their own agent
+    assert AgentPool.get("test-repo", "helper", api_key="key") is not agent
+    assert AgentPool.get("test-repo", "other") is not agent
+    assert AgentPool.get("test-repo", "helper", revision="v1") is not agent
+    assert create_agent.call_count == 4
+
+
+def test_agent_is_rebuilt_on_change(hub):
+    config, revision, _ = hub
+    agent = AgentPool.get("test-repo", "helper")
+    revision.return_value = "sha2"
+    rebuilt = AgentPool.get("test-repo", "helper")
+    assert rebuilt is not agent
+    config.return_value = {**CONFIG, "retries": 3}
+    assert AgentPool.get("test-repo", "helper") is not rebuilt
+
+
+def test_agent_eviction(hub):
+    agent = AgentPool.get("test-repo", "helper")
+    with patch.object(AgentPool, "idle_timeout", -1):
+        assert AgentPool.evict_idle() == 1
+    assert AgentPool.get("test-repo", "helper") is not agent
+
+    with patch.object(AgentPool, "maxsize", 1):
+        AgentPool.get("test-repo", "other")
+    assert len(AgentPool._agents) == 1
+    assert AgentPool.invalidate("other-repo") == 0
+    assert AgentPool.invalidate("test-repo") == 1
+
+
+def test_credentials_id():
+    assert AgentPool.credentials_id(None) is None
+    assert "secret" not in AgentPool.credentials_id("secret")
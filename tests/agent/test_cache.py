@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+import pytest
+from aic_core.agent.cache import LRUCache, NegativeCache, SingleFlight
+
+
+def test_lru_cache_get_set():
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert len(cache) == 1
+
+
+def test_lru_cache_eviction_order():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Touch "a" so that "b" becomes the least recently used entry
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_lru_cache_evict_predicate():
+    cache = LRUCache()
+    cache.set(("repo", "rev1", "x"), 1)
+    cache.set(("repo", "rev2", "x"), 2)
+    cache.set(("other", "rev1", "x"), 3)
+    evicted = cache.evict(lambda key: key[0] == "repo" and key[1] != "rev2")
+    assert evicted == 1
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_single_flight_shares_result():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    follower.start()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert results == ["value", "value"]
+    assert len(calls) == 1
+    # Once finished, the key can run again
+    assert flights.do("k", lambda: "again") == "again"
+
+
+def test_single_flight_propagates_errors():
+    flights = SingleFlight()
+    with pytest.raises(ValueError):
+        flights.do("k", Mock(side_effect=ValueError))
+    assert flights.do("k", lambda: 1) == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_async():
+    flights = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return len(calls)
+
+    results = await asyncio.gather(*(flights.ado("k", slow) for _ in range(20)))
+    assert results == [1] * 20
+
+
+def test_negative_cache_expires():
+    misses = NegativeCache(ttl=60)
+    error = KeyError("missing")
+    misses.add("k", error)
+    assert misses.get("k") is error
+    assert misses.get("other") is None
+    with patch(
+        "aic_core.agent.cache.time.monotonic", return_value=time.monotonic() + 61
+    ):
+        assert misses.get("k") is None
+    assert misses.get("k") is None
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import pytest
+
+
+HEAVY_MODULES = ("streamlit", "smolagents", "openai", "mcp")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Import a module in a fresh interpreter and time each imported module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "aic_core.agent.agent",
+        "aic_core.agent.result_types",
+        "aic_core.agent.agent_pool",
+    ],
+)
+def test_import_skips_heavy_modules(module):
+    times = import_times(module)
+    assert module in times
+    heavy = [name for name in times if name.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+
+
+@pytest.mark.parametrize(
+    "module", ["aic_core.agent.agent", "aic_core.agent.result_types"]
+)
+def test_import_defers_hub_client(module):
+    times = import_times(module)
+    assert "huggingface_hub" not in times
+    assert "aic_core.agent.agent_hub" not in times
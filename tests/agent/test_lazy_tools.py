@@ -0,0 +1,59 @@
+from unittest.mock import Mock
+import pytest
+from pydantic_ai import Agent, ModelRetry
+from pydantic_ai.models.test import TestModel
+from aic_core.agent.lazy_tools import LazyTool
+
+
+def add(a: int, b: int) -> int:
+    """Add two numbers."""
+    return a + b
+
+
+async def async_add(a: int, b: int) -> int:
+    """Add two numbers."""
+    return a + b
+
+
+SCHEMA = {
+    "additionalProperties": False,
+    "properties": {"a": {"type": "integer"}, "b": {"type": "integer"}},
+    "required": ["a", "b"],
+    "type": "object",
+}
+
+
+@pytest.mark.asyncio
+async def test_lazy_tool_loads_on_first_call():
+    loader = Mock(return_value=add)
+    tool = LazyTool("add", "Add two numbers.", SCHEMA, loader, max_retries=1)
+    agent = Agent(TestModel(), tools=[tool])
+    assert not tool.loaded
+    loader.assert_not_called()
+
+    result = await agent.run("Add")
+    assert '"add":' in result.output
+    assert tool.loaded
+    await agent.run("Add again")
+    loader.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_lazy_tool_validates_with_loaded_function():
+    tool = LazyTool("add", None, SCHEMA, lambda: add)
+    tool_def = await tool.prepare_tool_def(Mock())
+    assert tool_def.parameters_json_schema == SCHEMA
+    assert tool_def.description == ""
+    assert await tool._call(a="1", b=2) == 3
+    with pytest.raises(ModelRetry):
+        await tool._call(a="one", b=2)
+    agent = Agent(TestModel(call_tools=["add"]), tools=[tool], retries=0)
+    await agent.run("Add")
+
+
+@pytest.mark.asyncio
+async def test_lazy_tool_runs_async_function():
+    tool = LazyTool("async_add", "Add two numbers.", SCHEMA, lambda: async_add)
+    result = await Agent(TestModel(), tools=[tool]).run("Add")
+    assert '"async_add":' in result.output
+    assert (await tool.prepare_tool_def(Mock())).description == "Add two numbers."
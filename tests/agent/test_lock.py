@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import shutil
+import time
+from huggingface_hub.errors import LocalEntryNotFoundError
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.lock import RefreshLock
+from aic_core.agent.storage import LocalDirectoryBackend
+
+
+REPO = "user/space"
+ctx = multiprocessing.get_context("spawn")
+
+
+class CopyingBackend(LocalDirectoryBackend):
+    """Stand-in for the Hub: snapshots are slowly copied into a shared cache."""
+
+    def __init__(self, root, cache_dir, log_path):
+        super().__init__(root)
+        self.cache_dir = cache_dir
+        self.log_path = log_path
+
+    def snapshot(
+        self, repo_id, revision=None, local_files_only=False, allow_patterns=None
+    ):
+        sha = revision or self.resolve_revision(repo_id)
+        path = os.path.join(self.cache_dir, sha)
+        if os.path.isdir(path):
+            return path
+        if local_files_only:
+            raise LocalEntryNotFoundError(sha)
+        with open(self.log_path, "a") as file:
+            file.write(f"{sha}\n")
+        time.sleep(0.5)
+        shutil.copytree(self._repo_path(repo_id), path)
+        return path
+
+    def resolve_revision(self, repo_id, revision=None):
+        return super().snapshot_revision(self._repo_path(repo_id))
+
+    def snapshot_revision(self, path):
+        return os.path.basename(os.path.normpath(path))
+
+
+def hold_lock(path, acquired, release):
+    lock = RefreshLock(path)
+    assert lock.acquire()
+    acquired.set()
+    release.wait(30)
+
+
+def serve_through_update(args, barrier, results):
+    root, cache_dir, log_path, lock_dir = args
+    AgentHub.lock_dir = lock_dir
+    hub = AgentHub(REPO, backend=CopyingBackend(root, cache_dir, log_path))
+    old = hub._lazy_update()
+    barrier.wait()  # The repo is updated
+    barrier.wait()
+    AgentHub._snapshots[hub._snapshot_key].checked_at = 0
+    results.put((old, hub._lazy_update()))
+
+
+def test_refresh_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "repo.lock")
+    acquired, release = ctx.Event(), ctx.Event()
+    holder = ctx.Process(target=hold_lock, args=(path, acquired, release))
+    holder.start()
+    try:
+        assert acquired.wait(30)
+        lock = RefreshLock(path)
+        assert not lock.acquire()
+        release.set()
+        holder.join(30)
+        assert lock.acquire(timeout=5)
+        lock.release()
+    finally:
+        release.set()
+        holder.join(30)
+
+
+def test_refresh_lock_breaks_stale_lock(tmp_path):
+    path = str(tmp_path / "repo.lock")
+    acquired, release = ctx.Event(), ctx.Event()
+    holder = ctx.Process(target=hold_lock, args=(path, acquired, release))
+    holder.start()
+    try:
+        assert acquired.wait(30)
+        lock = RefreshLock(path, stale_after=60)
+        assert not lock.acquire()
+        # The holder hangs past the stale age
+        os.utime(lock.stamp_path, (time.time() - 120, time.time() - 120))
+        assert lock.acquire()
+        lock.release()
+    finally:
+        release.set()
+        holder.join(30)
+
+
+def test_for_repo(tmp_path):
+    lock = RefreshLock.for_repo("user/space", str(tmp_path))
+    assert lock.path == str(tmp_path / "user--space.lock")
+
+
+def test_one_process_refreshes(tmp_path):
+    """Many processes see the same stale snapshot, and only one downloads."""
+    root, cache_dir = tmp_path / "repos", tmp_path / "cache"
+    (root / REPO / "tools").mkdir(parents=True)
+    (root / REPO / "tools" / "tool.py").write_text("v = 1")
+    log_path = tmp_path / "downloads.log"
+    workers = 4
+    barrier, results = ctx.Barrier(workers + 1), ctx.Queue()
+    args = (str(root), str(cache_dir), str(log_path), str(tmp_path / "locks"))
+    processes = [
+        ctx.Process(target=serve_through_update, args=(args, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        barrier.wait(60)
+        (root / REPO / "tools" / "tool.py").write_text("v = 2")
+        barrier.wait(60)
+        served = [results.get(timeout=60) for _ in processes]
+    finally:
+        for process in processes:
+            process.join(60)
+
+    old_sha, new_sha = log_path.read_text().split()
+    assert all(old == str(cache_dir / old_sha) for old, _ in served)
+    # Others keep serving the old snapshot while it downloads, or pick up the
+    # new one from the shared cache
+    new = [path for _, path in served]
+    assert str(cache_dir / new_sha) in new
+    assert set(new) <= {str(cache_dir / old_sha), str(cache_dir / new_sha)}
+
+
+def test_refresh_lock_detects_replaced_file(tmp_path):
+    lock = RefreshLock(str(tmp_path / "locks" / "repo.lock"))
+    fd = lock._open()
+    try:
+        assert lock._is_current(fd)
+        os.remove(lock.path)
+        assert not lock._is_current(fd)
+        open(lock.path, "w").close()
+        assert not lock._is_current(fd)
+    finally:
+        os.close(fd)
+    assert lock.acquire()
+    lock.release()
@@ -0,0 +1,217 @@
+import ast
+import json
+from unittest.mock import Mock
+import pytest
+from pydantic_ai import Tool
+from aic_core.agent.manifest import (
+    AgentEntry,
+    Manifest,
+    ToolEntry,
+    content_hash,
+    docstring_descriptions,
+    parameters_schema,
+)
+
+
+TOOL_SOURCE = '''
+import math
+
+
+def helper():
+    pass
+
+
+def area(radius: float, precision: int = 2) -> float:
+    """Area of a circle.
+
+    Rounded to the given precision.
+
+    Args:
+        radius: The radius.
+
+    Returns:
+        The area.
+    """
+    return round(math.pi * radius**2, precision)
+'''
+
+MODEL_SOURCE = '''
+from pydantic import BaseModel
+
+
+class Person(BaseModel):
+    """A person."""
+
+    name: str
+    age: int | None = None
+'''
+
+
+def test_content_hash():
+    assert content_hash("abc") == content_hash(b"abc")
+    assert content_hash("abc") != content_hash("abd")
+
+
+def test_tool_entry_from_function_source():
+    entry = ToolEntry.from_source("area", TOOL_SOURCE)
+    assert entry.signature == "(radius: float, precision: int=2) -> float"
+    assert entry.description == (
+        "<summary>Area of a circle.\n\nRounded to the given precision.</summary>\n"
+        "<returns>\n<description>The area.</description>\n</returns>"
+    )
+    assert entry.sha256 == content_hash(TOOL_SOURCE)
+    assert entry.parameters == {
+        "additionalProperties": False,
+        "properties": {
+            "radius": {"description": "The radius.", "type": "number"},
+            "precision": {"type": "integer"},
+        },
+        "required": ["radius"],
+        "type": "object",
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "docstring",
+    [
+        "Add.",
+        "Add.\n\nArgs:\n    a: First.\n    b: Second.\n\nReturns:\n    The sum.",
+        "Add.\n\nArgs:\n    a: First.\n\nRaises:\n    ValueError: Never.",
+    ],
+)
+async def test_tool_entry_matches_pydantic_ai(docstring):
+    source = f'def add(a: int, b: int = 1) -> int:\n    """{docstring}"""\n'
+    namespace: dict = {}
+    exec(source, namespace)  # noqa: S102
+    tool_def = await Tool(namespace["add"]).prepare_tool_def(Mock())
+    entry = ToolEntry.from_source("add", source)
+    assert entry.description == tool_def.description
+    assert entry.parameters == tool_def.parameters_json_schema
+
+
+@pytest.mark.parametrize(
+    ("docstring", "expected"),
+    [
+        (
+            "Add.\n\n:param a: First.\n:returns: The sum.",
+            "<summary>Add.</summary>\n"
+            "<returns>\n<description>The sum.</description>\n</returns>",
+        ),
+        ("Add.\n\nParameters\n----------\na : int\n    First.\n", "Add."),
+    ],
+)
+def test_docstring_descriptions_styles(docstring, expected):
+    assert docstring_descriptions(docstring) == (expected, {"a": "First."})
+
+
+@pytest.mark.parametrize(
+    ("signature", "schema"),
+    [
+        ("x: str | None", {"anyOf": [{"type": "string"}, {"type": "null"}]}),
+        ("x: list[bool]", {"items": {"type": "boolean"}, "type": "array"}),
+        (
+            "*, x: dict[str, int | float]",
+            {
+                "additionalProperties": {
+                    "anyOf": [{"type": "integer"}, {"type": "number"}]
+                },
+                "type": "object",
+            },
+        ),
+    ],
+)
+def test_parameters_schema(signature, schema):
+    node = ast.parse(f"def f({signature}): ...").body[0]
+    assert parameters_schema(node)["properties"] == {"x": schema}
+
+
+@pytest.mark.parametrize(
+    "signature", ["x", "x: Person", "x: dict[int, str]", "*args: int", "x: int, /"]
+)
+def test_parameters_schema_needs_builtin_types(signature):
+    node = ast.parse(f"def f({signature}): ...").body[0]
+    assert parameters_schema(node) is None
+
+
+def test_tool_entry_from_model_source():
+    entry = ToolEntry.from_source("Person", MODEL_SOURCE)
+    assert entry.signature == "(name: str, age: int | None)"
+    assert entry.description == "A person."
+
+
+def test_tool_entry_from_bound_names():
+    source = "def _mul(a: int, b: int) -> int:\n    return a * b\n\nmul = _mul\n"
+    entry = ToolEntry.from_source("mul", source)
+    assert entry.bound
+    assert entry.signature == "(a: int, b: int) -> int"
+    assert entry.parameters is not None
+
+    entry = ToolEntry.from_source("dumps", "from json import dumps\n")
+    assert entry.bound
+    assert entry.signature is None
+    entry = ToolEntry.from_source("area", "area = make_area()\n")
+    assert (entry.bound, entry.signature) == (True, None)
+    # The last binding of the name wins
+    entry = ToolEntry.from_source("area", "area = make_area()\n" + TOOL_SOURCE)
+    assert not entry.bound
+    assert entry.signature is not None
+
+
+def test_tool_entry_from_invalid_source():
+    entry = ToolEntry.from_source("broken", "def broken(:")
+    assert entry.signature is None
+    assert entry.sha256 == content_hash("def broken(:")
+
+
+def test_agent_entry_from_source():
+    config = {
+        "model": "openai:gpt-4o",
+        "known_tools": ["area"],
+        "result_type": ["str", "Person"],
+        "system_prompt": "ignored",
+    }
+    entry = AgentEntry.from_source("agent", json.dumps(config))
+    assert entry.model == "openai:gpt-4o"
+    assert entry.known_tools == ["area"]
+    assert entry.result_type == ["str", "Person"]
+    assert AgentEntry.from_source("bad", "{").model is None
+
+
+def test_manifest_update_remove_search():
+    manifest = Manifest()
+    manifest.update("tools", "area", TOOL_SOURCE)
+    manifest.update("result_types", "Person", MODEL_SOURCE)
+    assert manifest.names("tools") == ["area"]
+    assert manifest.get("result_types", "Person").description == "A person."
+    assert [e.name for e in manifest.search("circle")] == ["area"]
+    assert [e.name for e in manifest.search("PERS")] == ["Person"]
+
+    assert manifest.remove("tools", "area")
+    assert not manifest.remove("tools", "area")
+    assert manifest.names("unknown") == []
+    with pytest.raises(ValueError, match="Invalid type"):
+        manifest.update("unknown", "x", "")
+
+
+def test_manifest_round_trip_and_scale():
+    manifest = Manifest()
+    for i in range(2000):
+        manifest.update("tools", f"tool_{i}", f"def tool_{i}(x: int) -> int: ...")
+    restored = Manifest.model_validate_json(manifest.model_dump_json())
+    assert len(restored.names("tools")) == 2000
+    assert restored.get("tools", "tool_1999").signature == "(x: int) -> int"
+
+
+def test_manifest_from_directory(tmp_path):
+    (tmp_path / "tools").mkdir()
+    (tmp_path / "tools" / "area.py").write_text(TOOL_SOURCE)
+    (tmp_path / "agents").mkdir()
+    (tmp_path / "agents" / "agent.json").write_text('{"model": "openai:gpt-4o"}')
+    (tmp_path / "notebooks").mkdir()
+    (tmp_path / "notebooks" / "demo.ipynb").write_text("{}")
+
+    manifest = Manifest.from_directory(str(tmp_path))
+    assert manifest.names("tools") == ["area"]
+    assert manifest.names("agents") == ["agent"]
+    assert manifest.names("result_types") == []
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import pytest
+from mcp import ClientSession
+from pydantic_ai import Agent
+from pydantic_ai.mcp import MCPServerHTTP, MCPServerStdio
+from pydantic_ai.models.test import TestModel
+from aic_core.agent.agent import AgentConfig, AgentFactory
+from aic_core.agent.mcp_pool import (
+    MCPServerPool,
+    MCPServerStreamableHTTP,
+    PooledMCPServer,
+    build_server,
+    server_key,
+)
+
+
+SERVER = '''
+import os
+import sys
+import time
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("echo")
+
+
+@mcp.tool()
+def pid() -> int:
+    """Get the process ID."""
+    return os.getpid()
+
+
+@mcp.tool()
+def wait(seconds: float) -> float:
+    """Wait for some seconds."""
+    time.sleep(seconds)
+    return seconds
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        mcp.settings.host = "127.0.0.1"
+        mcp.settings.port = int(sys.argv[2])
+        mcp.run(transport=sys.argv[1])
+    else:
+        mcp.run()
+'''
+
+
+@pytest.fixture
+def server_path(tmp_path):
+    path = tmp_path / "server.py"
+    path.write_text(SERVER)
+    return str(path)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_network_server(server_path: str, transport: str, port: int):
+    process = subprocess.Popen(
+        [sys.executable, server_path, transport, str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise TimeoutError(f"MCP server did not listen on port {port}")
+
+
+@pytest.fixture(params=[("sse", "/sse"), ("streamable-http", "/mcp")])
+def network_server(request, server_path):
+    transport, path = request.param
+    port = free_port()
+    process = start_network_server(server_path, transport, port)
+    yield process, transport, f"http://127.0.0.1:{port}{path}"
+    process.kill()
+    process.wait()
+
+
+@pytest.fixture(autouse=True)
+def shutdown_pool():
+    yield
+    MCPServerPool.shutdown()
+
+
+async def get_pid(server: PooledMCPServer) -> int:
+    return int(await server.call_tool("pid", {}))
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_server_key():
+    assert server_key("cmd", ["a"]) == ("cmd", ("a",), None)
+    assert server_key("cmd", env={"B": "2", "A": "1"}) == (
+        "cmd",
+        (),
+        (("A", "1"), ("B", "2")),
+    )
+
+
+@pytest.mark.asyncio
+async def test_servers_share_one_process(server_path):
+    first = MCPServerPool.get(sys.executable, [server_path])
+    second = MCPServerPool.get(sys.executable, [server_path])
+    assert first == second
+    async with first:  # Does not start or stop anything
+        pid = await get_pid(first)
+    assert [tool.name for tool in await second.list_tools()] == ["pid", "wait"]
+    assert await get_pid(second) == pid
+    assert MCPServerPool.connection(first.key).starts == 1
+
+
+def test_servers_are_shared_across_event_loops(server_path):
+    server = MCPServerPool.get(sys.executable, [server_path])
+    pids = [asyncio.run(get_pid(server)) for _ in range(2)]
+    assert pids[0] == pids[1]
+    assert alive(pids[0])
+
+
+@pytest.mark.asyncio
+async def test_agent_runs_without_starting_servers(server_path):
+    server = MCPServerPool.get(sys.executable, [server_path])
+    agent = Agent(TestModel(call_tools=["pid"]), mcp_servers=[server])
+    result = await agent.run("What is the pid?")
+    pid = await get_pid(server)
+    assert str(pid) in result.output
+
+
+@pytest.mark.asyncio
+async def test_crashed_server_is_restarted(server_path):
+    server = MCPServerPool.get(sys.executable, [server_path])
+    pid = await get_pid(server)
+    os.kill(pid, 9)
+    await asyncio.sleep(0.2)
+
+    new_pid = await get_pid(server)
+    assert new_pid != pid
+    assert MCPServerPool.connection(server.key).starts == 2
+
+
+@pytest.mark.asyncio
+async def test_health_check_restarts_unresponsive_server(server_path):
+    server = MCPServerPool.get(sys.executable, [server_path])
+    assert await MCPServerPool.run(MCPServerPool.check_health()) == []
+    pid = await get_pid(server)
+    assert await MCPServerPool.run(MCPServerPool.check_health()) == []
+    os.kill(pid, 9)
+    await asyncio.sleep(0.2)
+
+    assert await MCPServerPool.run(MCPServerPool.check_health()) == [server.key]
+    assert await get_pid(server) != pid
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded(server_path, monkeypatch):
+    monkeypatch.setattr(MCPServerPool, "max_concurrency", 1)
+    server = MCPServerPool.get(sys.executable, [server_path])
+    await get_pid(server)  # Start the server
+
+    start = time.monotonic()
+    await asyncio.gather(
+        *(server.call_tool("wait", {"seconds": 0.3}) for _ in range(2))
+    )
+    assert time.monotonic() - start >= 0.6
+
+
+@pytest.mark.asyncio
+async def test_shutdown_stops_servers(server_path):
+    server = MCPServerPool.get(sys.executable, [server_path])
+    pid = await get_pid(server)
+    MCPServerPool.shutdown()
+    assert not alive(pid)
+
+    # The pool starts again on the next request
+    assert await get_pid(server) != pid
+
+
+@pytest.mark.asyncio
+async def test_pooled_server_opens_dedicated_streams(server_path):
+    server = MCPServerPool.get(sys.executable, [server_path])
+    pid = await get_pid(server)
+    async with server.client_streams() as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.call_tool("pid", {})
+    assert int(result.content[0].text) != pid
+    assert MCPServerPool.connection(server.key).starts == 1
+
+
+def test_pooled_server_is_always_running():
+    server = PooledMCPServer("cmd", ["a"])
+    assert server.is_running
+    assert server.key == ("cmd", ("a",), None)
+
+
+def test_build_server():
+    assert isinstance(build_server(server_key("cmd", ["a"])), MCPServerStdio)
+    assert isinstance(build_server(server_key("http://host/sse")), MCPServerHTTP)
+    assert isinstance(build_server(server_key("http://host/sse/")), MCPServerHTTP)
+    server = build_server(server_key("https://host/mcp"))
+    assert isinstance(server, MCPServerStreamableHTTP)
+    assert server.url == "https://host/mcp"
+
+
+@pytest.mark.asyncio
+async def test_network_server_is_shared_by_agents(network_server):
+    process, _, url = network_server
+    config = AgentConfig(model="openai:gpt-4o", mcp_servers=[url], repo_id="r")
+    first, second = (AgentFactory(config).get_mcp_servers()[0] for _ in range(2))
+    assert first == PooledMCPServer(url, [])
+
+    assert [tool.name for tool in await first.list_tools()] == ["pid", "wait"]
+    pids = await asyncio.gather(*(get_pid(server) for server in (first, second)))
+    assert pids == [process.pid, process.pid]
+    assert MCPServerPool.connection(first.key).starts == 1
+
+
+@pytest.mark.asyncio
+async def test_network_server_reconnects(network_server, server_path):
+    process, transport, url = network_server
+    server = MCPServerPool.get(url)
+    assert await get_pid(server) == process.pid
+    process.kill()
+    process.wait()
+    port = int(url.split(":")[2].split("/")[0])
+    restarted = start_network_server(server_path, transport, port)
+    try:
+        assert await get_pid(server) == restarted.pid
+        assert MCPServerPool.connection(server.key).starts == 2
+    finally:
+        restarted.kill()
+        restarted.wait()
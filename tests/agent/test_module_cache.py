@@ -0,0 +1,94 @@
+import sys
+import pytest
+from aic_core.agent.module_cache import ModuleCache, module_qualname
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ModuleCache(bytecode_dir=str(tmp_path / "bytecode"))
+    yield cache
+    cache.clear()
+
+
+def write(path, source):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(source)
+    return str(path)
+
+
+def test_module_qualname():
+    assert module_qualname("user/my-space", "tools", "add") == (
+        "aic_hub.user__my_space.tools.add"
+    )
+
+
+def test_unchanged_source_reused(cache, tmp_path):
+    source = "def add(a, b):\n    return a + b\n"
+    path1 = write(tmp_path / "rev1" / "add.py", source)
+    path2 = write(tmp_path / "rev2" / "add.py", source)
+
+    module = cache.load("aic_hub.repo.tools.add", path1)
+    assert module.add(1, 2) == 3
+    assert sys.modules["aic_hub.repo.tools.add"] is module
+    # Same source in another snapshot is a dict lookup
+    assert cache.load("aic_hub.repo.tools.add", path2) is module
+    assert cache.compiled == 1
+
+
+def test_changed_source_reloaded(cache, tmp_path):
+    old = cache.load("aic_hub.repo.tools.f", write(tmp_path / "1/f.py", "X = 1"))
+    new = cache.load("aic_hub.repo.tools.f", write(tmp_path / "2/f.py", "X = 2"))
+    assert (old.X, new.X) == (1, 2)
+    assert sys.modules["aic_hub.repo.tools.f"] is new
+
+
+def test_same_filename_in_two_repos(cache, tmp_path):
+    path_a = write(tmp_path / "a" / "tool.py", "NAME = 'a'")
+    path_b = write(tmp_path / "b" / "tool.py", "NAME = 'b'")
+    module_a = cache.load(module_qualname("a", "tools", "tool"), path_a)
+    module_b = cache.load(module_qualname("b", "tools", "tool"), path_b)
+    assert (module_a.NAME, module_b.NAME) == ("a", "b")
+
+
+def test_bytecode_reused_across_processes(cache, tmp_path):
+    path = write(tmp_path / "tool.py", "VALUE = 42")
+    cache.load("aic_hub.repo.tools.tool", path)
+    assert cache.compiled == 1
+
+    # A fresh cache, as in a restarted process, loads the persisted bytecode
+    restarted = ModuleCache(bytecode_dir=cache.bytecode_dir)
+    module = restarted.load("aic_hub.repo.tools.other", path)
+    assert module.VALUE == 42
+    assert restarted.compiled == 0
+    restarted.clear()
+
+
+def test_compile_file_does_not_execute(cache, tmp_path):
+    path = write(tmp_path / "tool.py", "raise RuntimeError('executed')")
+    cache.compile_file(path)
+    assert cache.compiled == 1
+    assert "aic_hub.repo.tools.tool" not in sys.modules
+
+
+def test_failed_exec_keeps_previous_version(cache, tmp_path):
+    qualname = "aic_hub.repo.tools.g"
+    good = cache.load(qualname, write(tmp_path / "1/g.py", "X = 1"))
+    with pytest.raises(ZeroDivisionError):
+        cache.load(qualname, write(tmp_path / "2/g.py", "X = 1 / 0"))
+    assert sys.modules[qualname] is good
+
+    with pytest.raises(ZeroDivisionError):
+        cache.load("aic_hub.repo.tools.h", write(tmp_path / "h.py", "1 / 0"))
+    assert "aic_hub.repo.tools.h" not in sys.modules
+
+
+def test_pydantic_model_resolves_module(cache, tmp_path):
+    source = (
+        "from pydantic import BaseModel\n\n"
+        "class Node(BaseModel):\n"
+        "    children: list['Node'] = []\n"
+    )
+    path = write(tmp_path / "n.py", source)
+    module = cache.load("aic_hub.repo.result_types.Node", path)
+    node = module.Node.model_validate({"children": [{"children": []}]})
+    assert isinstance(node.children[0], module.Node)
@@ -0,0 +1,87 @@
+from unittest.mock import Mock, patch
+import pytest
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.refresher import HubRefresher
+
+
+@pytest.fixture
+def hub(tmp_path):
+    with (
+        patch.object(AgentHub, "remote_revision", return_value="sha1"),
+        patch(
+            "aic_core.agent.storage.snapshot_download",
+            side_effect=lambda **kwargs: str(
+                tmp_path / "snapshots" / kwargs["revision"]
+            ),
+        ),
+    ):
+        yield AgentHub("test-repo")
+
+
+def test_refresh_swaps_new_revision(hub, tmp_path):
+    refresher = HubRefresher(hub)
+    assert refresher.refresh() is True
+    assert AgentHub._snapshots[hub._snapshot_key].sha == "sha1"
+
+    # Unchanged revision is not downloaded again
+    assert refresher.refresh() is False
+    assert refresher.metrics.refreshes == 2
+    assert refresher.metrics.updates == 1
+    assert refresher.metrics.last_refresh is not None
+    assert refresher.metrics.last_duration is not None
+
+    hub.remote_revision.return_value = "sha2"
+    assert refresher.refresh() is True
+    assert hub._lazy_update() == str(tmp_path / "snapshots" / "sha2")
+    # Hubs restarted offline serve the same revision
+    assert (tmp_path / "refs" / "main").read_text() == "sha2"
+
+
+def test_offline_hub_is_not_refreshed(hub):
+    hub.offline = True
+    assert HubRefresher(hub).refresh() is False
+    hub.remote_revision.assert_not_called()
+
+
+def test_refresh_failure_keeps_snapshot(hub):
+    refresher = HubRefresher(hub)
+    refresher.refresh()
+    hub.remote_revision.side_effect = OSError("network down")
+    assert refresher.refresh() is False
+    assert refresher.metrics.failures == 1
+    assert refresher.metrics.last_error == "network down"
+    assert AgentHub._snapshots[hub._snapshot_key].sha == "sha1"
+
+
+def test_requests_do_not_block_while_refreshing(hub, tmp_path):
+    with HubRefresher(hub, interval=60) as refresher:
+        refresher._thread.join(0.5)
+        assert refresher.running
+        assert refresher.metrics.refreshes == 1
+
+        # Stale snapshot is still served without querying the Hub
+        AgentHub._snapshots[hub._snapshot_key].checked_at = 0
+        hub.remote_revision.reset_mock()
+        assert hub._lazy_update() == str(tmp_path / "snapshots" / "sha1")
+        hub.remote_revision.assert_not_called()
+
+    assert not refresher.running
+    assert hub._snapshot_key not in AgentHub._refreshed_keys
+
+
+def test_pinned_hub_rejected():
+    with pytest.raises(ValueError, match="pinned"):
+        HubRefresher(Mock(revision="v1", repo_id="test-repo"))
+
+
+def test_refresh_prunes_when_enabled(hub):
+    refresher = HubRefresher(hub)
+    with patch.object(AgentHub, "prune_cache") as mock_prune:
+        refresher.refresh()
+        mock_prune.assert_not_called()
+
+        hub.remote_revision.return_value = "sha2"
+        with patch.object(AgentHub, "cache_keep_revisions", 2):
+            assert refresher.refresh() is True
+            assert refresher.refresh() is False
+        mock_prune.assert_called_once_with()
@@ -0,0 +1,471 @@
+import hashlib
+import os
+import shutil
+from fnmatch import fnmatch
+from unittest.mock import Mock, patch
+import pytest
+from huggingface_hub import CommitOperationAdd, CommitOperationDelete, scan_cache_dir
+from huggingface_hub.errors import (
+    EntryNotFoundError,
+    LocalEntryNotFoundError,
+    RevisionNotFoundError,
+)
+from huggingface_hub.hf_api import RepoFile
+from aic_core.agent import storage
+from aic_core.agent.agent_hub import AgentHub, Snapshot
+from aic_core.agent.storage import (
+    HfHubBackend,
+    InMemoryBackend,
+    LocalDirectoryBackend,
+)
+
+
+REPO = "user/space"
+FILES = {
+    "agents/helper.json": '{"model": "test", "known_tools": ["add"]}',
+    "tools/add.py": "def add(a: int, b: int) -> int:\n    return a + b\n",
+}
+
+
+@pytest.fixture
+def hf_backend(tmp_path):
+    """HF backend whose Hub is an in-memory repo, mirrored into a fake cache."""
+    store = InMemoryBackend({REPO: FILES})
+    cache_dir = tmp_path / "hf"
+
+    def local_revision(revision):
+        """Resolve a revision through the refs of the cache, like the HF cache."""
+        ref_path = cache_dir / "refs" / (revision or "main")
+        return ref_path.read_text() if ref_path.exists() else revision
+
+    def fetched_revision(repo_id, revision):
+        """Resolve a revision on the Hub, writing its ref unless it is a sha."""
+        sha = store.resolve_revision(repo_id, revision)
+        if revision != sha:
+            (cache_dir / "refs").mkdir(parents=True, exist_ok=True)
+            (cache_dir / "refs" / (revision or "main")).write_text(sha)
+        return sha
+
+    def fake_snapshot_download(
+        repo_id, repo_type, revision, local_files_only=False, allow_patterns=None
+    ):
+        if local_files_only:
+            # Like the HF cache, any folder of the revision is returned
+            path = cache_dir / "snapshots" / str(local_revision(revision))
+            if not path.exists():
+                raise LocalEntryNotFoundError(str(revision))
+            return str(path)
+        sha = fetched_revision(repo_id, revision)
+        path = cache_dir / "snapshots" / sha
+        for path_in_repo in store.file_ids(repo_id, sha):
+            if allow_patterns is None or any(
+                fnmatch(path_in_repo, pattern) for pattern in allow_patterns
+            ):
+                dst = path / path_in_repo
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy(store.file_path(repo_id, path_in_repo, sha), dst)
+        path.mkdir(parents=True, exist_ok=True)
+        return str(path)
+
+    def fake_hf_hub_download(repo_id, filename, subfolder, revision, **kwargs):
+        path_in_repo = f"{subfolder}/{filename}" if subfolder else filename
+        sha = fetched_revision(repo_id, revision)
+        src = store.file_path(repo_id, path_in_repo, sha)
+        dst = cache_dir / "snapshots" / sha / path_in_repo
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(src, dst)
+        return str(dst)
+
+    api = Mock()
+    api.repo_info.side_effect = lambda repo_id, repo_type, revision: Mock(
+        sha=store.resolve_revision(repo_id, revision)
+    )
+    api.list_repo_tree.side_effect = lambda repo_id, revision, **kwargs: [
+        RepoFile(path=path, size=0, oid=blob_id)
+        for path, blob_id in store.file_ids(repo_id, revision).items()
+    ]
+    api.create_commit.side_effect = lambda repo_id, operations, **kwargs: Mock(
+        oid=store.commit(
+            repo_id,
+            operations,
+            kwargs["commit_message"],
+            parent_commit=kwargs["parent_commit"],
+        )
+    )
+    with (
+        patch("aic_core.agent.storage.HfApi", return_value=api),
+        patch(
+            "aic_core.agent.storage.snapshot_download",
+            side_effect=fake_snapshot_download,
+        ),
+        patch(
+            "aic_core.agent.storage.hf_hub_download",
+            side_effect=fake_hf_hub_download,
+        ),
+    ):
+        yield HfHubBackend()
+
+
+@pytest.fixture
+def local_backend(tmp_path):
+    root = tmp_path / "repos"
+    for path_in_repo, content in FILES.items():
+        path = root / REPO / path_in_repo
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return LocalDirectoryBackend(str(root))
+
+
+@pytest.fixture(params=["local", "memory", "hf"])
+def backend(request):
+    match request.param:
+        case "local":
+            return request.getfixturevalue("local_backend")
+        case "memory":
+            return InMemoryBackend({REPO: FILES})
+        case _:
+            return request.getfixturevalue("hf_backend")
+
+
+def test_load_from_backend(backend):
+    hub = AgentHub(REPO, backend=backend)
+    assert hub.load_config("helper")["known_tools"] == ["add"]
+    assert hub.load_tool("add")(1, 2) == 3
+    assert hub.list_files(hub.agents_dir) == ["helper"]
+    assert hub.list_files(hub.tools_dir) == ["add"]
+
+
+def test_upload_to_backend(backend):
+    hub = AgentHub(REPO, backend=backend)
+    hub.load_tool("add")
+    hub.upload_content("mul", "def mul(a, b):\n    return a * b\n", hub.tools_dir)
+    hub.delete_file("add.py", hub.tools_dir)
+
+    assert hub.list_files(hub.tools_dir) == ["mul"]
+    assert hub.load_tool("mul")(2, 3) == 6
+    # The index is committed along with the files
+    assert backend.file_path(REPO, hub.index_file)
+
+
+def test_default_backend():
+    backend = InMemoryBackend({REPO: FILES})
+    with patch.object(AgentHub, "default_backend", backend):
+        assert AgentHub(REPO).backend is backend
+    assert isinstance(AgentHub(REPO).backend, HfHubBackend)
+
+
+def test_in_memory_backend_revisions():
+    backend = InMemoryBackend()
+    empty = backend.resolve_revision(REPO)
+    sha = backend.commit(
+        REPO,
+        [CommitOperationAdd(path_in_repo="tools/a.py", path_or_fileobj=b"a = 1")],
+        "Add a",
+    )
+    assert backend.resolve_revision(REPO, "main") == sha
+    assert backend.snapshot_revision(backend.snapshot(REPO)) == sha
+    assert not os.listdir(backend.snapshot(REPO, empty))
+    with pytest.raises(EntryNotFoundError):
+        backend.file_path(REPO, "tools/a.py", empty)
+    with pytest.raises(RevisionNotFoundError):
+        backend.snapshot(REPO, "unknown")
+    with pytest.raises(ValueError, match="has changed"):
+        backend.commit(REPO, [], "Stale", parent_commit=empty)
+
+
+def test_local_directory_backend(local_backend):
+    head = local_backend.resolve_revision(REPO)
+    with pytest.raises(EntryNotFoundError):
+        local_backend.file_path(REPO, "tools/missing.py")
+
+    sha = local_backend.commit(
+        REPO,
+        [CommitOperationDelete(path_in_repo="tools/add.py")],
+        "Delete add",
+        parent_commit=head,
+    )
+    assert sha != head
+    assert not os.path.exists(
+        os.path.join(local_backend.snapshot(REPO), "tools/add.py")
+    )
+    with pytest.raises(ValueError, match="has changed"):
+        local_backend.commit(REPO, [], "Stale", parent_commit=head)
+
+
+def write_hf_cache(cache_dir, repo_id, revisions):
+    """Write an HF cache layout with revisions given oldest first."""
+    repo_path = cache_dir / f"spaces--{repo_id.replace('/', '--')}"
+    for age, (sha, files) in enumerate(revisions):
+        snapshot = repo_path / "snapshots" / sha
+        snapshot.mkdir(parents=True)
+        for path_in_repo, content in files.items():
+            blob = repo_path / "blobs" / hashlib.sha1(content.encode()).hexdigest()
+            blob.parent.mkdir(exist_ok=True)
+            blob.write_text(content)
+            link = snapshot / path_in_repo
+            link.parent.mkdir(parents=True, exist_ok=True)
+            link.symlink_to(os.path.relpath(blob, link.parent))
+        os.utime(snapshot, (age, age))
+    return repo_path
+
+
+@pytest.fixture
+def hf_cache(tmp_path):
+    cache_dir = tmp_path / "hub"
+    repo_path = write_hf_cache(
+        cache_dir,
+        REPO,
+        [
+            (f"sha{i}", {"tools/shared.py": "shared", "tools/own.py": f"own {i}"})
+            for i in range(4)
+        ],
+    )
+    with patch(
+        "aic_core.agent.storage.scan_cache_dir", lambda: scan_cache_dir(cache_dir)
+    ):
+        yield repo_path
+
+
+def test_hf_backend_prune(hf_cache):
+    backend = HfHubBackend()
+    freed = backend.prune(REPO, keep=2, protected={"sha0"})
+    assert freed == len("own 1")
+    assert sorted(os.listdir(hf_cache / "snapshots")) == ["sha0", "sha2", "sha3"]
+    # Blobs of the remaining revisions are kept
+    assert (hf_cache / "snapshots" / "sha0" / "tools" / "shared.py").read_text()
+    assert backend.prune(REPO, keep=2, protected={"sha0"}) == 0
+
+
+def test_hf_backend_prune_size_budget(hf_cache):
+    backend = HfHubBackend()
+    budget = len("shared") + 2 * len("own 0")
+    backend.prune(REPO, keep=4, max_size=budget, protected={"sha0"})
+    assert sorted(os.listdir(hf_cache / "snapshots")) == ["sha0", "sha3"]
+
+
+def test_hf_backend_cache_usage(hf_cache):
+    assert HfHubBackend().cache_usage() == {REPO: len("shared") + 4 * len("own 0")}
+    assert HfHubBackend().prune("other/space", keep=1) == 0
+
+
+def test_prune_cache_protects_served_revisions():
+    backend = Mock(spec=InMemoryBackend)
+    backend.prune.return_value = 10
+    hub = AgentHub(REPO, backend=backend)
+    AgentHub._snapshots[(REPO, None)] = Snapshot("sha1", "/sha1", 0)
+    AgentHub._snapshots[(REPO, "v1")] = Snapshot("sha0", "/sha0", 0)
+    AgentHub._snapshots[("other/space", None)] = Snapshot("sha9", "/sha9", 0)
+
+    assert hub.prune_cache(max_size=100) == 10
+    backend.prune.assert_called_once_with(
+        REPO, keep=3, max_size=100, protected={"sha0", "sha1"}
+    )
+    backend.cache_usage.return_value = {REPO: 10}
+    assert hub.cache_report() == {REPO: 10}
+
+
+def test_sync_fetches_changed_files(backend):
+    hub = AgentHub(REPO, backend=backend)
+    hub.rebuild_manifest()
+    add = hub.load_tool("add")
+    manifest = hub.load_manifest().model_copy(deep=True)
+    source = "def mul(a: int, b: int) -> int:\n    return a * b\n"
+    manifest.update("tools", "mul", source)
+    manifest.remove("agents", "helper")
+    sha = backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/mul.py", path_or_fileobj=source.encode()
+            ),
+            CommitOperationDelete(path_in_repo="agents/helper.json"),
+            CommitOperationAdd(
+                path_in_repo=hub.index_file,
+                path_or_fileobj=manifest.model_dump_json().encode(),
+            ),
+        ],
+        "Add mul",
+    )
+
+    path = hub.sync()
+    assert AgentHub._snapshots[hub._snapshot_key].sha == sha
+    assert sorted(os.listdir(os.path.join(path, "tools"))) == ["add.py", "mul.py"]
+    assert hub.list_files(hub.tools_dir) == ["add", "mul"]
+    assert hub.list_files(hub.agents_dir) == []
+    assert hub.load_tool("mul")(2, 3) == 6
+    # Objects of unchanged files stay cached
+    assert hub.load_tool("add") is add
+    assert hub.sync(sha) == path
+
+
+def test_update_fetches_only_changed_files(hf_backend):
+    hub = AgentHub(REPO, backend=hf_backend)
+    hub.upload_content("mul", "def mul(a, b):\n    return a * b\n", hub.tools_dir)
+    add = hub.load_tool("add")
+    hub.load_config("helper")
+    source = "def add(a, b):\n    return a + b + 1\n"
+    manifest = hub.load_manifest().model_copy(deep=True)
+    manifest.update("tools", "add", source)
+    sha = hf_backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/add.py", path_or_fileobj=source.encode()
+            ),
+            CommitOperationAdd(
+                path_in_repo=hub.index_file,
+                path_or_fileobj=manifest.model_dump_json().encode(),
+            ),
+        ],
+        "Update add",
+    )
+
+    AgentHub._snapshots[hub._snapshot_key].checked_at = 0
+    storage.snapshot_download.reset_mock()
+    storage.hf_hub_download.reset_mock()
+    assert hub.load_tool("add")(1, 2) == 4
+    # The snapshot is only looked up in the local cache
+    for call in storage.snapshot_download.call_args_list:
+        assert call.kwargs["local_files_only"]
+    assert {
+        call.kwargs["filename"] for call in storage.hf_hub_download.call_args_list
+    } == {"add.py", "index.json"}
+    # Only the objects of the changed files are reloaded
+    assert hub.load_tool("add") is not add
+    assert AgentHub._cache.get((REPO, sha, "agents", "helper"))
+    assert hub.load_tool("mul")(2, 3) == 6
+    # Updates of a complete snapshot are complete once all files are fetched
+    assert hf_backend.is_complete(AgentHub._snapshots[hub._snapshot_key].path)
+
+
+def test_update_picks_up_external_commits(hf_backend):
+    """Commits that leave the index as is are still fetched."""
+    hub = AgentHub(REPO, backend=hf_backend)
+    hub.rebuild_manifest()
+    hub.load_tool("add")
+    config = hub.load_config("helper")
+    sha = hf_backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/add.py",
+                path_or_fileobj=b"def add(a, b):\n    return a + b + 1\n",
+            ),
+            CommitOperationAdd(
+                path_in_repo="tools/mul.py",
+                path_or_fileobj=b"def mul(a, b):\n    return a * b\n",
+            ),
+        ],
+        "Edit in the web UI",
+    )
+
+    path = hub.sync()
+    assert os.path.basename(path) == sha
+    assert hub.load_tool("add")(1, 2) == 4
+    assert hub.load_tool("mul")(2, 3) == 6
+    assert hub.list_files(hub.tools_dir) == ["add", "mul"]
+    assert AgentHub._cache.get((REPO, sha, "agents", "helper")) == config
+    assert {
+        call.kwargs["filename"] for call in storage.hf_hub_download.call_args_list[-2:]
+    } == {"add.py", "mul.py"}
+
+
+def test_in_memory_backend_file_ids():
+    backend = InMemoryBackend({REPO: FILES})
+    ids = backend.file_ids(REPO, "main")
+    assert ids.keys() == FILES.keys()
+    assert LocalDirectoryBackend("/repos").file_ids(REPO, "main") is None
+
+
+def test_upload_after_external_commit(hf_backend):
+    """Pushing on top of an unseen commit still serves that commit's files."""
+    hub = AgentHub(REPO, backend=hf_backend)
+    assert hub.load_tool("add")(1, 2) == 3
+    hf_backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/add.py",
+                path_or_fileobj=b"def add(a, b):\n    return a + b + 1\n",
+            )
+        ],
+        "Edit in the web UI",
+    )
+
+    hub.upload_content("mul", "def mul(a, b):\n    return a * b\n", hub.tools_dir)
+    assert hub.load_tool("add")(1, 2) == 4
+    assert hub.load_tool("mul")(2, 3) == 6
+
+
+def test_update_of_scoped_hub_shares_snapshot(hf_backend):
+    """Changes out of a hub's scope are never linked stale for other hubs."""
+    other = AgentHub(REPO, backend=hf_backend)
+    other.upload_content("mul", "def mul(a, b):\n    return a * b\n", "tools")
+    AgentHub.clear_cache()
+    scoped = AgentHub(REPO, backend=hf_backend, agent_name="helper")
+    assert scoped.load_tool("add")(1, 2) == 3
+    sha = hf_backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/mul.py",
+                path_or_fileobj=b"def mul(a, b):\n    return a * b * 2\n",
+            )
+        ],
+        "Edit mul",
+    )
+
+    path = scoped.sync()
+    assert os.path.basename(path) == sha
+    assert not os.path.exists(os.path.join(path, "tools", "mul.py"))
+    assert AgentHub._snapshots[scoped._snapshot_key].partial
+    assert scoped.list_files(scoped.tools_dir) == ["add", "mul"]
+    # Other hubs of the repo fetch the left out files on demand
+    assert other.load_tool("mul")(2, 3) == 12
+
+
+def test_scoped_snapshot_is_partial_for_other_hubs(hf_backend):
+    """Snapshot folders left by a scoped download are not served as complete."""
+    hf_backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/mul.py",
+                path_or_fileobj=b"def mul(a, b):\n    return a * b\n",
+            )
+        ],
+        "Add mul",
+    )
+    scoped = AgentHub(REPO, backend=hf_backend, agent_name="helper")
+    assert scoped.load_config("helper")
+    AgentHub.clear_cache()
+
+    hub = AgentHub(REPO, backend=hf_backend)
+    assert hub.list_files(hub.tools_dir) == ["add", "mul"]
+    assert hub.load_manifest().names(hub.tools_dir) == ["add", "mul"]
+    # The snapshot is complete once all the files are fetched
+    AgentHub.clear_cache()
+    hub.load_config("helper")
+    assert not AgentHub._snapshots[hub._snapshot_key].partial
+
+
+def test_offline_restart_after_sync(hf_backend):
+    """The head served last is found offline, though it was fetched by sha."""
+    hub = AgentHub(REPO, backend=hf_backend)
+    assert hub.load_tool("add")(1, 2) == 3
+    sha = hf_backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/add.py",
+                path_or_fileobj=b"def add(a, b):\n    return a + b + 1\n",
+            )
+        ],
+        "Edit add",
+    )
+    hub.sync()
+    AgentHub.clear_cache()
+
+    offline = AgentHub(REPO, backend=hf_backend, offline=True)
+    assert offline.load_tool("add")(1, 2) == 4
+    assert AgentHub._snapshots[offline._snapshot_key].sha == sha
@@ -0,0 +1,77 @@
+from typing import Any, Optional, Union
+from unittest.mock import patch
+import pytest
+from pydantic import BaseModel
+from aic_core.agent.result_types import TableOutput
+from aic_core.agent.type_resolver import ResultTypeResolver
+
+
+class Person(BaseModel):
+    name: str
+
+
+@pytest.fixture
+def resolver():
+    ResultTypeResolver.clear_cache()
+    with patch("aic_core.agent.agent_hub.AgentHub") as mock_agent_hub:
+        mock_agent_hub.return_value.load_result_type.return_value = Person
+        yield ResultTypeResolver("test-repo", revision="v1")
+    ResultTypeResolver.clear_cache()
+
+
+def test_resolve_name(resolver):
+    assert resolver.resolve_name("str") is str
+    assert resolver.resolve_name("Any") is Any
+    assert resolver.resolve_name("None") is None
+    assert resolver.resolve_name("dict[str, list[int]]") == dict[str, list[int]]
+    assert resolver.resolve_name("TableOutput") is TableOutput
+    assert resolver.resolve_name("Person") is Person
+
+
+@pytest.mark.parametrize(
+    ("type_str", "expected"),
+    [
+        ("int | str", Union[int, str]),  # noqa: UP007
+        ("Person | None", Optional[Person]),  # noqa: UP045
+        ("Union[int, str]", Union[int, str]),  # noqa: UP007
+        ("Optional[list[Person]]", Optional[list[Person]]),  # noqa: UP045
+        ("dict[str, int | None]", dict[str, Optional[int]]),  # noqa: UP045
+    ],
+)
+def test_resolve_unions(resolver, type_str, expected):
+    assert resolver.resolve_name(type_str) == expected
+
+
+@pytest.mark.parametrize(
+    "type_str",
+    [
+        "__import__('os')",
+        "str.__class__",
+        "list[",
+        "Person[str]",
+        "int & str",
+        "Optional[int, str]",
+    ],
+)
+def test_resolve_name_rejects_expressions(resolver, type_str):
+    with pytest.raises(ValueError, match="Invalid result type"):
+        resolver.resolve_name(type_str)
+
+
+def test_resolve_is_memoized(resolver):
+    assert resolver.resolve([]) is str
+    output_type = resolver.resolve(["Person", "str"])
+    assert output_type == Union[Person, str]  # noqa: UP007
+    assert resolver.resolve(["Person", "str"]) is output_type
+
+
+def test_hub_names(resolver):
+    assert resolver.hub_names("str") == set()
+    assert resolver.hub_names("TableOutput") == set()
+    assert resolver.hub_names("dict[str, Person]") == {"Person"}
+    assert resolver.hub_names("list[Person]") == {"Person"}
+    assert resolver.hub_names("tuple[Person, Pet]") == {"Person", "Pet"}
+    assert resolver.hub_names("Person | Pet | None") == {"Person", "Pet"}
+    assert resolver.hub_names("Optional[Union[Person, str]]") == {"Person"}
+    with pytest.raises(ValueError, match="Invalid result type"):
+        resolver.hub_names("__import__('os')")
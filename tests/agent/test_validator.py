@@ -0,0 +1,95 @@
+from unittest.mock import patch
+import pytest
+from aic_core.agent.agent import AgentConfig
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.manifest import Manifest
+from aic_core.agent.validator import ConfigError, ConfigValidator, InvalidConfigError
+
+
+@pytest.fixture
+def manifest():
+    manifest = Manifest()
+    manifest.update("tools", "add", "def add(a: int, b: int) -> int:\n    return a + b")
+    manifest.update("tools", "broken", "def other():\n    pass")
+    manifest.update("tools", "mul", "def _mul(a, b):\n    return a * b\nmul = _mul")
+    manifest.update("tools", "dumps", "from json import dumps")
+    manifest.update("result_types", "Person", "class Person(BaseModel):\n    name: str")
+    return manifest
+
+
+@pytest.fixture
+def mock_agent_hub(manifest):
+    with patch("aic_core.agent.agent_hub.AgentHub") as mock_agent_hub:
+        mock_agent_hub.tools_dir = AgentHub.tools_dir
+        mock_agent_hub.result_types_dir = AgentHub.result_types_dir
+        mock_agent_hub.return_value.load_manifest.return_value = manifest
+        yield mock_agent_hub
+
+
+def make_config(**kwargs):
+    return AgentConfig(model="openai:gpt-4o", repo_id="test-repo", **kwargs)
+
+
+def test_valid_config(mock_agent_hub):
+    config = make_config(
+        result_type=["Person", "list[str]", "TableOutput"],
+        known_tools=["add", "add.py", "mul", "dumps"],
+        hf_tools=["user/tool", "user/tool@v1"],
+        mcp_servers=["npx -y server", " ", "http://localhost:8000/mcp?a=1&b=2"],
+    )
+    assert ConfigValidator(config).validate() == []
+    mock_agent_hub.assert_called_once_with("test-repo", revision=None)
+    mock_agent_hub.return_value.load_tool.assert_not_called()
+    mock_agent_hub.return_value.load_result_type.assert_not_called()
+
+
+def test_manifest_not_loaded_without_hub_names(mock_agent_hub):
+    assert ConfigValidator(make_config()).validate() == []
+    mock_agent_hub.assert_not_called()
+
+
+@pytest.mark.parametrize("model", ["gpt-4o", "anthropic:claude", "openai:"])
+def test_invalid_model(model):
+    config = AgentConfig(model=model, repo_id="test-repo")
+    errors = ConfigValidator(config).validate()
+    assert [(error.field, error.value) for error in errors] == [("model", model)]
+
+
+def test_invalid_config(mock_agent_hub):
+    config = make_config(
+        result_type=["Pet", "str.__class__"],
+        known_tools=["add", "missing", "broken"],
+        hf_tools=["not a repo", "user/tool@"],
+        mcp_servers=[
+            "-y server",
+            "server | tee log",
+            "server 'a b'",
+            "http:///mcp",
+            "https://example.com/sse --flag",
+        ],
+    )
+    errors = ConfigValidator(config).validate()
+
+    assert [(error.field, error.value) for error in errors] == [
+        ("result_type", "Pet"),
+        ("result_type", "str.__class__"),
+        ("known_tools", "missing"),
+        ("known_tools", "broken"),
+        ("hf_tools", "not a repo"),
+        ("hf_tools", "user/tool@"),
+        ("mcp_servers", "-y server"),
+        ("mcp_servers", "server | tee log"),
+        ("mcp_servers", "server 'a b'"),
+        ("mcp_servers", "http:///mcp"),
+        ("mcp_servers", "https://example.com/sse --flag"),
+    ]
+    assert errors[2].message == "missing not found in test-repo/tools"
+    assert errors[3].message == "tools/broken does not define broken"
+    mock_agent_hub.return_value.load_manifest.assert_called_once()
+
+
+def test_invalid_config_error():
+    error = InvalidConfigError([ConfigError("model", "gpt", "Bad model")])
+    assert isinstance(error, ValueError)
+    assert str(error) == "Invalid agent config:\nmodel: Bad model"
+    assert error.errors[0].value == "gpt"
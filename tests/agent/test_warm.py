@@ -0,0 +1,79 @@
+import json
+from unittest.mock import patch
+import pytest
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.module_cache import ModuleCache
+from aic_core.agent.storage import InMemoryBackend
+from aic_core.agent.warm import default_marker_path, warm
+
+
+REPO = "user/space"
+AGENT = {"model": "openai:gpt-4o", "repo_id": REPO}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = InMemoryBackend(
+        {
+            REPO: {
+                "agents/helper.json": json.dumps(
+                    {**AGENT, "known_tools": ["add"], "result_type": ["Report"]}
+                ),
+                "agents/plain.json": json.dumps(AGENT),
+                "tools/add.py": "def add(a: int, b: int) -> int:\n    return a + b\n",
+                "tools/unused.py": "def unused():\n    pass\n",
+                "result_types/Report.py": (
+                    "from pydantic import BaseModel\n\n"
+                    "class Report(BaseModel):\n    text: str\n"
+                ),
+            }
+        }
+    )
+    AgentHub.clear_cache()
+    with (
+        patch.object(AgentHub, "default_backend", backend),
+        patch.object(AgentHub, "_modules", ModuleCache(str(tmp_path / "bytecode"))),
+    ):
+        yield backend
+    AgentHub.clear_cache()
+
+
+def test_warm_agents(backend, tmp_path):
+    marker = tmp_path / "warm.json"
+    with patch.object(backend, "snapshot", wraps=backend.snapshot) as mock_snapshot:
+        report = warm(REPO, agents=["helper"], marker_path=str(marker))
+
+    assert mock_snapshot.call_args.kwargs["allow_patterns"] == [
+        "agents/helper.json",
+        "tools/add.py",
+        "result_types/Report.py",
+        "index.json",
+    ]
+    assert report.agents == ["helper"]
+    assert report.revision == backend.resolve_revision(REPO)
+    assert list(report.timings) == ["download", "compile", "build"]
+    assert json.loads(marker.read_text())["agents"] == ["helper"]
+    # Bytecode is persisted for the next process
+    assert AgentHub._modules.compiled == report.modules
+
+
+def test_warm_all_agents(backend, tmp_path):
+    report = warm(REPO, marker_path=str(tmp_path / "warm.json"))
+    assert report.agents == ["helper", "plain"]
+    assert report.modules == 3
+
+
+def test_default_marker_path():
+    assert default_marker_path(REPO).endswith("aic_warm/user--space.json")
+
+
+def test_warm_loads_lazy_tools(backend, tmp_path):
+    hub = AgentHub(REPO)
+    source = "import not_installed_pkg\n\ndef add(a: int, b: int) -> int: ...\n"
+    hub.upload_content("add", source, hub.tools_dir)
+    AgentHub.clear_cache()
+
+    marker = tmp_path / "warm.json"
+    with pytest.raises(ModuleNotFoundError, match="not_installed_pkg"):
+        warm(REPO, agents=["helper"], marker_path=str(marker))
+    assert not marker.exists()
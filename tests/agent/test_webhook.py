@@ -0,0 +1,90 @@
+import json
+import urllib.error
+import urllib.request
+import pytest
+from huggingface_hub import CommitOperationAdd
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.storage import InMemoryBackend
+from aic_core.agent.webhook import WebhookReceiver
+
+
+REPO = "user/space"
+TOOL = "def add(a: int, b: int) -> int:\n    return a + b\n"
+
+
+@pytest.fixture
+def hub():
+    hub = AgentHub(REPO, backend=InMemoryBackend())
+    hub.upload_content("add", TOOL, hub.tools_dir)
+    return hub
+
+
+def payload(sha, scope="repo.content", name=REPO):
+    return {
+        "event": {"action": "update", "scope": scope},
+        "repo": {"type": "space", "name": name, "headSha": sha},
+    }
+
+
+def post(url, body, secret=None):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json", "X-Webhook-Secret": secret or ""},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def push_mul(hub):
+    """Push a tool from another process, as seen by this one."""
+    return hub.backend.commit(
+        REPO,
+        [
+            CommitOperationAdd(
+                path_in_repo="tools/mul.py",
+                path_or_fileobj=b"def mul(a, b):\n    return a * b\n",
+            )
+        ],
+        "Add mul",
+    )
+
+
+def test_webhook_refreshes_hub(hub):
+    hub.list_files(hub.tools_dir)
+    sha = push_mul(hub)
+    with WebhookReceiver([hub], secret="secret") as receiver:
+        assert post(receiver.url, payload(sha), "wrong")[0] == 401
+        assert post(receiver.url, payload(sha), "secret") == (
+            200,
+            {"refreshed": [REPO]},
+        )
+    # The new revision is served before the update interval elapses
+    assert AgentHub._snapshots[hub._snapshot_key].sha == sha
+    assert hub.load_tool("mul")(2, 3) == 6
+    assert not receiver.running
+
+
+def test_webhook_invalid_payload(hub):
+    with WebhookReceiver([hub]) as receiver:
+        request = urllib.request.Request(receiver.url, data=b"{")
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(request, timeout=10)
+        assert e.value.code == 400
+
+
+def test_webhook_ignores_other_events(hub):
+    hub.list_files(hub.tools_dir)
+    served = AgentHub._snapshots[hub._snapshot_key].sha
+    sha = push_mul(hub)
+    receiver = WebhookReceiver([hub, AgentHub(REPO, revision=served)])
+    assert receiver.handle(payload(sha, scope="repo.config")) == []
+    assert receiver.handle(payload(sha, name="other/space")) == []
+    assert AgentHub._snapshots[hub._snapshot_key].sha == served
+
+    # Hubs that serve nothing yet download the head on their next load
+    AgentHub.clear_cache()
+    assert receiver.handle(payload(sha)) == []
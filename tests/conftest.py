@@ -0,0 +1,27 @@
+import pytest
+from aic_core.agent.agent_hub import AgentHub
+from aic_core.agent.module_cache import ModuleCache
+
+
+@pytest.fixture(autouse=True)
+def clear_hub_cache():
+    """Start and end every test without loaded objects or served snapshots."""
+    AgentHub.clear_cache()
+    yield
+    AgentHub.clear_cache()
+
+
+@pytest.fixture(autouse=True)
+def module_cache(tmp_path, monkeypatch):
+    """Keep the bytecode of hub modules out of the real Hugging Face cache."""
+    cache = ModuleCache(str(tmp_path / "aic_bytecode"))
+    monkeypatch.setattr(AgentHub, "_modules", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def lock_dir(tmp_path, monkeypatch):
+    """Keep the refresh locks of hubs out of the real Hugging Face cache."""
+    path = str(tmp_path / "aic_locks")
+    monkeypatch.setattr(AgentHub, "lock_dir", path)
+    return path
@@ -91,3 +91,30 @@ def test_read_uninteresting_failure():
 
         # The function should not raise an exception, but log an error
         # You might want to add logger verification if needed
+
+
+@pytest.mark.parametrize(
+    ("argv", "transport", "host", "port"),
+    [
+        ([], "stdio", "127.0.0.1", 8000),
+        (["-t", "sse", "-p", "9000"], "sse", "127.0.0.1", 9000),
+        (
+            ["--transport", "streamable-http", "--host", "0.0.0.0"],
+            "streamable-http",
+            "0.0.0.0",
+            8000,
+        ),
+    ],
+)
+def test_main(argv, transport, host, port):
+    from aic_core.mcp.feedly import main, server
+
+    with (
+        patch.object(server, "run") as mock_run,
+        patch.object(server, "settings") as mock_settings,
+    ):
+        main(argv)
+
+    mock_run.assert_called_once_with(transport=transport)
+    assert mock_settings.host == host
+    assert mock_settings.port == port
@@ -11,6 +11,7 @@ from pydantic_ai.messages import (
     UserPromptPart,
 )
 from aic_core.agent.agent import AICAgent
+from aic_core.agent.agent_pool import AgentPool
 from aic_core.agent.result_types import ComponentRegistry
 from aic_core.streamlit.agent_page import AgentPage, PageState
 
@@ -100,6 +101,7 @@ def test_run(mock_button, mock_chat_input, mock_title, agent_page):
     with (
         patch.object(agent_page, "display_chat_history") as mock_display_chat_history,
         patch.object(AICAgent, "__init__", return_value=None) as mock_init,
+        patch.object(AgentPool, "get") as mock_get,
     ):
         agent_page.run()
 
@@ -108,7 +110,7 @@ def test_run(mock_button, mock_chat_input, mock_title, agent_page):
         )
         mock_chat_input.assert_called_once_with("Enter a message")
         mock_display_chat_history.assert_called_once()
-        mock_init.assert_called_once()
+        mock_init.assert_called_once_with("test-repo", None, mock_get.return_value)
 
 
 @patch("streamlit.title")
@@ -125,6 +127,7 @@ def test_run_with_input(mock_button, mock_chat_input, mock_title, agent_page):
         patch.object(agent_page, "display_chat_history") as mock_display_chat_history,
         patch("streamlit.rerun") as mock_rerun,
         patch.object(AICAgent, "__init__", return_value=None) as mock_init,
+        patch.object(AgentPool, "get") as mock_get,
     ):
         agent_page.run()
 
@@ -133,7 +136,7 @@ def test_run_with_input(mock_button, mock_chat_input, mock_title, agent_page):
         )
         mock_chat_input.assert_called_once_with("Enter a message")
         mock_display_chat_history.assert_called_once()
-        mock_init.assert_called_once()
+        mock_init.assert_called_once_with("test-repo", None, mock_get.return_value)
         mock_rerun.assert_called_once()
 
 
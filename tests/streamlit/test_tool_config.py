@@ -122,3 +122,23 @@ def test_run(tool_config):
 
         # Verify edit_tool was called with selected tool
         mock_edit.assert_called_once_with("test_tool")
+
+
+def test_edit_tool_not_indexed(tool_config):
+    mock_hub = Mock()
+    mock_hub.locate.return_value = None
+    mock_hub.get_file_path.side_effect = [EntryNotFoundError("missing"), "fake/path"]
+
+    with (
+        patch(
+            "aic_core.streamlit.tool_config.AgentHub", return_value=mock_hub
+        ) as mock_hub_cls,
+        patch("builtins.open", mock_open(read_data="class Model: pass")),
+        patch("aic_core.streamlit.tool_config.code_editor") as mock_editor,
+        patch("streamlit.text_input"),
+        patch("streamlit.button"),
+    ):
+        mock_editor.return_value = {"text": "class Model: pass"}
+        tool_config.edit_tool("Model")
+
+    mock_hub.get_file_path.assert_called_with("Model", mock_hub_cls.result_types_dir)
@@ -0,0 +1,54 @@
+from unittest.mock import patch
+import pytest
+from aic_core.agent.warm import WarmReport
+from aic_core.cli import main
+
+
+def test_publish(capsys):
+    with patch("aic_core.cli.AgentHub") as mock_hub:
+        mock_hub.return_value.upload_directory.return_value = 3
+        main(["publish", "test-repo", "./repo", "-m", "Release"])
+
+    mock_hub.assert_called_once_with("test-repo")
+    mock_hub.return_value.upload_directory.assert_called_once_with(
+        "./repo", commit_message="Release"
+    )
+    assert "Published 3 files to test-repo" in capsys.readouterr().out
+
+
+def test_missing_command():
+    with pytest.raises(SystemExit):
+        main([])
+
+
+def test_warm(capsys):
+    report = WarmReport(
+        repo_id="test-repo",
+        revision="sha1",
+        agents=["helper"],
+        modules=2,
+        timings={"download": 1.5, "compile": 0.25},
+    )
+    with patch("aic_core.cli.warm_repo", return_value=report) as mock_warm:
+        main(["warm", "test-repo", "-r", "v1", "-a", "helper"])
+
+    mock_warm.assert_called_once_with(
+        "test-repo", revision="v1", agents=["helper"], marker_path=None
+    )
+    out = capsys.readouterr().out
+    assert "download     1.500s" in out
+    assert "Warmed test-repo@sha1: 1 agents, 2 modules" in out
+
+
+def test_warm_keep_revisions(capsys):
+    report = WarmReport(repo_id="test-repo", revision="sha1", agents=[])
+    with (
+        patch("aic_core.cli.warm_repo", return_value=report),
+        patch("aic_core.cli.AgentHub") as mock_hub,
+    ):
+        mock_hub.return_value.prune_cache.return_value = 1024
+        main(["warm", "test-repo", "--keep-revisions", "2"])
+
+    mock_hub.assert_called_once_with("test-repo", None)
+    mock_hub.return_value.prune_cache.assert_called_once_with(keep=2)
+    assert "Pruned 1024 bytes of older revisions" in capsys.readouterr().out